@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_faculty_id_alter_holiday_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='holiday',
+            index=models.Index(fields=['start_date', 'end_date'], name='holiday_range_idx'),
+        ),
+    ]
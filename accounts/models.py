@@ -91,5 +91,10 @@ class Holiday(models.Model):
     start_date = models.DateField()
     end_date = models.DateField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_date', 'end_date'], name='holiday_range_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.start_date} - {self.end_date})"
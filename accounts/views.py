@@ -4,12 +4,28 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
 from django.contrib.auth.models import User
+from django.db.models import Count
 from .forms import UserRegistrationForm, FacultyProfileForm, UserProfileForm, CustomAuthenticationForm
 from .models import Faculty
+from courses.models import Course
 from programs.models import AllowedEmail
 from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpResponseNotAllowed
 
 def faculty_required(view_func):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_wrapped_view(request, *args, **kwargs):
+            # The faculty lookup hits the database; run it off the event loop.
+            # It is cached on request.user afterwards.
+            if not await sync_to_async(hasattr)(request.user, 'faculty'):
+                messages.error(request, 'You must be a faculty member to access this page.')
+                return redirect('home')
+            return await view_func(request, *args, **kwargs)
+        return _async_wrapped_view
+
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
         if not hasattr(request.user, 'faculty'):
@@ -18,6 +34,27 @@ def faculty_required(view_func):
         return view_func(request, *args, **kwargs)
     return _wrapped_view
 
+def async_login_required(view_func):
+    """login_required for async views (Django 4.2's only wraps sync ones)."""
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        # request.user is a lazy object backed by a session query.
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+def async_require_http_methods(request_method_list):
+    """require_http_methods for async views."""
+    def decorator(view_func):
+        @wraps(view_func)
+        async def _wrapped_view(request, *args, **kwargs):
+            if request.method not in request_method_list:
+                return HttpResponseNotAllowed(request_method_list)
+            return await view_func(request, *args, **kwargs)
+        return _wrapped_view
+    return decorator
+
 def require_access_level(level_func):
     def decorator(view_func):
         @wraps(view_func)
@@ -67,10 +104,15 @@ def logout_view(request):
 @require_access_level('can_access_dashboard')
 def dashboard(request):
     faculty = get_object_or_404(Faculty, user=request.user)
+    sections = list(faculty.sections.with_card_stats())
+    courses = list(
+        Course.objects.filter(sections__faculties=faculty)
+        .annotate(section_count=Count('sections')).order_by('code')
+    )
     context = {
         'faculty': faculty,
-        'courses': faculty.section_set.all().distinct('course'),
-        'sections': faculty.section_set.all(),
+        'courses': courses,
+        'sections': sections,
     }
     return render(request, 'accounts/dashboard.html', context)
 
@@ -0,0 +1,159 @@
+"""
+Concurrent autosave benchmark.
+
+Simulates N faculty members autosaving marks at the same time: each worker
+thread holds its own database connection and repeatedly runs the same
+``update_or_create`` that ``autosave_mark`` performs.  Every profile runs in a
+fresh subprocess against a throwaway SQLite file, so the settings of one run
+cannot leak into the next.
+
+    python benchmarks/autosave_concurrency.py --workers 16 --writes 200
+
+Reports committed writes per second, p50/p99 write latency and how many
+writes failed with "database is locked".
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROFILES = {
+    'rollback journal, no timeout': {
+        'OBE_SQLITE_WAL': '0', 'OBE_SQLITE_BUSY_TIMEOUT': '0', 'OBE_SQLITE_TRANSACTION_MODE': 'DEFERRED'},
+    'rollback journal, 5s timeout': {
+        'OBE_SQLITE_WAL': '0', 'OBE_SQLITE_BUSY_TIMEOUT': '5000', 'OBE_SQLITE_TRANSACTION_MODE': 'DEFERRED'},
+    'WAL, deferred BEGIN': {
+        'OBE_SQLITE_WAL': '1', 'OBE_SQLITE_BUSY_TIMEOUT': '5000', 'OBE_SQLITE_TRANSACTION_MODE': 'DEFERRED'},
+    'WAL, BEGIN IMMEDIATE (production)': {
+        'OBE_SQLITE_WAL': '1', 'OBE_SQLITE_BUSY_TIMEOUT': '5000', 'OBE_SQLITE_TRANSACTION_MODE': 'IMMEDIATE'},
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def setup_django():
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'obe.settings')
+    import django
+    django.setup()
+
+
+def seed(student_count):
+    """Migrate the throwaway database and create one section with 10 items."""
+    from django.core.management import call_command
+    from accounts.models import User, Faculty
+    from programs.models import Department, Program, AllowedEmail
+    from courses.models import Course, CLO, Section, Student, Enrollment, AssessmentTemplate, AssessmentItem
+
+    call_command('migrate', verbosity=0)
+    dept = Department.objects.create(name='Bench', short_name='BEN')
+    program = Program.objects.create(name='Bench', department=dept)
+    user = User.objects.create_user('bench', 'bench@example.com', 'bench-pass')
+    email = AllowedEmail.objects.create(email='bench@example.com', department=dept)
+    faculty = Faculty.objects.create(user=user, allowed_email=email, name='Bench', short_name='B',
+                                     department=dept, designation='Lecturer')
+    course = Course.objects.create(code='BEN101', title='Bench', program=program, credits=3)
+    clo = CLO.objects.create(course=course, sl=1, description='bench')
+    section = Section.objects.create(course=course, name='A', year=2025, semester='Fall', primary_faculty=faculty)
+    section.faculties.add(faculty)
+    template = AssessmentTemplate.objects.create(section=section)
+    items = [AssessmentItem.objects.create(template=template, name=f'Q{i}', assessment_type='Assessment',
+                                           clo=clo, max_marks=10) for i in range(10)]
+    students = Student.objects.bulk_create(
+        Student(student_id=f'B{i:04d}', name=f'Student {i}', program=program) for i in range(student_count))
+    Enrollment.objects.bulk_create(Enrollment(student=s, section=section) for s in students)
+    return {'user': user, 'section': section, 'items': items, 'students': students}
+
+
+def run_profile(workers, writes):
+    """Runs inside the subprocess; settings come from the environment."""
+    setup_django()
+    from django.db import connection, connections, OperationalError
+    from courses.models import AssessmentMark
+
+    data = seed(workers * 10)
+    section, items, students = data['section'], data['items'], data['students']
+    connection.close()
+
+    latencies, failures = [], []
+    lock = threading.Lock()
+    start_gate = threading.Barrier(workers)
+
+    def worker(index):
+        own_students = students[index * 10:(index + 1) * 10]
+        local_latency, local_failures = [], 0
+        start_gate.wait()
+        for n in range(writes):
+            student = own_students[n % len(own_students)]
+            item = items[n % len(items)]
+            began = time.perf_counter()
+            try:
+                AssessmentMark.objects.update_or_create(
+                    student=student, assessment_item=item,
+                    defaults={'marks': n % 10, 'section': section},
+                )
+                local_latency.append(time.perf_counter() - began)
+            except OperationalError:
+                local_failures += 1
+        connections.close_all()
+        with lock:
+            latencies.extend(local_latency)
+            failures.append(local_failures)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    print(json.dumps({
+        'committed': len(latencies),
+        'failed': sum(failures),
+        'elapsed': elapsed,
+        'writes_per_second': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--writes', type=int, default=200, help='writes per worker')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_profile(args.workers, args.writes)
+        return
+
+    print(f'{args.workers} concurrent autosavers x {args.writes} writes each\n')
+    print(f"{'profile':34} {'ok':>7} {'locked':>7} {'writes/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, env in PROFILES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            child_env = dict(os.environ, OBE_DB_ENGINE='sqlite', OBE_DB_NAME=str(Path(tmp) / 'bench.sqlite3'), **env)
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', '--workers', str(args.workers), '--writes', str(args.writes)],
+                env=child_env, capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+        print(f"{name:34} {result['committed']:>7} {result['failed']:>7} {result['writes_per_second']:>10.0f} "
+              f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+Load test for the AJAX endpoints used while grading.
+
+Sends a mix of autosave, attendance and student-search requests with a fixed
+concurrency and reports requests per second plus p50/p99 latency per endpoint.
+
+Against running servers, e.g. the WSGI and ASGI profiles from
+benchmarks/README.md started on the same database:
+
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --section 12 \\
+        --cookie 'sessionid=...; csrftoken=...' --concurrency 32 --requests 2000
+
+Without servers, ``--in-process`` drives Django's WSGI handler from a thread
+pool and its ASGI handler from an event loop, on a throwaway SQLite
+database, and prints both side by side:
+
+    python benchmarks/load_test.py --in-process --concurrency 32 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from autosave_concurrency import percentile, seed, setup_django
+
+# Share of each endpoint in the generated traffic.
+MIX = [
+    ('autosave_mark', 0.6),
+    ('save_attendance', 0.2),
+    ('get_attendance', 0.1),
+    ('search_students', 0.1),
+]
+
+
+def plan(total, context, seed_value=1):
+    """A reproducible list of (endpoint, method, path, body, content_type)."""
+    rng = random.Random(seed_value)
+    names = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    section = context['section']
+    requests = []
+    for _ in range(total):
+        name = rng.choices(names, weights)[0]
+        student = rng.choice(context['students'])
+        if name == 'autosave_mark':
+            body = f"student_id={student}&item_id={rng.choice(context['items'])}&value={rng.randint(0, 10)}"
+            requests.append((name, 'POST', f'/courses/sections/{section}/autosave-mark/', body,
+                             'application/x-www-form-urlencoded'))
+        elif name == 'save_attendance':
+            body = json.dumps({'student_id': student, 'session_id': rng.choice(context['sessions']),
+                               'is_present': rng.random() < 0.9})
+            requests.append((name, 'POST', f'/courses/sections/{section}/attendance/save/', body,
+                             'application/json'))
+        elif name == 'get_attendance':
+            requests.append((name, 'GET', f'/courses/sections/{section}/attendance/', None, None))
+        else:
+            requests.append((name, 'GET', f'/courses/ajax/search-students/?term=Student%20{rng.randint(0, 99)}',
+                             None, None))
+    return requests
+
+
+def summarize(samples, elapsed):
+    by_endpoint = defaultdict(list)
+    errors = 0
+    for name, latency, ok in samples:
+        by_endpoint[name].append(latency)
+        errors += not ok
+    everything = [latency for _, latency, _ in samples]
+    return {
+        'rps': len(samples) / elapsed,
+        'errors': errors,
+        'p50_ms': percentile(everything, 50) * 1000,
+        'p99_ms': percentile(everything, 99) * 1000,
+        'endpoints': {name: percentile(values, 99) * 1000 for name, values in sorted(by_endpoint.items())},
+    }
+
+
+def print_summary(label, result):
+    print(f"{label:6} {result['rps']:>8.0f} req/s  p50 {result['p50_ms']:>7.1f} ms  "
+          f"p99 {result['p99_ms']:>7.1f} ms  errors {result['errors']}")
+    for name, p99 in result['endpoints'].items():
+        print(f"         p99 {name:18} {p99:>7.1f} ms")
+
+
+# -- HTTP mode ---------------------------------------------------------------
+
+def run_http(args):
+    cookie = args.cookie or ''
+    cookies = dict(part.strip().split('=', 1) for part in cookie.split(';') if '=' in part)
+    context = {
+        'section': args.section,
+        'students': args.students or [1],
+        'items': args.items or [1],
+        'sessions': args.sessions or [1],
+    }
+    requests = plan(args.requests, context)
+    samples, lock = [], threading.Lock()
+
+    def send(request):
+        name, method, path, body, content_type = request
+        req = urllib.request.Request(args.url.rstrip('/') + path, method=method,
+                                     data=body.encode() if body is not None else None)
+        req.add_header('Cookie', cookie)
+        req.add_header('X-Requested-With', 'XMLHttpRequest')
+        if 'csrftoken' in cookies:
+            req.add_header('X-CSRFToken', cookies['csrftoken'])
+            req.add_header('Referer', args.url)
+        if content_type:
+            req.add_header('Content-Type', content_type)
+        began = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                response.read()
+                ok = response.status < 400
+        except (urllib.error.URLError, OSError):
+            ok = False
+        with lock:
+            samples.append((name, time.perf_counter() - began, ok))
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(send, requests))
+    print_summary('http', summarize(samples, time.perf_counter() - began))
+
+
+# -- in-process mode ---------------------------------------------------------
+
+def _in_process_context():
+    from courses.models import Session
+    data = seed(100)
+    section = data['section']
+    sessions = Session.objects.bulk_create(
+        Session(section=section, session_number=n, date=f'2025-01-{n:02d}') for n in range(1, 15))
+    return data['user'], {
+        'section': section.id,
+        'students': [s.id for s in data['students']],
+        'items': [i.id for i in data['items']],
+        'sessions': [s.id for s in sessions],
+    }
+
+
+def _client_call(client, request):
+    name, method, path, body, content_type = request
+    if method == 'GET':
+        return client.get(path)
+    return client.post(path, body, content_type=content_type)
+
+
+def run_wsgi(concurrency, requests, user):
+    from django.db import connections
+    from django.test import Client
+
+    local = threading.local()
+    samples, lock = [], threading.Lock()
+
+    def send(request):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+            local.client.force_login(user)
+        began = time.perf_counter()
+        response = _client_call(local.client, request)
+        with lock:
+            samples.append((request[0], time.perf_counter() - began, response.status_code < 400))
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(send, requests))
+    elapsed = time.perf_counter() - began
+    connections.close_all()
+    return summarize(samples, elapsed)
+
+
+def run_asgi(concurrency, requests, user):
+    from django.test import AsyncClient, Client
+
+    login = Client()
+    login.force_login(user)
+
+    async def main():
+        client = AsyncClient()
+        client.cookies = login.cookies
+        gate = asyncio.Semaphore(concurrency)
+        samples = []
+
+        async def send(request):
+            async with gate:
+                began = time.perf_counter()
+                response = await _client_call(client, request)
+                samples.append((request[0], time.perf_counter() - began, response.status_code < 400))
+
+        began = time.perf_counter()
+        await asyncio.gather(*(send(request) for request in requests))
+        return summarize(samples, time.perf_counter() - began)
+
+    return asyncio.run(main())
+
+
+def run_in_process_child(args):
+    setup_django()
+    from django.conf import settings
+    settings.ALLOWED_HOSTS = ['testserver']
+    user, context = _in_process_context()
+    requests = plan(args.requests, context)
+    runner = run_wsgi if args.child == 'wsgi' else run_asgi
+    print(json.dumps(runner(args.concurrency, requests, user)))
+
+
+def run_in_process(args):
+    print(f'{args.concurrency} concurrent clients x {args.requests} requests '
+          f"({', '.join(f'{name} {int(weight * 100)}%' for name, weight in MIX)})\n")
+    for mode in ('wsgi', 'asgi'):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, OBE_DB_ENGINE='sqlite', OBE_DB_NAME=str(Path(tmp) / 'load.sqlite3'))
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', mode,
+                 '--concurrency', str(args.concurrency), '--requests', str(args.requests)],
+                env=env, capture_output=True, text=True, check=True,
+            ).stdout
+        print_summary(mode, json.loads(output.strip().splitlines()[-1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--in-process', action='store_true')
+    parser.add_argument('--url', help='Base URL of a running server')
+    parser.add_argument('--cookie', help='Cookie header of a logged-in faculty session')
+    parser.add_argument('--section', type=int, help='Section id the requests target')
+    parser.add_argument('--students', type=int, nargs='*', help='Student ids enrolled in the section')
+    parser.add_argument('--items', type=int, nargs='*', help='Assessment item ids of the section')
+    parser.add_argument('--sessions', type=int, nargs='*', help='Session ids of the section')
+    parser.add_argument('--child', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_in_process_child(args)
+    elif args.in_process:
+        run_in_process(args)
+    elif args.url and args.section:
+        run_http(args)
+    else:
+        parser.error('use --in-process, or --url with --section')
+
+
+if __name__ == '__main__':
+    main()
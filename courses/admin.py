@@ -2,21 +2,38 @@ from django.contrib import admin
 from .models import (
     Course, CLO, Section, Student, Enrollment,
     AssessmentTemplate, AssessmentItem, AssessmentItemGroup, AssessmentMark, Attainment,
-    ProjectGroup, Session, Attendance
+    ProjectGroup, ProjectGroupEnrollment, Session, Attendance, SyncOperation, SectionRollup,
+    AttainmentPolicy, SectionCLOAttainment, SectionChange, ChangeCheckpoint
 )
 
 @admin.register(AssessmentTemplate)
 class AssessmentTemplateAdmin(admin.ModelAdmin):
-    list_display = ('section', 'get_total_marks')
+    list_display = ('section', 'total_marks')
     list_filter = ('section__course', 'section__semester', 'section__year')
+    list_select_related = ('section__course',)
     search_fields = ('section__course__code', 'section__name')
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_total_marks()
+
+    @admin.display(description='Total marks', ordering='total_marks')
+    def total_marks(self, obj):
+        return obj.total_marks
+
 @admin.register(AssessmentItemGroup)
 class AssessmentItemGroupAdmin(admin.ModelAdmin):
-    list_display = ('name', 'template', 'max_count', 'get_total_marks')
+    list_display = ('name', 'template', 'max_count', 'total_marks')
     list_filter = ('template__section__course', 'template__section__semester')
+    list_select_related = ('template__section__course',)
     search_fields = ('name', 'template__section__course__code')
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_total_marks()
+
+    @admin.display(description='Total marks', ordering='total_marks')
+    def total_marks(self, obj):
+        return obj.total_marks
+
 @admin.register(AssessmentItem)
 class AssessmentItemAdmin(admin.ModelAdmin):
     list_display = ('name', 'template', 'group', 'max_marks')
@@ -26,7 +43,7 @@ class AssessmentItemAdmin(admin.ModelAdmin):
 @admin.register(AssessmentMark)
 class AssessmentMarkAdmin(admin.ModelAdmin):
     list_display = ('student', 'assessment_item', 'marks')
-    list_filter = ('assessment_item__template__section__course', 'assessment_item__template__section__semester')
+    list_filter = ('section__course', 'section__semester')
     search_fields = ('student__student_id', 'student__name', 'assessment_item__name')
 
 @admin.register(Attainment)
@@ -35,11 +52,26 @@ class AttainmentAdmin(admin.ModelAdmin):
     list_filter = ('clo__course', 'section__semester', 'section__year')
     search_fields = ('student__student_id', 'student__name', 'clo__code')
 
+class ProjectGroupEnrollmentInline(admin.TabularInline):
+    model = ProjectGroupEnrollment
+    fields = ('student',)
+    raw_id_fields = ('student',)
+    extra = 0
+
 @admin.register(ProjectGroup)
 class ProjectGroupAdmin(admin.ModelAdmin):
     list_display = ('section', 'group_sl', 'project_name')
     list_filter = ('section__course', 'section__semester', 'section__year')
     search_fields = ('project_name', 'section__course__code')
+    inlines = [ProjectGroupEnrollmentInline]
+
+    def save_formset(self, request, form, formset, change):
+        # Memberships carry the group's section (see ProjectGroupEnrollment.section)
+        for membership in formset.save(commit=False):
+            membership.section_id = form.instance.section_id
+            membership.save()
+        for membership in formset.deleted_objects:
+            membership.delete()
 
 @admin.register(Session)
 class SessionAdmin(admin.ModelAdmin):
@@ -50,8 +82,8 @@ class SessionAdmin(admin.ModelAdmin):
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ('student', 'session', 'is_present')
-    list_filter = ('session__section__course', 'session__section__semester', 'is_present')
-    search_fields = ('student__student_id', 'student__name', 'session__section__course__code')
+    list_filter = ('section__course', 'section__semester', 'is_present')
+    search_fields = ('student__student_id', 'student__name', 'section__course__code')
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
@@ -92,3 +124,36 @@ class EnrollmentAdmin(admin.ModelAdmin):
     list_display = ('student', 'section', 'enrollment_type')
     list_filter = ('section__course', 'section__semester', 'enrollment_type')
     search_fields = ('student__student_id', 'student__name', 'section__course__code')
+
+@admin.register(SyncOperation)
+class SyncOperationAdmin(admin.ModelAdmin):
+    list_display = ('op_id', 'section', 'user', 'kind', 'outcome', 'client_timestamp', 'received_at')
+    list_filter = ('kind', 'outcome', 'section__course')
+    search_fields = ('op_id', 'user__username')
+
+@admin.register(SectionRollup)
+class SectionRollupAdmin(admin.ModelAdmin):
+    list_display = ('section', 'program', 'year', 'semester', 'enrollment_count', 'attendance_rate', 'built_at')
+    list_filter = ('department', 'program', 'year', 'semester')
+    list_select_related = ('section__course', 'program')
+
+@admin.register(AttainmentPolicy)
+class AttainmentPolicyAdmin(admin.ModelAdmin):
+    list_display = ('course', 'assessment_weight', 'midterm_weight', 'final_weight', 'threshold', 'updated_at')
+    search_fields = ('course__code', 'course__title')
+
+@admin.register(SectionCLOAttainment)
+class SectionCLOAttainmentAdmin(admin.ModelAdmin):
+    list_display = ('section', 'clo', 'students', 'attained', 'pass_rate', 'threshold', 'computed_at')
+    list_filter = ('section__course', 'section__semester', 'section__year')
+    list_select_related = ('section__course', 'clo__course')
+
+@admin.register(SectionChange)
+class SectionChangeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'entity', 'section_id', 'changed_at')
+    list_filter = ('entity',)
+    search_fields = ('section_id',)
+
+@admin.register(ChangeCheckpoint)
+class ChangeCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('consumer', 'last_id', 'updated_at')
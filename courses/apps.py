@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class CoursesConfig(AppConfig):
     name = 'courses'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from obe.db import configure_connection
+        from . import signals  # noqa: F401
+
+        connection_created.connect(configure_connection, dispatch_uid='obe.db.configure_connection')
@@ -0,0 +1,219 @@
+"""
+CLO attainment under the course's AttainmentPolicy.
+
+A student's score on a CLO is the weighted mean, over the assessment types
+that assess the CLO, of their marks on the type's graded items as a
+fraction of those items' maximum marks:
+
+    score = sum(w[type] * earned[type] / possible[type]) / sum(w[type])  * 100
+
+Only the items that count towards a total take part: a group's items
+beyond its ``max_count`` are dropped.  Scores are rounded to the two
+decimals ``Attainment`` stores, and a student attains the CLO with a score
+at or above the policy's threshold.
+
+This is the one definition of attainment in the app: the PLO matrix
+(courses.reports), the CLO trends (courses.trends) and the dashboard
+rollups (courses.rollups) read the stored ``Attainment`` rows and the
+course thresholds (``thresholds()``) rather than scoring marks themselves.
+
+``compute(matrix, policy)`` works on a section's ``ScoreMatrix`` and scores
+every student on every CLO at once: the items are folded into per-type,
+per-CLO totals with two tensor contractions, so there is no loop over
+students, items or CLOs.  ``recompute_attainment()`` stores the results,
+one ``Attainment`` row per student and CLO and one ``SectionCLOAttainment``
+row per CLO, for the sections whose marks, items, enrollments, CLOs or
+policy changed since they were last computed.  Changes are read from the
+change feed (courses.changes), whose rows carry the server's time: the
+``updated_at`` of a synced mark is the client's edit time, and queryset
+updates don't touch it at all.  ``recompute_changed()`` consumes the feed
+instead, for the periodic job.
+"""
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from obe.cache import bump, rollup_key
+from . import changes
+from .analytics import ScoreMatrix, np
+from .models import (
+    AssessmentItem, Attainment, AttainmentPolicy, Section, SectionChange, SectionCLOAttainment,
+)
+
+
+@dataclass
+class SectionResult:
+    clo_ids: list          # the columns of ``scores``
+    scores: object         # students × CLOs, percent, NaN where unscored
+    students: object       # per CLO: students with a score
+    attained: object       # per CLO: students at or above the threshold
+    mean: object           # per CLO, NaN if nobody was scored
+    threshold: float
+
+    @property
+    def pass_rate(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.attained / self.students * 100
+
+
+def policy_for(course_id, policies=None):
+    """The course's policy, or an unsaved one with the default weights."""
+    if policies is None:
+        policies = {policy.course_id: policy for policy in AttainmentPolicy.objects.filter(course_id=course_id)}
+    return policies.get(course_id) or AttainmentPolicy(course_id=course_id)
+
+
+def thresholds(course_ids):
+    """{course id: attainment threshold} for ``course_ids``, defaults included."""
+    policies = {policy.course_id: policy for policy in AttainmentPolicy.objects.filter(course_id__in=course_ids)}
+    return {course_id: policy_for(course_id, policies).threshold for course_id in course_ids}
+
+
+def compute(matrix, policy):
+    """Score every student of ``matrix`` on every CLO its items assess."""
+    weights = policy.weights()
+    types = list(weights)
+    clo_ids = sorted({item[4] for item in matrix.items})
+    clo_index = {clo: index for index, clo in enumerate(clo_ids)}
+
+    # fold[t, i, c] = 1 when item i is of type t and assesses CLO c
+    fold = np.zeros((len(types), len(matrix.items), len(clo_ids)))
+    for index, (_, _, kind, _, clo) in enumerate(matrix.items):
+        if kind in weights:
+            fold[types.index(kind), index, clo_index[clo]] = 1
+
+    marks = np.where(matrix.graded, matrix.scores, 0.0)
+    earned = np.einsum('si,tic->tsc', marks, fold)
+    possible = np.einsum('si,tic->tsc', matrix.graded.astype(float), fold * matrix.max_marks[None, :, None])
+    assessed = possible > 0
+    weight = np.array([weights[kind] for kind in types], dtype=float)[:, None, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(assessed, earned / possible, 0.0)
+        weight_total = (weight * assessed).sum(axis=0)
+        scores = np.where(weight_total > 0, (weight * ratio).sum(axis=0) / weight_total * 100, np.nan)
+    scores = np.round(scores, 2)
+
+    scored = ~np.isnan(scores)
+    students = scored.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(scored, scores, 0.0).sum(axis=0) / students
+    attained = (np.where(scored, scores, -1.0) >= policy.threshold).sum(axis=0)
+    return SectionResult(clo_ids, scores, students, attained, mean, policy.threshold)
+
+
+def _number(value):
+    value = float(value)
+    return None if value != value else value
+
+
+def save(section, matrix, result, computed_at):
+    """Replace the section's Attainment and SectionCLOAttainment rows with ``result``."""
+    attainments = [
+        Attainment(student_id=student[0], clo_id=clo, section=section,
+                   attainment_value=float(result.scores[row, column]),
+                   semester=section.semester, year=section.year)
+        for row, student in enumerate(matrix.students)
+        for column, clo in enumerate(result.clo_ids)
+        if not np.isnan(result.scores[row, column])
+    ]
+    pass_rate = result.pass_rate
+    summaries = [
+        SectionCLOAttainment(
+            section=section, clo_id=clo, students=int(result.students[column]),
+            attained=int(result.attained[column]), mean=_number(result.mean[column]),
+            pass_rate=_number(pass_rate[column]), threshold=result.threshold, computed_at=computed_at,
+        )
+        for column, clo in enumerate(result.clo_ids)
+    ]
+    with transaction.atomic():
+        Attainment.objects.filter(section=section).delete()
+        SectionCLOAttainment.objects.filter(section=section).delete()
+        Attainment.objects.bulk_create(attainments, batch_size=500)
+        SectionCLOAttainment.objects.bulk_create(summaries)
+
+
+def stale_sections(sections=None):
+    """
+    Ids of the sections (default: all) with a change in the feed after their
+    attainment was last computed, or that have items but were never computed.
+    """
+    feed = SectionChange.objects.filter(entity__in=changes.CONSUMERS[changes.ATTAINMENT])
+    items = AssessmentItem.objects.all()
+    computed = SectionCLOAttainment.objects.all()
+    if sections is not None:
+        section_ids = list(sections.values_list('pk', flat=True))
+        feed = feed.filter(section_id__in=section_ids)
+        items = items.filter(template__section_id__in=section_ids)
+        computed = computed.filter(section_id__in=section_ids)
+
+    built = dict(computed.values_list('section_id').annotate(Min('computed_at')).order_by())
+    stale = set(items.values_list('template__section_id', flat=True).distinct().order_by()) - built.keys()
+    for section_id, when in feed.values_list('section_id').annotate(Max('changed_at')).order_by():
+        if section_id in built and when > built[section_id]:
+            stale.add(section_id)
+    return sorted(stale)
+
+
+def recompute_attainment(sections=None, force=False):
+    """
+    Recompute the attainment of ``sections`` (default: all) that are stale,
+    or of all of them with ``force``; returns the ids recomputed.
+    """
+    if force:
+        queryset = Section.objects.all() if sections is None else sections
+        section_ids = list(queryset.values_list('pk', flat=True))
+    else:
+        section_ids = stale_sections(sections)
+    targets = list(Section.objects.filter(pk__in=section_ids))
+    policies = {
+        policy.course_id: policy
+        for policy in AttainmentPolicy.objects.filter(course_id__in={section.course_id for section in targets})
+    }
+    computed_at = timezone.now()
+    for section in targets:
+        matrix = ScoreMatrix.for_section(section, counted_only=True)
+        save(section, matrix, compute(matrix, policy_for(section.course_id, policies)), computed_at)
+    if targets:
+        bump(rollup_key())    # the PLO matrix is cached on it
+    return [section.pk for section in targets]
+
+
+def recompute_changed():
+    """Recompute the sections with changes in the feed since the last call; returns their ids."""
+    with changes.consume(changes.ATTAINMENT) as section_ids:
+        return recompute_attainment(Section.objects.filter(pk__in=section_ids), force=True)
+
+
+def section_attainment(section):
+    """The section's stored attainment, JSON-ready (recomputed first if stale)."""
+    if stale_sections(Section.objects.filter(pk=section.pk)):
+        recompute_attainment(Section.objects.filter(pk=section.pk), force=True)
+    policy = policy_for(section.course_id)
+    summaries = list(SectionCLOAttainment.objects.filter(section=section)
+                     .select_related('clo__plo').order_by('clo__sl'))
+    clo_codes = {summary.clo_id: summary.clo.get_clo_code() for summary in summaries}
+    students = {}
+    for student_id, name, clo_id, value in (
+            Attainment.objects.filter(section=section).order_by('student__student_id')
+            .values_list('student__student_id', 'student__name', 'clo_id', 'attainment_value')):
+        entry = students.setdefault(student_id, {'student_id': student_id, 'name': name, 'scores': {}})
+        entry['scores'][clo_codes.get(clo_id, clo_id)] = float(value)
+    return {
+        'threshold': policy.threshold,
+        'weights': policy.weights(),
+        'computed_at': summaries[0].computed_at.isoformat() if summaries else None,
+        'clos': [
+            {
+                'code': clo_codes[summary.clo_id],
+                'plo': f'PLO{summary.clo.plo.numberic_sl}' if summary.clo.plo else None,
+                'students': summary.students,
+                'attained': summary.attained,
+                'pass_rate': summary.pass_rate,
+                'mean': summary.mean,
+            }
+            for summary in summaries
+        ],
+        'students': list(students.values()),
+    }
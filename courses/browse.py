@@ -0,0 +1,173 @@
+"""
+Shared section browsing: filters plus keyset pagination.
+
+Sections are listed in their natural order, newest term first
+(``-year, semester, name``, with ``id`` as a tie-breaker).  Instead of
+OFFSET paging, each page continues from the last row of the previous one, so
+the cost of a page depends on the page size and not on how many semesters of
+history the table holds.  ``section_browse_idx`` supports that order.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass, fields
+from typing import List, Optional
+
+from django.db.models import Q
+from django.utils.http import urlencode
+
+from .models import Course, Section
+
+DEFAULT_PAGE_SIZE = 24
+
+
+@dataclass
+class SectionFilter:
+    year: Optional[int] = None
+    semester: Optional[str] = None
+    program: Optional[int] = None
+    department: Optional[int] = None
+    faculty: Optional[int] = None
+
+    @classmethod
+    def from_request(cls, request):
+        """Build a filter from the query string, ignoring malformed values."""
+        values = {}
+        for field in fields(cls):
+            raw = request.GET.get(field.name, '').strip()
+            if not raw:
+                continue
+            if field.name == 'semester':
+                if raw in dict(Section.SEMESTER_CHOICES):
+                    values['semester'] = raw
+            elif raw.isdigit():
+                values[field.name] = int(raw)
+        return cls(**values)
+
+    def as_dict(self):
+        return {f.name: getattr(self, f.name) for f in fields(self) if getattr(self, f.name) is not None}
+
+    @property
+    def querystring(self):
+        return urlencode(self.as_dict())
+
+    def apply(self, queryset):
+        if self.year is not None:
+            queryset = queryset.filter(year=self.year)
+        if self.semester is not None:
+            queryset = queryset.filter(semester=self.semester)
+        if self.program is not None:
+            queryset = queryset.filter(course__program_id=self.program)
+        if self.department is not None:
+            queryset = queryset.filter(course__program__department_id=self.department)
+        if self.faculty is not None:
+            queryset = queryset.filter(faculties__id=self.faculty)
+        return queryset
+
+
+@dataclass
+class SectionPage:
+    sections: List[Section]
+    filters: SectionFilter
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def __len__(self):
+        return len(self.sections)
+
+    @property
+    def has_other_pages(self):
+        return bool(self.next_cursor or self.previous_cursor)
+
+
+def encode_cursor(section):
+    raw = json.dumps([section.year, section.semester, section.name, section.pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (year, semester, name, id) or None for a missing/garbled cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        year, semester, name, pk = json.loads(raw)
+        return int(year), str(semester), str(name), int(pk)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+
+def _after(key):
+    year, semester, name, pk = key
+    return (Q(year__lt=year)
+            | Q(year=year, semester__gt=semester)
+            | Q(year=year, semester=semester, name__gt=name)
+            | Q(year=year, semester=semester, name=name, id__gt=pk))
+
+
+def _before(key):
+    year, semester, name, pk = key
+    return (Q(year__gt=year)
+            | Q(year=year, semester__lt=semester)
+            | Q(year=year, semester=semester, name__lt=name)
+            | Q(year=year, semester=semester, name=name, id__lt=pk))
+
+
+def browse_sections(queryset, filters, after=None, before=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return one SectionPage of ``queryset`` narrowed by ``filters``.
+
+    ``after``/``before`` are cursors taken from a previous page's
+    ``next_cursor``/``previous_cursor``; without either the first page is
+    returned.
+    """
+    queryset = filters.apply(queryset).select_related('course', 'primary_faculty', 'secondary_faculty')
+    after_key, before_key = decode_cursor(after), decode_cursor(before)
+
+    sections = None
+    if before_key is not None:
+        rows = list(queryset.filter(_before(before_key))
+                    .order_by('year', '-semester', '-name', '-id')[:limit + 1])
+        if len(rows) > limit:
+            sections = rows[:limit][::-1]
+            has_more_before, has_more_after = True, True
+        else:
+            # Stepped back onto the first page; serve it whole.
+            after_key = None
+    if sections is None:
+        forward = queryset if after_key is None else queryset.filter(_after(after_key))
+        rows = list(forward.order_by('-year', 'semester', 'name', 'id')[:limit + 1])
+        sections = rows[:limit]
+        has_more_before, has_more_after = after_key is not None, len(rows) > limit
+
+    return SectionPage(
+        sections=sections,
+        filters=filters,
+        next_cursor=encode_cursor(sections[-1]) if sections and has_more_after else None,
+        previous_cursor=encode_cursor(sections[0]) if sections and has_more_before else None,
+    )
+
+
+def browse_request(request, queryset, limit=DEFAULT_PAGE_SIZE):
+    """browse_sections() driven by the request's filter and cursor parameters."""
+    return browse_sections(
+        queryset,
+        SectionFilter.from_request(request),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        limit=limit,
+    )
+
+
+def courses_with_sections(queryset, filters):
+    """Courses that have at least one section in ``queryset`` matching ``filters``."""
+    section_courses = filters.apply(queryset).values('course_id')
+    return Course.objects.filter(id__in=section_courses).select_related('program')
+
+
+def available_years(queryset=None):
+    queryset = Section.objects.all() if queryset is None else queryset
+    return list(queryset.order_by('-year').values_list('year', flat=True).distinct())
@@ -0,0 +1,114 @@
+"""
+The section change feed.
+
+Every write to a section's marks, attendance, sessions, assessment items or
+groups, enrollments, or its course's CLOs or attainment policy appends a
+``SectionChange`` row (entity, section id, time).  The receivers in
+``courses.signals`` record single-row saves and deletes; the bulk writers
+that bypass them (offline sync, plan editing, setup cloning, the group
+views) call ``record()`` themselves, next to their ``invalidate_section``.
+
+Background jobs read the feed as named consumers, each with its own
+``ChangeCheckpoint``:
+
+    with consume(ATTAINMENT) as section_ids:
+        recompute_attainment(Section.objects.filter(pk__in=section_ids), force=True)
+
+The checkpoint only moves once the block has finished, so a job that fails
+sees the same sections again on its next run.  ``CONSUMERS`` lists which
+entities each job cares about; ``prune()`` drops the rows every consumer
+has read.
+
+Changes recorded inside a transaction are collected, one row per entity
+and section, and inserted once it commits (a rolled-back write records
+nothing, and a section delete that cascades to thousands of marks records
+one row, not thousands).  The insert is its own short transaction, so ids
+reach the feed nearly in commit order; a consumer still leaves the newest
+``SETTLE_SECONDS`` for its next run, so it never checkpoints past an insert
+that is about to commit with a lower id.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db.models import Max
+from django.utils import timezone
+
+from obe.transactions import collect
+
+from .models import ChangeCheckpoint, Section, SectionChange
+
+ATTAINMENT = 'attainment'
+ROLLUPS = 'rollups'
+CLO_TRENDS = 'clo_trends'
+CACHES = 'caches'
+
+CONSUMERS = {
+    ATTAINMENT: {SectionChange.MARK, SectionChange.ITEM, SectionChange.ENROLLMENT,
+                 SectionChange.CLO, SectionChange.POLICY},
+    ROLLUPS: {SectionChange.MARK, SectionChange.ATTENDANCE, SectionChange.SESSION, SectionChange.ITEM,
+              SectionChange.ITEM_GROUP, SectionChange.ENROLLMENT, SectionChange.CLO, SectionChange.POLICY},
+    CLO_TRENDS: {SectionChange.MARK, SectionChange.ITEM, SectionChange.ENROLLMENT, SectionChange.CLO,
+                 SectionChange.POLICY},
+    CACHES: {SectionChange.MARK, SectionChange.ITEM, SectionChange.ENROLLMENT},
+}
+
+SETTLE_SECONDS = 5
+
+
+def _insert(changes):
+    changed_at = timezone.now()
+    rows = [SectionChange(entity=entity, section_id=pk, changed_at=changed_at) for entity, pk in set(changes)]
+    if len(rows) == 1:
+        rows[0].save()    # a lone INSERT, without bulk_create's transaction around it
+    elif rows:
+        SectionChange.objects.bulk_create(rows)
+
+
+def record(entity, section_ids):
+    """Append one change of ``entity`` per section in ``section_ids``, once the transaction commits."""
+    collect('section_changes', [(entity, pk) for pk in section_ids], _insert)
+
+
+def record_course(entity, course_ids):
+    """Append one change of ``entity`` for every section of the courses."""
+    record(entity, Section.objects.filter(course_id__in=course_ids).values_list('pk', flat=True))
+
+
+def pending(consumer):
+    """
+    (section ids, last id): the sections with changes to the consumer's
+    entities since its checkpoint, and the id to checkpoint once they have
+    been processed.
+    """
+    last_id = ChangeCheckpoint.objects.filter(consumer=consumer).values_list('last_id', flat=True).first() or 0
+    settled = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    upto = SectionChange.objects.filter(
+        pk__gt=last_id, changed_at__lte=settled).aggregate(upto=Max('pk'))['upto']
+    if upto is None:
+        return [], last_id
+    section_ids = (SectionChange.objects
+                   .filter(pk__gt=last_id, pk__lte=upto, entity__in=CONSUMERS[consumer])
+                   .values_list('section_id', flat=True).distinct().order_by('section_id'))
+    return list(section_ids), upto
+
+
+def checkpoint(consumer, last_id):
+    ChangeCheckpoint.objects.update_or_create(consumer=consumer, defaults={'last_id': last_id})
+
+
+@contextmanager
+def consume(consumer):
+    """Yield the consumer's pending section ids; checkpoint them if the block succeeds."""
+    section_ids, upto = pending(consumer)
+    yield section_ids
+    checkpoint(consumer, upto)
+
+
+def prune():
+    """Delete the rows every consumer has read; returns how many."""
+    checkpoints = dict(ChangeCheckpoint.objects.values_list('consumer', 'last_id'))
+    if CONSUMERS.keys() - checkpoints.keys():
+        return 0    # a consumer that never ran still needs the whole feed
+    read = min(checkpoints[consumer] for consumer in CONSUMERS)
+    deleted, _ = SectionChange.objects.filter(pk__lte=read).delete()
+    return deleted
@@ -0,0 +1,181 @@
+"""
+Copying a section's setup onto other sections.
+
+``clone_setup(source, targets)`` copies the source section's assessment
+template (items and groups), its session schedule and ``total_classes`` onto
+every target section.  All targets are written together: one bulk insert
+per table, with the group, CLO and template foreign keys remapped in memory.
+
+Targets of another course get the source CLOs matched by serial number;
+CLOs the target course doesn't have yet are created from the source ones.
+With ``start_date`` the schedule is shifted so its first session falls on
+that date (for a new semester), and sessions that land on a holiday are
+flagged as holidays.
+
+A target that already has assessment items or sessions keeps them unless
+``replace`` is set; that part of its setup is skipped and reported.
+"""
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from accounts.models import Holiday
+from obe.cache import invalidate_section
+from . import changes
+from .models import (
+    CLO, AssessmentItem, AssessmentItemGroup, AssessmentTemplate, Section, SectionChange, Session,
+)
+
+
+@dataclass
+class CloneResult:
+    section: Section
+    items: int = 0
+    groups: int = 0
+    sessions: int = 0
+    skipped: list = field(default_factory=list)
+
+    def __str__(self):
+        copied = f'{self.items} items, {self.groups} groups, {self.sessions} sessions'
+        if self.skipped:
+            copied += f" (kept existing {' and '.join(self.skipped)})"
+        return f'{self.section}: {copied}'
+
+
+def _clo_maps(source, targets):
+    """{course id: {source CLO id: target CLO id}}, creating missing CLOs."""
+    source_clos = list(CLO.objects.filter(course_id=source.course_id))
+    other_courses = {target.course_id for target in targets} - {source.course_id}
+    maps = {source.course_id: {clo.id: clo.id for clo in source_clos}}
+    if not other_courses:
+        return maps
+
+    by_sl = {}
+    for clo in CLO.objects.filter(course_id__in=other_courses):
+        by_sl[clo.course_id, clo.sl] = clo
+    missing = [
+        CLO(course_id=course_id, sl=clo.sl, plo_id=clo.plo_id, description=clo.description)
+        for course_id in other_courses for clo in source_clos
+        if (course_id, clo.sl) not in by_sl
+    ]
+    CLO.objects.bulk_create(missing)
+    if missing:
+        changes.record_course(SectionChange.CLO, {clo.course_id for clo in missing})
+    for clo in missing:
+        by_sl[clo.course_id, clo.sl] = clo
+    for course_id in other_courses:
+        maps[course_id] = {clo.id: by_sl[course_id, clo.sl].id for clo in source_clos}
+    return maps
+
+
+def _schedule(source_sessions, start_date):
+    """(session_number, date, is_holiday) of the cloned schedule."""
+    if start_date is None or not source_sessions:
+        return [(s.session_number, s.date, s.is_holiday) for s in source_sessions]
+    shift = start_date - source_sessions[0].date
+    holidays = [(start, end or start) for start, end in Holiday.objects.values_list('start_date', 'end_date')]
+    return [
+        (s.session_number, s.date + shift, any(start <= s.date + shift <= end for start, end in holidays))
+        for s in source_sessions
+    ]
+
+
+def clone_setup(source, targets, start_date=None, replace=False):
+    """Copy ``source``'s assessment plan and schedule onto ``targets``; returns CloneResults."""
+    targets = [target for target in targets if target.pk != source.pk]
+    if not targets:
+        return []
+    results = {target.pk: CloneResult(target) for target in targets}
+    target_ids = list(results)
+
+    source_groups = list(AssessmentItemGroup.objects.filter(template__section=source).order_by('id'))
+    source_items = list(AssessmentItem.objects.filter(template__section=source).order_by('id'))
+    source_sessions = list(Session.objects.filter(section=source).order_by('session_number'))
+    schedule = _schedule(source_sessions, start_date)
+
+    with transaction.atomic():
+        clo_maps = _clo_maps(source, targets)
+
+        templates = {t.section_id: t for t in AssessmentTemplate.objects.filter(section_id__in=target_ids)}
+        new_templates = [AssessmentTemplate(section_id=pk) for pk in target_ids if pk not in templates]
+        AssessmentTemplate.objects.bulk_create(new_templates)
+        templates.update((t.section_id, t) for t in new_templates)
+
+        planned = set(AssessmentItem.objects.filter(template__section_id__in=target_ids)
+                      .values_list('template__section_id', flat=True).distinct())
+        planned |= set(AssessmentItemGroup.objects.filter(template__section_id__in=target_ids)
+                       .values_list('template__section_id', flat=True).distinct())
+        scheduled = set(Session.objects.filter(section_id__in=target_ids)
+                        .values_list('section_id', flat=True).distinct())
+        # Only the parts the source has replace anything on a target.
+        if not (source_items or source_groups):
+            planned = set()
+        if not schedule:
+            scheduled = set()
+        if replace:
+            # Marks and attendance of the replaced rows go with them.
+            AssessmentItem.objects.filter(template__section_id__in=planned).delete()
+            AssessmentItemGroup.objects.filter(template__section_id__in=planned).delete()
+            Session.objects.filter(section_id__in=scheduled).delete()
+            planned = scheduled = set()
+
+        plan_targets = [target for target in targets if target.pk not in planned]
+        schedule_targets = [target for target in targets if target.pk not in scheduled] if schedule else []
+        for target in targets:
+            if target.pk in planned:
+                results[target.pk].skipped.append('assessment plan')
+            if target.pk in scheduled:
+                results[target.pk].skipped.append('sessions')
+
+        groups = {}
+        for target in plan_targets:
+            clo_map = clo_maps[target.course_id]
+            template = templates[target.pk]
+            for group in source_groups:
+                groups[target.pk, group.id] = AssessmentItemGroup(
+                    template=template, name=group.name, max_count=group.max_count,
+                    clo_id=clo_map[group.clo_id], totalmarks=group.totalmarks,
+                )
+            results[target.pk].groups = len(source_groups)
+        AssessmentItemGroup.objects.bulk_create(groups.values())
+
+        items = []
+        for target in plan_targets:
+            clo_map = clo_maps[target.course_id]
+            template = templates[target.pk]
+            for item in source_items:
+                group = groups[target.pk, item.group_id] if item.group_id else None
+                items.append(AssessmentItem(
+                    template=template, group=group, name=item.name,
+                    assessment_type=item.assessment_type, clo_id=clo_map[item.clo_id],
+                    max_marks=item.max_marks, in_group=group is not None,
+                ))
+            results[target.pk].items = len(source_items)
+        AssessmentItem.objects.bulk_create(items, batch_size=500)
+
+        sessions = []
+        for target in schedule_targets:
+            sessions += [
+                Session(section=target, session_number=number, date=date, is_holiday=is_holiday)
+                for number, date, is_holiday in schedule
+            ]
+            results[target.pk].sessions = len(schedule)
+            target.total_classes = source.total_classes
+        Session.objects.bulk_create(sessions, batch_size=500)
+        Section.objects.bulk_update(schedule_targets, ['total_classes'])
+        if items:
+            changes.record(SectionChange.ITEM, [target.pk for target in plan_targets])
+        if groups:
+            changes.record(SectionChange.ITEM_GROUP, [target.pk for target in plan_targets])
+        if sessions:
+            changes.record(SectionChange.SESSION, [target.pk for target in schedule_targets])
+
+    # bulk writes bypass the post_save receivers
+    for pk in target_ids:
+        invalidate_section(pk)
+    return list(results.values())
+
+
+def sections_for_term(course, year, semester):
+    """Every section of ``course`` in the given term."""
+    return list(Section.objects.filter(course=course, year=year, semester=semester).select_related('course'))
@@ -0,0 +1,125 @@
+"""
+Tiles of the program dashboard.
+
+Every tile reads only ``SectionRollup`` rows (see courses.rollups) for one
+scope, a department and/or program, and is cached on its own until the
+rollups are rebuilt or a program, department or PLO changes.  A department
+with thousands of sections therefore renders from the cache, and a cold
+tile costs one or two queries over the rollup table.
+"""
+from django.db.models import Avg, Count, F, Max, Q, Sum
+
+from obe.cache import cache_fragment, program_key, rollup_key
+from programs.models import PLO
+from .models import SectionRollup
+from .rollups import BAND_LABELS
+
+TILE_TIMEOUT = 60 * 60
+LIST_LIMIT = 10
+
+# Spring comes before Fall in the academic year.
+SEMESTER_ORDER = {'Spring': 0, 'Fall': 1}
+
+
+def _tile_dependencies(*args, **kwargs):
+    return [rollup_key(), program_key()]
+
+
+def _scoped(department, program):
+    rollups = SectionRollup.objects.all()
+    if department is not None:
+        rollups = rollups.filter(department_id=department)
+    if program is not None:
+        rollups = rollups.filter(program_id=program)
+    return rollups
+
+
+def _percentages(counts):
+    total = sum(counts)
+    return [
+        {'label': label, 'count': count, 'percent': count * 100 / total if total else 0}
+        for label, count in zip(BAND_LABELS, counts)
+    ]
+
+
+@cache_fragment(_tile_dependencies, timeout=TILE_TIMEOUT)
+def term_tile(department, program):
+    """Sections, enrollment, attendance and plan completeness per term, latest first."""
+    rows = list(
+        _scoped(department, program).values('year', 'semester').annotate(
+            sections=Count('pk'),
+            students=Sum('enrollment_count'),
+            backlog=Sum('backlog_count'),
+            attendance=Avg('attendance_rate'),
+            complete_plans=Count('pk', filter=Q(clo_count__gt=0, planned_clo_count=F('clo_count'))),
+            published=Count('pk', filter=Q(is_published=True)),
+            built_at=Max('built_at'),
+        ).order_by()
+    )
+    rows.sort(key=lambda row: (row['year'], SEMESTER_ORDER.get(row['semester'], 0)), reverse=True)
+    for row in rows:
+        row['term'] = f"{row['semester']} {row['year']}"
+        row['plan_percent'] = row['complete_plans'] * 100 / row['sections']
+    return rows
+
+
+@cache_fragment(_tile_dependencies, timeout=TILE_TIMEOUT)
+def plan_tile(department, program, year, semester):
+    """Sections of the term whose assessment plan doesn't cover every CLO yet."""
+    incomplete = (_scoped(department, program).filter(year=year, semester=semester)
+                  .exclude(clo_count__gt=0, planned_clo_count=F('clo_count')))
+    return {
+        'count': incomplete.count(),
+        'sections': [
+            {
+                'section_id': rollup.section_id,
+                'label': f'{rollup.section.course.code} {rollup.section.name}',
+                'planned_clos': rollup.planned_clo_count,
+                'clos': rollup.clo_count,
+                'items': rollup.item_count,
+            }
+            for rollup in incomplete.select_related('section__course')
+            .order_by('planned_clo_count', 'section__course__code', 'section__name')[:LIST_LIMIT]
+        ],
+    }
+
+
+@cache_fragment(_tile_dependencies, timeout=TILE_TIMEOUT)
+def attendance_tile(department, program, year, semester):
+    """The term's sections with the lowest attendance rates."""
+    return [
+        {
+            'section_id': rollup.section_id,
+            'label': f'{rollup.section.course.code} {rollup.section.name}',
+            'rate': rollup.attendance_rate,
+            'held': rollup.held_session_count,
+            'sessions': rollup.session_count,
+        }
+        for rollup in _scoped(department, program)
+        .filter(year=year, semester=semester, attendance_rate__isnull=False)
+        .select_related('section__course').order_by('attendance_rate')[:LIST_LIMIT]
+    ]
+
+
+@cache_fragment(_tile_dependencies, timeout=TILE_TIMEOUT)
+def attainment_tile(department, program, year, semester):
+    """Students per attainment band, over all CLOs and per PLO, for the term."""
+    clo_counts = [0] * len(BAND_LABELS)
+    plo_counts = {}
+    rows = (_scoped(department, program).filter(year=year, semester=semester)
+            .values_list('clo_attainment', 'plo_attainment'))
+    for clos, plos in rows:
+        for counts in clos.values():
+            clo_counts = [a + b for a, b in zip(clo_counts, counts)]
+        for plo, counts in plos.items():
+            total = plo_counts.setdefault(int(plo), [0] * len(BAND_LABELS))
+            plo_counts[int(plo)] = [a + b for a, b in zip(total, counts)]
+    labels = dict(PLO.objects.filter(numberic_sl__in=plo_counts).values_list('numberic_sl', 'alphabatic_sl'))
+    return {
+        'clos': _percentages(clo_counts),
+        'clo_students': sum(clo_counts),
+        'plos': [
+            {'sl': sl, 'code': f'PLO{sl}', 'label': labels.get(sl, ''), 'bands': _percentages(counts)}
+            for sl, counts in sorted(plo_counts.items())
+        ],
+    }
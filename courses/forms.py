@@ -179,4 +179,31 @@ class CLOForm(forms.ModelForm):
                 existing_clo = existing_clo.exclude(pk=self.instance.pk)
             if existing_clo.exists():
                 raise forms.ValidationError(f'CLO with serial number {sl} already exists for this course.')
-        return sl 
\ No newline at end of file
+        return sl
+
+
+class CloneSetupForm(forms.Form):
+    targets = forms.ModelMultipleChoiceField(
+        queryset=Section.objects.none(),
+        widget=forms.CheckboxSelectMultiple,
+        label='Copy to sections',
+    )
+    start_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        help_text='First session date in the target term. Leave empty to keep the same dates.',
+    )
+    replace = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        label='Replace existing assessments and sessions (their marks and attendance are deleted)',
+    )
+
+    def __init__(self, *args, **kwargs):
+        source = kwargs.pop('source')
+        user = kwargs.pop('user')
+        super().__init__(*args, **kwargs)
+        targets = Section.objects.filter(course=source.course).exclude(pk=source.pk).select_related('course')
+        if not user.is_superuser:
+            targets = targets.filter(faculties=user.faculty)
+        self.fields['targets'].queryset = targets
@@ -0,0 +1,238 @@
+"""
+Forming a section's project groups automatically.
+
+``form_groups(section, ...)`` splits the section's enrolled students into
+groups of (nearly) equal size and saves them, groups and memberships, with
+two bulk inserts.  Optional constraints:
+
+``keep_together``
+    Pairs of student ids (``Student.student_id``) that must share a group.
+``balance_attainment``
+    Even out each group's mean prior CLO attainment (the student's average
+    ``Attainment`` in other sections; students without one count as average).
+``spread_backlog``
+    Spread backlog students evenly over the groups.
+
+The assignment is computed by ``plan_groups``: students (or keep-together
+units) are placed greedily, largest unit first, then a local search swaps
+equal-sized units between groups while that lowers the imbalance.  For a
+120-student lab this takes about a tenth of a second.
+"""
+import math
+import random
+
+from django.db import transaction
+from django.db.models import Avg, Max
+
+from obe.cache import invalidate_section
+from .models import Attainment, Enrollment, ProjectGroup, ProjectGroupEnrollment
+
+
+class GroupingError(ValueError):
+    """The requested grouping can't be formed; the message is shown to the user."""
+
+
+class Unit:
+    """Students that are placed together: one student, or a keep-together set."""
+    __slots__ = ('students', 'score', 'backlog')
+
+    def __init__(self, students, score, backlog):
+        self.students = students
+        self.score = score
+        self.backlog = backlog
+
+    def __len__(self):
+        return len(self.students)
+
+
+class _Group:
+    __slots__ = ('units', 'capacity', 'size', 'score', 'backlog')
+
+    def __init__(self, capacity):
+        self.units = []
+        self.capacity = capacity
+        self.size = 0
+        self.score = 0.0
+        self.backlog = 0
+
+    def add(self, unit):
+        self.units.append(unit)
+        self.size += len(unit)
+        self.score += unit.score
+        self.backlog += unit.backlog
+
+    def remove(self, unit):
+        self.units.remove(unit)
+        self.size -= len(unit)
+        self.score -= unit.score
+        self.backlog -= unit.backlog
+
+
+def _units(students, pairs):
+    """Merge keep-together pairs (union-find) into Units."""
+    parent = {student: student for student in students}
+
+    def root(student):
+        while parent[student] != student:
+            parent[student] = parent[parent[student]]
+            student = parent[student]
+        return student
+
+    for a, b in pairs:
+        if a in parent and b in parent:
+            parent[root(a)] = root(b)
+    members = {}
+    for student in students:
+        members.setdefault(root(student), []).append(student)
+    return [
+        Unit(group, sum(students[s][0] for s in group), sum(students[s][1] for s in group))
+        for group in members.values()
+    ]
+
+
+def _cost(group, score_weight, backlog_weight, mean_score, mean_backlog):
+    """How far a group is from the section's mean score and backlog share."""
+    if not group.size:
+        return 0.0
+    return (score_weight * (group.score / group.size - mean_score) ** 2
+            + backlog_weight * (group.backlog - mean_backlog * group.size) ** 2)
+
+
+def _swap(first, a, second, b):
+    first.remove(a)
+    second.remove(b)
+    first.add(b)
+    second.add(a)
+
+
+def plan_groups(students, group_count, pairs=(), balance_attainment=True, spread_backlog=True,
+                iterations=20000, patience=2000, seed=0):
+    """
+    Split ``students`` ({key: (score, is_backlog)}) into ``group_count`` groups.
+
+    Returns a list of lists of student keys.  Group sizes differ by at most
+    one, except where a keep-together unit makes that impossible.
+    """
+    if not students:
+        return []
+    if not 0 < group_count <= len(students):
+        raise GroupingError('The number of groups must be between 1 and the number of students.')
+    units = _units(students, pairs)
+    base, extra = divmod(len(students), group_count)
+    capacities = [base + 1 if index < extra else base for index in range(group_count)]
+    if max(len(unit) for unit in units) > capacities[0]:
+        raise GroupingError(f'Students kept together form a set larger than a group ({capacities[0]}).')
+
+    mean_score = sum(score for score, _ in students.values()) / len(students)
+    variance = sum((score - mean_score) ** 2 for score, _ in students.values()) / len(students)
+    # Scores are compared in standard deviations, so they weigh about as
+    # much as a backlog student too many or too few.
+    score_weight = 1.0 / variance if balance_attainment and variance else 0.0
+    backlog_weight = 1.0 if spread_backlog else 0.0
+    mean_backlog = sum(bool(backlog) for _, backlog in students.values()) / len(students)
+
+    def cost(group):
+        return _cost(group, score_weight, backlog_weight, mean_score, mean_backlog)
+
+    # Greedy: largest units first, each to the group it unbalances least.
+    groups = [_Group(capacity) for capacity in capacities]
+    rng = random.Random(seed)
+    rng.shuffle(units)
+    units.sort(key=lambda unit: (-len(unit), -unit.backlog, -unit.score))
+    for unit in units:
+        best, best_key = None, None
+        for group in groups:
+            if group.size + len(unit) > group.capacity:
+                continue
+            before = cost(group)
+            group.add(unit)
+            # Least added imbalance first, then the group with the most room.
+            key = (round(cost(group) - before, 9), group.size - group.capacity)
+            group.remove(unit)
+            if best_key is None or key < best_key:
+                best, best_key = group, key
+        if best is None:
+            # Units that no longer fit anywhere exactly go to the emptiest group.
+            best = min(groups, key=lambda group: group.size)
+        best.add(unit)
+
+    # Local search: swap two equal-sized units between groups while it helps,
+    # until a long run of attempts finds nothing better.
+    if (score_weight or backlog_weight) and len(groups) > 1:
+        stale = 0
+        for _ in range(iterations):
+            if stale > patience:
+                break
+            stale += 1
+            first, second = rng.sample(groups, 2)
+            if not first.units or not second.units:
+                continue
+            a, b = rng.choice(first.units), rng.choice(second.units)
+            if len(a) != len(b) or (a.score == b.score and a.backlog == b.backlog):
+                continue
+            before = cost(first) + cost(second)
+            _swap(first, a, second, b)
+            if cost(first) + cost(second) < before - 1e-12:
+                stale = 0
+            else:
+                _swap(first, b, second, a)
+
+    return [[student for unit in group.units for student in unit.students] for group in groups]
+
+
+def prior_attainment(section, student_ids):
+    """{student id: mean attainment in other sections} for those who have one."""
+    rows = (Attainment.objects.filter(student_id__in=student_ids).exclude(section=section)
+            .values('student_id').annotate(mean=Avg('attainment_value')))
+    return {row['student_id']: float(row['mean']) for row in rows}
+
+
+def form_groups(section, group_size=None, group_count=None, keep_together=(), balance_attainment=False,
+                spread_backlog=True, replace=False, seed=0):
+    """
+    Group the section's students and save the groups; returns the new ProjectGroups.
+
+    Without ``replace`` only students who are not in a group yet are grouped,
+    into new groups numbered after the existing ones.  With ``replace`` the
+    existing groups are deleted first and every student is regrouped.
+    """
+    enrollments = list(Enrollment.objects.filter(section=section).values_list(
+        'student_id', 'student__student_id', 'enrollment_type'))
+    if replace:
+        grouped = set()
+    else:
+        grouped = set(ProjectGroupEnrollment.objects.filter(section=section).values_list('student_id', flat=True))
+    enrollments = [row for row in enrollments if row[0] not in grouped]
+    if not enrollments:
+        raise GroupingError('Every enrolled student is already in a group.')
+
+    if group_count is None:
+        if not group_size or group_size < 1:
+            raise GroupingError('Give a group size or a number of groups.')
+        group_count = math.ceil(len(enrollments) / group_size)
+
+    scores = prior_attainment(section, [row[0] for row in enrollments]) if balance_attainment else {}
+    default = sum(scores.values()) / len(scores) if scores else 0.0
+    students = {pk: (scores.get(pk, default), kind == 'Backlog') for pk, _, kind in enrollments}
+    by_code = {code: pk for pk, code, _ in enrollments}
+    pairs = [(by_code[a], by_code[b]) for a, b in keep_together if a in by_code and b in by_code]
+    assignment = plan_groups(students, group_count, pairs, balance_attainment=balance_attainment,
+                             spread_backlog=spread_backlog, seed=seed)
+
+    with transaction.atomic():
+        if replace:
+            ProjectGroup.objects.filter(section=section).delete()
+            first_sl = 1
+        else:
+            first_sl = (ProjectGroup.objects.filter(section=section).aggregate(Max('group_sl'))['group_sl__max'] or 0) + 1
+        groups = ProjectGroup.objects.bulk_create([
+            ProjectGroup(section=section, group_sl=first_sl + index, project_name='')
+            for index in range(len(assignment))
+        ])
+        ProjectGroupEnrollment.objects.bulk_create([
+            ProjectGroupEnrollment(project_group=group, student_id=student_id, section=section)
+            for group, members in zip(groups, assignment) for student_id in members
+        ])
+    # bulk writes bypass the post_save receivers
+    invalidate_section(section.id)
+    return groups
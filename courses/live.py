@@ -0,0 +1,258 @@
+"""
+Live updates for the section marks and attendance grids.
+
+Every open ``section_detail`` page holds a WebSocket to
+``/ws/sections/<id>/`` (routed in ``obe.asgi``).  When an AssessmentMark or
+Attendance row changes, the receivers in ``courses.signals`` publish a compact
+delta to that section's channel once the transaction commits, and every
+subscriber forwards it to its browser:
+
+    {"t": "m", "s": <student id>, "i": <item id>, "v": "7.50" | null}
+    {"t": "a", "s": <student id>, "n": <session id>, "p": true | false | null}
+    {"t": "b", "d": [<delta>, ...]}     # the deltas of one transaction
+    {"t": "r"}      # deltas were dropped; the page should resync
+
+A transaction's deltas go out as one message per section, keeping the last
+delta of each cell; more than ``BATCH_LIMIT`` cells (a cleared grid, a
+cascading delete) are sent as a resync instead.
+
+The channel layer is chosen with ``OBE_LIVE['BACKEND']``:
+
+``memory`` (default)
+    Subscribers live in this process.  Enough for a single ASGI worker.
+``redis``
+    Deltas go through Redis pub/sub, so they reach pages connected to any
+    worker.  Needs the ``redis`` package and a reachable ``REDIS_URL``; a
+    local redis-server is enough for development.
+"""
+import asyncio
+import json
+import logging
+import re
+import threading
+from http.cookies import SimpleCookie
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from obe.transactions import collect
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+except ImportError:  # optional dependency
+    redis = aioredis = None
+
+SECTION_PATH = re.compile(r'^/ws/sections/(?P<section_id>\d+)/$')
+QUEUE_SIZE = 256
+BATCH_LIMIT = 200
+RESYNC = {'t': 'r'}
+
+logger = logging.getLogger(__name__)
+
+
+def mark_delta(mark, deleted=False):
+    value = None if deleted or mark.marks is None else str(mark.marks)
+    return {'t': 'm', 's': mark.student_id, 'i': mark.assessment_item_id, 'v': value}
+
+
+def attendance_delta(attendance, deleted=False):
+    present = None if deleted else bool(attendance.is_present)
+    return {'t': 'a', 's': attendance.student_id, 'n': attendance.session_id, 'p': present}
+
+
+class MemoryLayer:
+    """Fans deltas out to subscribers in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, section_id, delta):
+        # Called from sync code, usually outside the subscribers' event loop.
+        with self._lock:
+            subscribers = list(self._subscribers.get(section_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._deliver, queue, delta)
+
+    @staticmethod
+    def _deliver(queue, delta):
+        try:
+            queue.put_nowait(delta)
+        except asyncio.QueueFull:
+            # A stalled browser gets one resync marker instead of a backlog.
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC)
+
+    async def subscribe(self, section_id):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(section_id, set()).add(entry)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(section_id, set())
+                subscribers.discard(entry)
+                if not subscribers:
+                    self._subscribers.pop(section_id, None)
+
+
+class RedisLayer:
+    """Fans deltas out through Redis pub/sub, across worker processes."""
+
+    def __init__(self, url):
+        if redis is None:
+            raise ImproperlyConfigured("OBE_LIVE['BACKEND'] = 'redis' requires the redis package.")
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+
+    @staticmethod
+    def channel(section_id):
+        return f'obe:live:section:{section_id}'
+
+    def publish(self, section_id, delta):
+        # Runs after the write has committed, so an outage must not turn a
+        # saved mark into an error response; pages catch up on reload.
+        try:
+            self._client.publish(self.channel(section_id), json.dumps(delta, separators=(',', ':')))
+        except redis.RedisError:
+            logger.warning('Could not publish a live update for section %s', section_id, exc_info=True)
+
+    async def subscribe(self, section_id):
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(self.channel(section_id))
+        try:
+            async for message in pubsub.listen():
+                if message['type'] == 'message':
+                    yield json.loads(message['data'])
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.close()
+            await client.close()
+
+
+_layer = None
+_layer_lock = threading.Lock()
+
+
+def get_layer():
+    global _layer
+    with _layer_lock:
+        if _layer is None:
+            options = getattr(settings, 'OBE_LIVE', {})
+            backend = options.get('BACKEND', 'memory')
+            if backend == 'redis':
+                _layer = RedisLayer(options.get('REDIS_URL', 'redis://localhost:6379/0'))
+            elif backend == 'memory':
+                _layer = MemoryLayer()
+            else:
+                raise ImproperlyConfigured(f"Unknown OBE_LIVE['BACKEND'] {backend!r}.")
+        return _layer
+
+
+def publish(section_id, delta):
+    """Publish a delta to a section's channel after the current transaction commits."""
+    if section_id is None:
+        return
+    # Best-effort: a failed push must not skip the other on-commit callbacks.
+    collect('live', [(section_id, delta)], _publish_batch, robust=True)
+
+
+def _cell(delta):
+    return delta['t'], delta['s'], delta.get('i', delta.get('n'))
+
+
+def _publish_batch(deltas):
+    sections = {}
+    for section_id, delta in deltas:
+        sections.setdefault(section_id, {})[_cell(delta)] = delta
+    layer = get_layer()
+    for section_id, cells in sections.items():
+        if len(cells) == 1:
+            message, = cells.values()
+        elif len(cells) <= BATCH_LIMIT:
+            message = {'t': 'b', 'd': list(cells.values())}
+        else:
+            message = RESYNC
+        layer.publish(section_id, message)
+
+
+# -- WebSocket endpoint --------------------------------------------------------
+
+def _headers(scope):
+    return {name.decode('latin1'): value.decode('latin1') for name, value in scope.get('headers', ())}
+
+
+def _origin_allowed(headers):
+    """
+    Same-origin pages and CSRF_TRUSTED_ORIGINS only: browsers don't apply
+    CORS to WebSockets, so this stands in for the CSRF check.
+    """
+    origin = headers.get('origin')
+    if not origin:
+        return False
+    if urlsplit(origin).netloc == headers.get('host'):
+        return True
+    return origin in getattr(settings, 'CSRF_TRUSTED_ORIGINS', ())
+
+
+def _can_follow(session_key, section_id):
+    """The session's user may watch the section (superuser or section faculty)."""
+    from django.contrib.auth import get_user
+    from django.utils.module_loading import import_string
+    from .models import Section
+
+    store = import_string(f'{settings.SESSION_ENGINE}.SessionStore')(session_key)
+    user = get_user(SimpleNamespace(session=store))
+    if not user.is_authenticated:
+        return False
+    sections = Section.objects.filter(pk=section_id)
+    if user.is_superuser:
+        return sections.exists()
+    faculty = getattr(user, 'faculty', None)
+    return faculty is not None and sections.filter(faculties=faculty).exists()
+
+
+async def websocket_application(scope, receive, send):
+    """ASGI app for ``/ws/sections/<id>/``; pushes the section's deltas."""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    match = SECTION_PATH.match(scope['path'])
+    headers = _headers(scope)
+    cookie = SimpleCookie(headers.get('cookie', ''))
+    session = cookie.get(settings.SESSION_COOKIE_NAME)
+    if (match is None or session is None or not _origin_allowed(headers)
+            or not await sync_to_async(_can_follow)(session.value, int(match['section_id']))):
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+
+    await send({'type': 'websocket.accept'})
+    deltas = get_layer().subscribe(int(match['section_id']))
+
+    async def forward():
+        async for delta in deltas:
+            await send({'type': 'websocket.send', 'text': json.dumps(delta, separators=(',', ':'))})
+
+    async def wait_for_disconnect():
+        # The page only listens; anything it sends is ignored.
+        while (await receive())['type'] != 'websocket.disconnect':
+            pass
+
+    tasks = [asyncio.ensure_future(forward()), asyncio.ensure_future(wait_for_disconnect())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await deltas.aclose()
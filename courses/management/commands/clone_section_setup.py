@@ -0,0 +1,43 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.cloning import clone_setup, sections_for_term
+from courses.models import Section
+
+
+class Command(BaseCommand):
+    help = "Copy a section's assessment plan and session schedule to other sections"
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', type=int, help='Id of the section to copy from')
+        parser.add_argument('--to', type=int, nargs='+', default=[], metavar='SECTION',
+                            help='Ids of the sections to copy to')
+        parser.add_argument('--year', type=int, help="Copy to every section of the source's course in this year")
+        parser.add_argument('--semester', choices=[value for value, _ in Section.SEMESTER_CHOICES])
+        parser.add_argument('--start-date', type=date.fromisoformat,
+                            help='First session date of the copied schedule (YYYY-MM-DD)')
+        parser.add_argument('--replace', action='store_true',
+                            help='Replace existing items and sessions (and their marks and attendance)')
+
+    def handle(self, *args, **options):
+        source = Section.objects.select_related('course').filter(pk=options['source']).first()
+        if source is None:
+            raise CommandError(f"Section {options['source']} does not exist.")
+
+        targets = list(Section.objects.select_related('course').filter(pk__in=options['to']))
+        missing = set(options['to']) - {target.pk for target in targets}
+        if missing:
+            raise CommandError(f"Unknown section(s): {', '.join(map(str, sorted(missing)))}.")
+        if (options['year'] is None) != (options['semester'] is None):
+            raise CommandError('Pass --year and --semester together.')
+        if options['year'] is not None:
+            targets += [s for s in sections_for_term(source.course, options['year'], options['semester'])
+                        if s not in targets]
+        if not targets:
+            raise CommandError('No target sections; use --to or --year/--semester.')
+
+        results = clone_setup(source, targets, start_date=options['start_date'], replace=options['replace'])
+        for result in results:
+            self.stdout.write(str(result))
+        self.stdout.write(self.style.SUCCESS(f'Copied {source} to {len(results)} section(s).'))
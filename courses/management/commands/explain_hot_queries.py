@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from accounts.models import Holiday
+from courses.models import Section, Student, Enrollment, Session, Attendance, AssessmentMark
+
+
+class Command(BaseCommand):
+    help = 'Print the query plan of the hot read paths for one section'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--section', type=int, help='Section id (defaults to the newest section)')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        db = options['database']
+        sections = Section.objects.using(db)
+        section = sections.filter(pk=options['section']).first() if options['section'] else sections.first()
+        if section is None:
+            raise CommandError('No section found.')
+
+        student = Student.objects.using(db).filter(enrollment__section=section).first()
+        session = Session.objects.using(db).filter(section=section).first()
+        day = session.date if session else None
+
+        queries = {
+            'Section listing (year, semester)': sections.filter(year=section.year, semester=section.semester)
+                .order_by('-year', 'semester', 'name', 'id'),
+            'Enrollments of a section': Enrollment.objects.using(db).filter(section=section)
+                .select_related('student').order_by('student__student_id'),
+            'Sessions of a section': Session.objects.using(db).filter(section=section).order_by('session_number'),
+            'Attendance of a section': Attendance.objects.using(db).filter(section=section)
+                .order_by().values('student_id', 'session_id', 'is_present'),
+            'Marks of a section': AssessmentMark.objects.using(db).filter(section=section),
+            'Student search': Student.objects.using(db)
+                .filter(Q(student_id__iexact='x') | Q(name__icontains='x')).values('student_id', 'name')[:10],
+            'Holiday range lookup': Holiday.objects.using(db)
+                .filter(start_date__lte=day, end_date__gte=day),
+        }
+        if student is not None:
+            queries['Marks of a student'] = AssessmentMark.objects.using(db).filter(student=student)
+
+        for title, queryset in queries.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(queryset.explain())
+            self.stdout.write('')
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses import changes
+from courses.analytics import item_analysis, np
+from courses.attainment import recompute_changed
+from courses.models import Section
+from courses.rollups import rebuild_changed
+from courses.trends import refresh_changed, trend_series
+
+
+def warm_caches():
+    """Rebuild the cached item analyses and CLO trend charts of the changed sections."""
+    with changes.consume(changes.CACHES) as section_ids:
+        sections = list(Section.objects.filter(pk__in=section_ids))
+        if np is not None:
+            for section in sections:
+                item_analysis(section)
+        for course_id in {section.course_id for section in sections}:
+            trend_series(course_id)
+        return len(sections)
+
+
+# In this order: the trends bump rollup_key(), which the warmed charts depend on.
+JOBS = [
+    (changes.ATTAINMENT, 'Recomputed attainment for {} sections', lambda: len(recompute_changed())),
+    (changes.ROLLUPS, 'Rebuilt {} section rollups', rebuild_changed),
+    (changes.CLO_TRENDS, 'Rebuilt CLO trends for {} terms', lambda: len(refresh_changed())),
+    (changes.CACHES, 'Warmed the caches of {} sections', warm_caches),
+]
+
+
+class Command(BaseCommand):
+    help = 'Bring attainment, rollups, CLO trends and caches up to date for the sections that changed (run every few minutes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=[name for name, _, _ in JOBS], action='append',
+                            help='Run just this consumer (repeatable).')
+        parser.add_argument('--prune', action='store_true', help='Afterwards, delete the changes every consumer has read.')
+
+    def handle(self, *args, **options):
+        for name, message, job in JOBS:
+            if options['only'] and name not in options['only']:
+                continue
+            started = time.perf_counter()
+            done = job()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(f'{message.format(done)} in {elapsed:.2f}s.'))
+        if options['prune']:
+            self.stdout.write(f'Pruned {changes.prune()} changes.')
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses.models import Section
+from courses.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-section rollups behind the program dashboard (run nightly, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Only rebuild the sections of this year.')
+
+    def handle(self, *args, **options):
+        sections = Section.objects.all()
+        if options['year'] is not None:
+            sections = sections.filter(year=options['year'])
+        started = time.perf_counter()
+        written = rebuild_rollups(sections)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} section rollups in {elapsed:.2f}s.'))
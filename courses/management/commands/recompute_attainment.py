@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from courses.attainment import recompute_attainment
+from courses.models import Section
+
+
+class Command(BaseCommand):
+    help = 'Recompute CLO attainment for the sections whose marks, items or policy changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute every section, changed or not.')
+        parser.add_argument('--year', type=int, help='Only consider the sections of this year.')
+
+    def handle(self, *args, **options):
+        sections = None
+        if options['year'] is not None:
+            sections = Section.objects.filter(year=options['year'])
+        recomputed = recompute_attainment(sections, force=options['all'])
+        self.stdout.write(self.style.SUCCESS(f'Recomputed attainment for {len(recomputed)} sections.'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import Section
+from courses.trends import refresh_clo_trends
+
+
+class Command(BaseCommand):
+    help = 'Bring the CLO attainment trends up to date (only the terms that changed, unless --full)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild every term.')
+        parser.add_argument('--year', type=int, help='Rebuild this term only (with --semester).')
+        parser.add_argument('--semester', choices=[choice for choice, _ in Section.SEMESTER_CHOICES])
+
+    def handle(self, *args, **options):
+        terms = None
+        if options['year'] is not None or options['semester']:
+            if options['year'] is None or not options['semester']:
+                raise CommandError('Give both --year and --semester.')
+            terms = [(options['year'], options['semester'])]
+        rebuilt = refresh_clo_trends(terms, full=options['full'])
+        if not rebuilt:
+            self.stdout.write('CLO trends are up to date.')
+            return
+        labels = ', '.join(f'{semester} {year}' for year, semester in rebuilt)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt CLO trends for {labels}.'))
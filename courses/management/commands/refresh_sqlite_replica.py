@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from obe.routers import DEFAULT_ALIAS, REPLICA_ALIAS
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database onto the SQLite replica file (local testing only)'
+
+    def handle(self, *args, **options):
+        databases = settings.DATABASES
+        if REPLICA_ALIAS not in databases:
+            raise CommandError('No replica configured; set OBE_DB_REPLICA_NAME.')
+        primary, replica = databases[DEFAULT_ALIAS], databases[REPLICA_ALIAS]
+        if 'sqlite3' not in primary['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+            raise CommandError('Only SQLite replicas can be refreshed this way; '
+                               'a Postgres standby is kept current by streaming replication.')
+        if str(primary['NAME']) == str(replica['NAME']):
+            raise CommandError('The replica points at the primary database file.')
+
+        # The online backup API takes a consistent snapshot even while the
+        # primary is being written to.
+        source = sqlite3.connect(primary['NAME'])
+        target = sqlite3.connect(replica['NAME'])
+        try:
+            with target:
+                source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        self.stdout.write(self.style.SUCCESS(f"Copied {primary['NAME']} to {replica['NAME']}."))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_assessmentitem_in_group'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='section',
+            index=models.Index(fields=['-year', 'semester', 'name', 'id'], name='section_browse_idx'),
+        ),
+    ]
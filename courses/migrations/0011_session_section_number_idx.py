@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_section_browse_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['section', 'session_number'], name='session_section_number_idx'),
+        ),
+    ]
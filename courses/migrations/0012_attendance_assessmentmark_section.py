@@ -0,0 +1,47 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_section(apps, schema_editor):
+    Attendance = apps.get_model('courses', 'Attendance')
+    AssessmentMark = apps.get_model('courses', 'AssessmentMark')
+    Session = apps.get_model('courses', 'Session')
+    AssessmentItem = apps.get_model('courses', 'AssessmentItem')
+
+    Attendance.objects.update(section_id=models.Subquery(
+        Session.objects.filter(pk=models.OuterRef('session_id')).values('section_id')[:1]
+    ))
+    AssessmentMark.objects.update(section_id=models.Subquery(
+        AssessmentItem.objects.filter(pk=models.OuterRef('assessment_item_id')).values('template__section_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_session_section_number_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessmentmark',
+            name='section',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='assessment_marks', to='courses.section'),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='section',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_records', to='courses.section'),
+        ),
+        migrations.RunPython(populate_section, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='assessmentmark',
+            name='section',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assessment_marks', to='courses.section'),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='section',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_records', to='courses.section'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0012_attendance_assessmentmark_section'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('op_id', models.CharField(max_length=64, unique=True)),
+                ('kind', models.CharField(choices=[('mark', 'Mark'), ('attendance', 'Attendance')], max_length=10)),
+                ('outcome', models.CharField(choices=[('applied', 'Applied'), ('stale', 'Stale'), ('rejected', 'Rejected')], max_length=10)),
+                ('client_timestamp', models.DateTimeField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_operations', to='courses.section')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:17
+
+from django.db import migrations
+
+SLOTS = [f'item{n}' for n in range(1, 11)]
+
+
+def adopt_slot_items(apps, schema_editor):
+    """Make AssessmentItem.group the only record of group membership."""
+    AssessmentItemGroup = apps.get_model('courses', 'AssessmentItemGroup')
+    AssessmentItem = apps.get_model('courses', 'AssessmentItem')
+
+    # Items only listed in a slot join that group; where the FK already
+    # points at a group, it wins.
+    for group_id, *item_ids in AssessmentItemGroup.objects.values_list('id', *(f'{slot}_id' for slot in SLOTS)):
+        item_ids = [item_id for item_id in item_ids if item_id is not None]
+        if item_ids:
+            AssessmentItem.objects.filter(id__in=item_ids, group__isnull=True).update(group_id=group_id)
+    AssessmentItem.objects.filter(group__isnull=False).update(in_group=True)
+    AssessmentItem.objects.filter(group__isnull=True).update(in_group=False)
+
+
+def fill_slots(apps, schema_editor):
+    AssessmentItemGroup = apps.get_model('courses', 'AssessmentItemGroup')
+    AssessmentItem = apps.get_model('courses', 'AssessmentItem')
+
+    for group_id in AssessmentItemGroup.objects.values_list('id', flat=True):
+        item_ids = list(AssessmentItem.objects.filter(group_id=group_id).order_by('id').values_list('id', flat=True)[:10])
+        item_ids += [None] * (len(SLOTS) - len(item_ids))
+        AssessmentItemGroup.objects.filter(id=group_id).update(
+            **{f'{slot}_id': item_id for slot, item_id in zip(SLOTS, item_ids)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_syncoperation'),
+    ]
+
+    operations = [
+        migrations.RunPython(adopt_slot_items, fill_slots),
+        migrations.RemoveField(
+            model_name='assessmentitemgroup',
+            name='item1',
+        ),
+        migrations.RemoveField(
+            model_name='assessmentitemgroup',
+            name='item10',
+        ),
+        migrations.RemoveField(
+            model_name='assessmentitemgroup',
+            name='item2',
+        ),
+        migrations.RemoveField(
+            model_name='assessmentitemgroup',
+            name='item3',
+        ),
+        migrations.RemoveField(
+            model_name='assessmentitemgroup',
+            name='item4',
+        ),
+        migrations.RemoveField(
+            model_name='assessmentitemgroup',
+            name='item5',
+        ),
+        migrations.RemoveField(
+            model_name='assessmentitemgroup',
+            name='item6',
+        ),
+        migrations.RemoveField(
+            model_name='assessmentitemgroup',
+            name='item7',
+        ),
+        migrations.RemoveField(
+            model_name='assessmentitemgroup',
+            name='item8',
+        ),
+        migrations.RemoveField(
+            model_name='assessmentitemgroup',
+            name='item9',
+        ),
+    ]
@@ -0,0 +1,76 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_memberships(apps, schema_editor):
+    """Move ProjectGroup.students rows into ProjectGroupEnrollment."""
+    ProjectGroup = apps.get_model('courses', 'ProjectGroup')
+    ProjectGroupEnrollment = apps.get_model('courses', 'ProjectGroupEnrollment')
+    Membership = ProjectGroup._meta.get_field('students').remote_field.through
+
+    ProjectGroupEnrollment.objects.update(section_id=models.Subquery(
+        ProjectGroup.objects.filter(pk=models.OuterRef('project_group_id')).values('section_id')[:1]
+    ))
+    # A student found in several groups of a section keeps the first one.
+    existing, duplicates = set(), []
+    for pk, section_id, student_id in (ProjectGroupEnrollment.objects.order_by('project_group_id', 'id')
+                                       .values_list('pk', 'section_id', 'student_id')):
+        if (section_id, student_id) in existing:
+            duplicates.append(pk)
+        existing.add((section_id, student_id))
+    ProjectGroupEnrollment.objects.filter(pk__in=duplicates).delete()
+
+    rows = []
+    for group_id, student_id, section_id in (Membership.objects.order_by('projectgroup_id', 'id')
+                                             .values_list('projectgroup_id', 'student_id', 'projectgroup__section_id')):
+        if (section_id, student_id) not in existing:
+            existing.add((section_id, student_id))
+            rows.append(ProjectGroupEnrollment(project_group_id=group_id, student_id=student_id, section_id=section_id))
+    ProjectGroupEnrollment.objects.bulk_create(rows, batch_size=500)
+
+
+def restore_memberships(apps, schema_editor):
+    ProjectGroup = apps.get_model('courses', 'ProjectGroup')
+    ProjectGroupEnrollment = apps.get_model('courses', 'ProjectGroupEnrollment')
+    Membership = ProjectGroup._meta.get_field('students').remote_field.through
+    Membership.objects.bulk_create([
+        Membership(projectgroup_id=group_id, student_id=student_id)
+        for group_id, student_id in ProjectGroupEnrollment.objects.values_list('project_group_id', 'student_id')
+    ], batch_size=500)
+    ProjectGroupEnrollment.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0014_remove_assessmentitemgroup_item_slots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectgroupenrollment',
+            name='section',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='project_group_enrollments', to='courses.section'),
+        ),
+        migrations.RunPython(copy_memberships, restore_memberships),
+        migrations.AlterField(
+            model_name='projectgroupenrollment',
+            name='section',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_group_enrollments', to='courses.section'),
+        ),
+        migrations.AddConstraint(
+            model_name='projectgroupenrollment',
+            constraint=models.UniqueConstraint(fields=('section', 'student'), name='one_project_group_per_section'),
+        ),
+        # An auto-created M2M table can't be altered into a through model:
+        # drop it (its rows were copied above) and declare the field again.
+        migrations.RemoveField(
+            model_name='projectgroup',
+            name='students',
+        ),
+        migrations.AddField(
+            model_name='projectgroup',
+            name='students',
+            field=models.ManyToManyField(related_name='project_groups', through='courses.ProjectGroupEnrollment', to='courses.student'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0003_alter_allowedemail_id_alter_department_description_and_more'),
+        ('courses', '0015_projectgroupenrollment_through'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SectionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('semester', models.CharField(choices=[('Spring', 'Spring'), ('Fall', 'Fall')], max_length=10)),
+                ('enrollment_count', models.PositiveIntegerField(default=0)),
+                ('backlog_count', models.PositiveIntegerField(default=0)),
+                ('session_count', models.PositiveIntegerField(default=0)),
+                ('held_session_count', models.PositiveIntegerField(default=0)),
+                ('attendance_rate', models.FloatField(blank=True, null=True)),
+                ('clo_count', models.PositiveIntegerField(default=0)),
+                ('planned_clo_count', models.PositiveIntegerField(default=0)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('graded_item_count', models.PositiveIntegerField(default=0)),
+                ('is_published', models.BooleanField(default=False)),
+                ('clo_attainment', models.JSONField(default=dict)),
+                ('plo_attainment', models.JSONField(default=dict)),
+                ('built_at', models.DateTimeField()),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='section_rollups', to='programs.department')),
+                ('program', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='section_rollups', to='programs.program')),
+                ('section', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rollup', to='courses.section')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['department', 'program', 'year', 'semester'], name='rollup_scope_idx')],
+            },
+        ),
+    ]
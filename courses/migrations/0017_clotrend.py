@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0016_sectionrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CLOTrend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clo_sl', models.PositiveIntegerField()),
+                ('year', models.IntegerField()),
+                ('semester', models.CharField(choices=[('Spring', 'Spring'), ('Fall', 'Fall')], max_length=10)),
+                ('sections', models.PositiveIntegerField(default=0)),
+                ('students', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField()),
+                ('pass_rate', models.FloatField()),
+                ('p10', models.FloatField()),
+                ('p25', models.FloatField()),
+                ('p50', models.FloatField()),
+                ('p75', models.FloatField()),
+                ('p90', models.FloatField()),
+                ('built_at', models.DateTimeField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clo_trends', to='courses.course')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='clotrend',
+            constraint=models.UniqueConstraint(fields=('course', 'clo_sl', 'year', 'semester'), name='one_clo_trend_per_term'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:41
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0017_clotrend'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttainmentPolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assessment_weight', models.FloatField(default=1, validators=[django.core.validators.MinValueValidator(0)])),
+                ('midterm_weight', models.FloatField(default=1, validators=[django.core.validators.MinValueValidator(0)])),
+                ('final_weight', models.FloatField(default=1, validators=[django.core.validators.MinValueValidator(0)])),
+                ('threshold', models.FloatField(default=60, help_text='Score (%) a student needs on a CLO to attain it', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='attainment_policy', to='courses.course')),
+            ],
+            options={
+                'verbose_name_plural': 'attainment policies',
+            },
+        ),
+        migrations.CreateModel(
+            name='SectionCLOAttainment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('students', models.PositiveIntegerField(default=0)),
+                ('attained', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField(blank=True, null=True)),
+                ('pass_rate', models.FloatField(blank=True, null=True)),
+                ('threshold', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('clo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='section_attainments', to='courses.clo')),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clo_attainments', to='courses.section')),
+            ],
+            options={
+                'unique_together': {('section', 'clo')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:44
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0018_attainment_policy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consumer', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SectionChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('mark', 'Assessment mark'), ('attendance', 'Attendance'), ('session', 'Session'), ('item', 'Assessment item'), ('item_group', 'Assessment item group'), ('enrollment', 'Enrollment'), ('clo', 'CLO'), ('policy', 'Attainment policy')], max_length=20)),
+                ('section_id', models.IntegerField()),
+                ('changed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0019_section_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sectionchange',
+            index=models.Index(fields=['section_id', 'changed_at'], name='section_change_latest'),
+        ),
+    ]
@@ -1,8 +1,13 @@
 from django.db import models
+from django.conf import settings
 from django.contrib.auth.models import User
-from programs.models import Program, PLO
+from programs.models import Department, Program, PLO
 from accounts.models import Faculty
 from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db.models.functions import Coalesce, RowNumber
+from django.utils import timezone
+from decimal import Decimal
 
 class Course(models.Model):
     code = models.CharField(max_length=20, unique=True)
@@ -32,6 +37,88 @@ class CLO(models.Model):
     def get_clo_code(self):
         return f"CLO{self.sl}"
 
+def _subquery_count(queryset, group_by):
+    """Correlated COUNT(*) of ``queryset`` rows, grouped on ``group_by``."""
+    counts = queryset.order_by().values(group_by).annotate(total=models.Count('pk')).values('total')
+    return Coalesce(models.Subquery(counts, output_field=models.IntegerField()), 0)
+
+
+class SectionQuerySet(models.QuerySet):
+    def with_card_stats(self):
+        """
+        Annotate everything a section card shows (enrollment count, session and
+        assessment progress) so a listing renders from a single query.
+        """
+        section = models.OuterRef('pk')
+        return self.select_related('course', 'primary_faculty', 'secondary_faculty').annotate(
+            enrollment_count=_subquery_count(Enrollment.objects.filter(section=section), 'section'),
+            session_count=_subquery_count(
+                Session.objects.filter(section=section, is_holiday=False), 'section'),
+            held_session_count=_subquery_count(
+                Session.objects.filter(
+                    models.Exists(Attendance.objects.filter(session=models.OuterRef('pk'))),
+                    section=section, is_holiday=False,
+                ), 'section'),
+            assessment_item_count=_subquery_count(
+                AssessmentItem.objects.filter(template__section=section), 'template__section'),
+            graded_item_count=_subquery_count(
+                AssessmentItem.objects.filter(
+                    models.Exists(AssessmentMark.objects.filter(
+                        assessment_item=models.OuterRef('pk'), marks__isnull=False)),
+                    template__section=section,
+                ), 'template__section'),
+        )
+
+
+def _total_marks(field):
+    """
+    Correlated total marks of the outer template or group (``field`` names
+    the FK on AssessmentItem): the sum of the items counted towards a total.
+    """
+    # Summing over the window query itself would aggregate before the rank
+    # filter is applied, so the counted items are picked in an inner query.
+    counted = AssessmentItem.objects.counted_towards_total().filter(
+        **{field: models.OuterRef(models.OuterRef('pk'))})
+    totals = AssessmentItem.objects.filter(
+        pk__in=counted.values('pk'), **{field: models.OuterRef('pk')}
+    ).order_by().values(field).annotate(total=models.Sum('max_marks')).values('total')
+    return Coalesce(
+        models.Subquery(totals, output_field=models.DecimalField(max_digits=7, decimal_places=2)),
+        models.Value(Decimal('0')),
+    )
+
+
+class AssessmentTemplateQuerySet(models.QuerySet):
+    def with_total_marks(self):
+        """Annotate ``total_marks``, see AssessmentTemplate.get_total_marks()."""
+        return self.annotate(total_marks=_total_marks('template'))
+
+
+class AssessmentItemGroupQuerySet(models.QuerySet):
+    def with_total_marks(self):
+        """Annotate ``total_marks``, see AssessmentItemGroup.get_total_marks()."""
+        return self.annotate(total_marks=_total_marks('group'))
+
+
+class AssessmentItemQuerySet(models.QuerySet):
+    # Ungrouped items share one partition; their rank must never cut them off.
+    UNGROUPED_RANK_LIMIT = 2 ** 31 - 1
+
+    def counted_towards_total(self):
+        """
+        Items that count towards a total: every ungrouped item, plus the
+        ``max_count`` highest-marked items of each group, ranked with
+        ROW_NUMBER() over the group.
+        """
+        return self.annotate(
+            group_rank=models.Window(
+                RowNumber(),
+                partition_by=[models.F('group_id')],
+                order_by=[models.F('max_marks').desc(), models.F('id').asc()],
+            ),
+        ).filter(group_rank__lte=Coalesce(models.F('group__max_count'), self.UNGROUPED_RANK_LIMIT))
+
+
 class Section(models.Model):
     SEMESTER_CHOICES = [
         ('Spring', 'Spring'),
@@ -46,13 +133,23 @@ class Section(models.Model):
     secondary_faculty = models.ForeignKey(Faculty, on_delete=models.SET_NULL, null=True, blank=True, related_name='secondary_sections')
     faculties = models.ManyToManyField(Faculty, related_name='sections')
     total_classes = models.PositiveIntegerField(default=28, help_text="Total number of classes for attendance calculation")
+
+    objects = SectionQuerySet.as_manager()
     
     class Meta:
         unique_together = ['course', 'name', 'year', 'semester']
         ordering = ['-year', 'semester', 'name']
+        indexes = [
+            # Keyset pagination order used by courses.browse
+            models.Index(fields=['-year', 'semester', 'name', 'id'], name='section_browse_idx'),
+        ]
     
     def __str__(self):
         return f"{self.course.code} - {self.name} ({self.semester} {self.year})"
+
+    @property
+    def term(self):
+        return f"{self.semester} {self.year}"
     
     def save(self, *args, **kwargs):
         # Ensure primary faculty is in the faculties M2M field
@@ -101,21 +198,17 @@ class AssessmentTemplate(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AssessmentTemplateQuerySet.as_manager()
+
     def __str__(self):
         return f"Assessment Template - {self.section.course.code} Section {self.section.name}"
 
     def get_total_marks(self):
-        """Calculate total marks from all assessment items"""
-        total = 0
-        # Add marks from individual items
-        total += self.assessment_items.filter(group__isnull=True).aggregate(
+        """Total of the ungrouped items plus each group's best ``max_count`` items"""
+        if hasattr(self, 'total_marks'):  # annotated by with_total_marks()
+            return self.total_marks
+        return AssessmentItem.objects.counted_towards_total().filter(template=self).aggregate(
             total=models.Sum('max_marks'))['total'] or 0
-        
-        # Add marks from groups
-        for group in self.assessment_groups.all():
-            total += group.get_total_marks()
-        
-        return total
 
 class AssessmentItemGroup(models.Model):
     MAX_COUNT_CHOICES = [
@@ -137,18 +230,10 @@ class AssessmentItemGroup(models.Model):
     clo = models.ForeignKey(CLO, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    item1 = models.ForeignKey('AssessmentItem', null=True, blank=True, on_delete=models.SET_NULL, related_name='group_item1')
-    item2 = models.ForeignKey('AssessmentItem', null=True, blank=True, on_delete=models.SET_NULL, related_name='group_item2')
-    item3 = models.ForeignKey('AssessmentItem', null=True, blank=True, on_delete=models.SET_NULL, related_name='group_item3')
-    item4 = models.ForeignKey('AssessmentItem', null=True, blank=True, on_delete=models.SET_NULL, related_name='group_item4')
-    item5 = models.ForeignKey('AssessmentItem', null=True, blank=True, on_delete=models.SET_NULL, related_name='group_item5')
-    item6 = models.ForeignKey('AssessmentItem', null=True, blank=True, on_delete=models.SET_NULL, related_name='group_item6')
-    item7 = models.ForeignKey('AssessmentItem', null=True, blank=True, on_delete=models.SET_NULL, related_name='group_item7')
-    item8 = models.ForeignKey('AssessmentItem', null=True, blank=True, on_delete=models.SET_NULL, related_name='group_item8')
-    item9 = models.ForeignKey('AssessmentItem', null=True, blank=True, on_delete=models.SET_NULL, related_name='group_item9')
-    item10 = models.ForeignKey('AssessmentItem', null=True, blank=True, on_delete=models.SET_NULL, related_name='group_item10')
     totalmarks = models.FloatField(default=0)
 
+    objects = AssessmentItemGroupQuerySet.as_manager()
+
     def clean(self):
         if self.pk and self.assessment_items.count() > 10:
             raise ValidationError('A group can contain at most 10 items.')
@@ -162,11 +247,10 @@ class AssessmentItemGroup(models.Model):
 
     def get_total_marks(self):
         """Calculate total marks for the group based on max_count"""
-        items = self.assessment_items.all().order_by('-max_marks')
-        total = 0
-        for i in range(min(self.max_count, len(items))):
-            total += items[i].max_marks
-        return total
+        if hasattr(self, 'total_marks'):  # annotated by with_total_marks()
+            return self.total_marks
+        return AssessmentItem.objects.counted_towards_total().filter(group=self).aggregate(
+            total=models.Sum('max_marks'))['total'] or 0
 
 class AssessmentItem(models.Model):
     ASSESSMENT_TYPES = [
@@ -185,6 +269,8 @@ class AssessmentItem(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     in_group = models.BooleanField(default=False)
 
+    objects = AssessmentItemQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} - {self.template.section.course.code} Section {self.template.section.name}"
 
@@ -197,6 +283,9 @@ class AssessmentItem(models.Model):
 class AssessmentMark(models.Model):
     assessment_item = models.ForeignKey(AssessmentItem, on_delete=models.CASCADE, related_name='marks')
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='assessment_marks')
+    # Denormalised from assessment_item.template.section so section-wide reads
+    # are a single index range scan instead of a three-table join.
+    section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name='assessment_marks')
     marks = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -209,9 +298,13 @@ class AssessmentMark(models.Model):
 
     def save(self, *args, **kwargs):
         # Validate marks are within range
+        self.marks = self._meta.get_field('marks').to_python(self.marks)
         if self.marks is not None:
             if self.marks < 0 or self.marks > self.assessment_item.max_marks:
                 raise ValidationError(f'Marks must be between 0 and {self.assessment_item.max_marks}')
+        if self.section_id is None:
+            self.section_id = AssessmentTemplate.objects.values_list('section_id', flat=True).get(
+                pk=self.assessment_item.template_id)
         super().save(*args, **kwargs)
 
 class Attainment(models.Model):
@@ -233,7 +326,7 @@ class ProjectGroup(models.Model):
     section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name='project_groups')
     group_sl = models.IntegerField() # Group Serial Number
     project_name = models.CharField(max_length=255, blank=True, null=True)
-    students = models.ManyToManyField(Student, related_name='project_groups')
+    students = models.ManyToManyField(Student, related_name='project_groups', through='ProjectGroupEnrollment')
 
     class Meta:
         unique_together = ['section', 'group_sl']
@@ -245,9 +338,15 @@ class ProjectGroup(models.Model):
 class ProjectGroupEnrollment(models.Model):
     project_group = models.ForeignKey(ProjectGroup, on_delete=models.CASCADE, related_name='enrollments')
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    # Denormalised from project_group.section so the database can enforce
+    # one group per student per section.
+    section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name='project_group_enrollments')
 
     class Meta:
         unique_together = ['project_group', 'student']
+        constraints = [
+            models.UniqueConstraint(fields=['section', 'student'], name='one_project_group_per_section'),
+        ]
 
     def __str__(self):
         return f'{self.student.name} in {self.project_group}'
@@ -261,6 +360,9 @@ class Session(models.Model):
 
     class Meta:
         ordering = ['session_number']
+        indexes = [
+            models.Index(fields=['section', 'session_number'], name='session_section_number_idx'),
+        ]
 
     def __str__(self):
         return f"{self.section.course.code} - Session {self.session_number} ({self.date})"
@@ -268,6 +370,8 @@ class Session(models.Model):
 class Attendance(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     session = models.ForeignKey(Session, on_delete=models.CASCADE)
+    # Denormalised from session.section; see AssessmentMark.section
+    section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name='attendance_records')
     is_present = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -278,3 +382,223 @@ class Attendance(models.Model):
 
     def __str__(self):
         return f"{self.student.name} - Session {self.session.session_number} ({'Present' if self.is_present else 'Absent'})"
+
+    def save(self, *args, **kwargs):
+        if self.section_id is None:
+            self.section_id = Session.objects.values_list('section_id', flat=True).get(pk=self.session_id)
+        super().save(*args, **kwargs)
+
+class SyncOperation(models.Model):
+    """
+    A mark or attendance edit replayed from a browser's offline log (see
+    courses.sync).  ``op_id`` is generated by the client, so a batch that is
+    sent twice is only applied once.
+    """
+    KIND_CHOICES = [
+        ('mark', 'Mark'),
+        ('attendance', 'Attendance'),
+    ]
+    OUTCOME_CHOICES = [
+        ('applied', 'Applied'),
+        ('stale', 'Stale'),          # the server already had a newer value
+        ('rejected', 'Rejected'),    # invalid for this section
+    ]
+
+    op_id = models.CharField(max_length=64, unique=True)
+    section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name='sync_operations')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    outcome = models.CharField(max_length=10, choices=OUTCOME_CHOICES)
+    client_timestamp = models.DateTimeField()
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.op_id} ({self.outcome})"
+
+
+class SectionRollup(models.Model):
+    """
+    Precomputed per-section figures for the program dashboard, rebuilt in
+    bulk by ``manage.py rebuild_rollups`` (see courses.rollups) rather than
+    kept current on every write.
+
+    The attainment fields hold, per CLO serial number (or PLO numeric serial
+    number), how many students fall in each band of
+    ``courses.rollups.ATTAINMENT_BANDS``.
+    """
+    section = models.OneToOneField(Section, on_delete=models.CASCADE, related_name='rollup')
+    # Denormalised so the dashboard filters and groups without joins.
+    program = models.ForeignKey(Program, on_delete=models.CASCADE, related_name='section_rollups')
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True, related_name='section_rollups')
+    year = models.IntegerField()
+    semester = models.CharField(max_length=10, choices=Section.SEMESTER_CHOICES)
+
+    enrollment_count = models.PositiveIntegerField(default=0)
+    backlog_count = models.PositiveIntegerField(default=0)
+    session_count = models.PositiveIntegerField(default=0)
+    held_session_count = models.PositiveIntegerField(default=0)
+    attendance_rate = models.FloatField(null=True, blank=True)  # percent of marked attendances present
+
+    clo_count = models.PositiveIntegerField(default=0)
+    planned_clo_count = models.PositiveIntegerField(default=0)  # CLOs with at least one assessment item
+    item_count = models.PositiveIntegerField(default=0)
+    graded_item_count = models.PositiveIntegerField(default=0)
+    is_published = models.BooleanField(default=False)
+
+    clo_attainment = models.JSONField(default=dict)
+    plo_attainment = models.JSONField(default=dict)
+
+    built_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['department', 'program', 'year', 'semester'], name='rollup_scope_idx'),
+        ]
+
+    def __str__(self):
+        return f"Rollup of section {self.section_id} ({self.semester} {self.year})"
+
+    @property
+    def plan_complete(self):
+        return self.clo_count > 0 and self.planned_clo_count == self.clo_count
+
+
+class CLOTrend(models.Model):
+    """
+    How one CLO of a course (by serial number, so it survives CLOs being
+    re-created) was attained in one term, over all the course's sections.
+    Maintained term by term by courses.trends; the scores are the students'
+    CLO attainment percentages.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='clo_trends')
+    clo_sl = models.PositiveIntegerField()
+    year = models.IntegerField()
+    semester = models.CharField(max_length=10, choices=Section.SEMESTER_CHOICES)
+
+    sections = models.PositiveIntegerField(default=0)
+    students = models.PositiveIntegerField(default=0)
+    mean = models.FloatField()
+    pass_rate = models.FloatField()  # percent of students at or above the attainment target
+    p10 = models.FloatField()
+    p25 = models.FloatField()
+    p50 = models.FloatField()
+    p75 = models.FloatField()
+    p90 = models.FloatField()
+
+    built_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'clo_sl', 'year', 'semester'], name='one_clo_trend_per_term'),
+        ]
+
+    def __str__(self):
+        return f"{self.course_id} CLO{self.clo_sl} {self.semester} {self.year}: {self.mean:.1f}"
+
+
+class AttainmentPolicy(models.Model):
+    """
+    How a course's CLO attainment is computed (see courses.attainment): the
+    weight of each assessment type in a student's CLO score, and the score
+    a student needs to attain the CLO.  Courses without a policy use the
+    field defaults.
+    """
+    WEIGHT_FIELDS = {
+        'Assessment': 'assessment_weight',
+        'Midterm': 'midterm_weight',
+        'Final': 'final_weight',
+    }
+
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, related_name='attainment_policy')
+    assessment_weight = models.FloatField(default=1, validators=[MinValueValidator(0)])
+    midterm_weight = models.FloatField(default=1, validators=[MinValueValidator(0)])
+    final_weight = models.FloatField(default=1, validators=[MinValueValidator(0)])
+    threshold = models.FloatField(
+        default=60, validators=[MinValueValidator(0), MaxValueValidator(100)],
+        help_text="Score (%) a student needs on a CLO to attain it")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'attainment policies'
+
+    def __str__(self):
+        return f"Attainment policy of {self.course_id}"
+
+    def clean(self):
+        if not any(self.weights().values()):
+            raise ValidationError('At least one assessment type needs a weight above zero.')
+
+    def weights(self):
+        """{assessment type: weight}"""
+        return {kind: getattr(self, field) for kind, field in self.WEIGHT_FIELDS.items()}
+
+
+class SectionCLOAttainment(models.Model):
+    """
+    One CLO's attainment over a section's students under the course's
+    AttainmentPolicy; the per-student scores are the section's Attainment
+    rows.  Written by courses.attainment.
+    """
+    section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name='clo_attainments')
+    clo = models.ForeignKey(CLO, on_delete=models.CASCADE, related_name='section_attainments')
+    students = models.PositiveIntegerField(default=0)  # students with a score
+    attained = models.PositiveIntegerField(default=0)  # students at or above the threshold
+    mean = models.FloatField(null=True, blank=True)
+    pass_rate = models.FloatField(null=True, blank=True)
+    threshold = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['section', 'clo']
+
+    def __str__(self):
+        return f"Section {self.section_id} CLO {self.clo_id}: {self.pass_rate}"
+
+
+class SectionChange(models.Model):
+    """
+    One write to a section's data, appended by courses.changes: by the
+    receivers in courses.signals and by the bulk writers that bypass them.
+    Background jobs read the feed through a ChangeCheckpoint to find the
+    sections that changed since their last run.
+    """
+    MARK = 'mark'
+    ATTENDANCE = 'attendance'
+    SESSION = 'session'
+    ITEM = 'item'
+    ITEM_GROUP = 'item_group'
+    ENROLLMENT = 'enrollment'
+    CLO = 'clo'
+    POLICY = 'policy'
+    ENTITY_CHOICES = [
+        (MARK, 'Assessment mark'),
+        (ATTENDANCE, 'Attendance'),
+        (SESSION, 'Session'),
+        (ITEM, 'Assessment item'),
+        (ITEM_GROUP, 'Assessment item group'),
+        (ENROLLMENT, 'Enrollment'),
+        (CLO, 'CLO'),
+        (POLICY, 'Attainment policy'),
+    ]
+
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    # Not a foreign key: the feed outlives deleted sections, and rows written
+    # while a section's children cascade must not hold up its delete.
+    section_id = models.IntegerField()
+    changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['section_id', 'changed_at'], name='section_change_latest')]
+
+    def __str__(self):
+        return f"{self.entity} of section {self.section_id} at {self.changed_at}"
+
+
+class ChangeCheckpoint(models.Model):
+    """How far a consumer of the SectionChange feed has read."""
+    consumer = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.consumer} at {self.last_id}"
@@ -0,0 +1,429 @@
+"""
+A section's assessment plan: its items, groups and per-CLO / per-PLO marks.
+
+``get_plan(section)`` reads the section's items (with their group, CLO and
+PLO) in one query and the groups in another, and derives everything else in
+a single pass.  The result is plain data, cached against the section and its
+course, so the assessment setup page, the marks grid and anything else that
+needs the layout of a section's assessments can share it:
+
+    plan = get_plan(section)
+    plan.items            # PlanItem, ordered by id
+    plan.groups           # PlanGroup, ordered by id, each with .items
+    plan.clo_marks        # {PlanCLO: marks}, CLOs with at least one item
+    plan.plo_marks        # {PlanPLO: marks}
+
+``apply_plan(section, data)`` goes the other way: it saves a whole declared
+plan (the format of ``declaration(plan)``) with bulk writes in one
+transaction.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from obe.cache import cache_fragment, course_key, invalidate_section, program_key, section_key
+from . import changes
+from .models import CLO, AssessmentItem, AssessmentItemGroup, AssessmentTemplate, SectionChange
+
+
+class PlanPLO:
+    __slots__ = ('id', 'numberic_sl', 'description')
+
+    def __init__(self, id, numberic_sl, description):
+        self.id = id
+        self.numberic_sl = numberic_sl
+        self.description = description
+
+
+class PlanCLO:
+    __slots__ = ('id', 'sl', 'plo')
+
+    def __init__(self, id, sl, plo):
+        self.id = id
+        self.sl = sl
+        self.plo = plo
+
+    def get_clo_code(self):
+        return f"CLO{self.sl}"
+
+
+class PlanItem:
+    __slots__ = ('id', 'name', 'assessment_type', 'clo', 'max_marks', 'group_id')
+
+    def __init__(self, id, name, assessment_type, clo, max_marks, group_id):
+        self.id = id
+        self.name = name
+        self.assessment_type = assessment_type
+        self.clo = clo
+        self.max_marks = max_marks
+        self.group_id = group_id
+
+    @property
+    def in_group(self):
+        return self.group_id is not None
+
+    def as_json(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'assessment_type': self.assessment_type,
+            'clo_id': self.clo.id,
+            'clo_code': self.clo.get_clo_code(),
+            'max_marks': float(self.max_marks),
+            'in_group': self.in_group,
+            'group': self.group_id,
+        }
+
+
+class PlanGroup:
+    __slots__ = ('id', 'name', 'max_count', 'clo', 'items')
+
+    def __init__(self, id, name, max_count, clo):
+        self.id = id
+        self.name = name
+        self.max_count = max_count
+        self.clo = clo
+        self.items = []
+
+    @property
+    def total_marks(self):
+        """The best ``max_count`` items, as in AssessmentItem.objects.counted_towards_total()."""
+        ranked = sorted(self.items, key=lambda item: (-item.max_marks, item.id))
+        return sum((item.max_marks for item in ranked[:self.max_count]), 0)
+
+    @property
+    def weighted_marks(self):
+        """What the group contributes to its CLO: average item marks times max_count."""
+        if not self.items:
+            return 0
+        return sum(float(item.max_marks) for item in self.items) / len(self.items) * self.max_count
+
+    def as_json(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'max_count': self.max_count,
+            'total_marks': float(self.total_marks),
+            'clo_code': self.clo.get_clo_code(),
+            'items': [
+                {'id': item.id, 'name': item.name, 'max_marks': float(item.max_marks)}
+                for item in self.items
+            ],
+        }
+
+
+class AssessmentPlan:
+    def __init__(self, section_id, items, groups):
+        self.section_id = section_id
+        self.items = items
+        self.groups = groups
+        self.clo_marks, self.plo_marks = self._distribute()
+
+    def _distribute(self):
+        clos, marks = {}, {}
+        for item in self.items:
+            if item.group_id is None:
+                clos[item.clo.id] = item.clo
+                marks[item.clo.id] = marks.get(item.clo.id, 0) + float(item.max_marks)
+        for group in self.groups:
+            if group.items:
+                clos[group.clo.id] = group.clo
+                marks[group.clo.id] = marks.get(group.clo.id, 0) + group.weighted_marks
+
+        clo_marks, plo_marks, plos = {}, {}, {}
+        for clo in sorted(clos.values(), key=lambda clo: clo.sl):
+            clo_marks[clo] = marks[clo.id]
+            if clo.plo is not None:
+                plo = plos.setdefault(clo.plo.id, clo.plo)
+                plo_marks[plo] = plo_marks.get(plo, 0) + marks[clo.id]
+        return clo_marks, plo_marks
+
+    @property
+    def ungrouped_items(self):
+        return [item for item in self.items if item.group_id is None]
+
+    @property
+    def clo_total(self):
+        return sum(self.clo_marks.values())
+
+    @property
+    def plo_total(self):
+        return sum(self.plo_marks.values())
+
+    def items_json(self):
+        return [item.as_json() for item in self.items]
+
+    def groups_json(self):
+        return [group.as_json() for group in self.groups]
+
+
+def build_plan(section):
+    """Read a section's assessment plan from the database (two queries)."""
+    clos, plos = {}, {}
+
+    def plan_clo(clo):
+        if clo.id not in clos:
+            plo = None
+            if clo.plo is not None:
+                plo = plos.setdefault(clo.plo.id, PlanPLO(clo.plo.id, clo.plo.numberic_sl, clo.plo.description))
+            clos[clo.id] = PlanCLO(clo.id, clo.sl, plo)
+        return clos[clo.id]
+
+    groups = {
+        group.id: PlanGroup(group.id, group.name, group.max_count, plan_clo(group.clo))
+        for group in AssessmentItemGroup.objects.filter(template__section=section)
+        .select_related('clo__plo').order_by('id')
+    }
+    items = []
+    for item in (AssessmentItem.objects.filter(template__section=section)
+                 .select_related('clo__plo').order_by('id')):
+        plan_item = PlanItem(item.id, item.name, item.assessment_type, plan_clo(item.clo),
+                             item.max_marks, item.group_id)
+        items.append(plan_item)
+        if item.group_id in groups:
+            groups[item.group_id].items.append(plan_item)
+    return AssessmentPlan(section.pk, items, list(groups.values()))
+
+
+@cache_fragment(lambda section: [section_key(section.pk), course_key(section.course_id), program_key()])
+def get_plan(section):
+    """The cached AssessmentPlan of a section."""
+    return build_plan(section)
+
+
+# -- Saving a whole plan -------------------------------------------------------
+
+MAX_PLAN_ITEMS = 200
+MAX_GROUP_ITEMS = 10
+
+
+class PlanError(ValueError):
+    """A submitted plan that can't be applied; the message is shown to the user."""
+
+
+def declaration(plan):
+    """The plan in the format accepted by apply_plan()."""
+    return {
+        'items': [
+            {'id': item.id, 'name': item.name, 'assessment_type': item.assessment_type,
+             'clo_id': item.clo.id, 'max_marks': str(item.max_marks)}
+            for item in plan.items
+        ],
+        'groups': [
+            {'id': group.id, 'name': group.name, 'max_count': group.max_count,
+             'clo_id': group.clo.id, 'items': [item.id for item in group.items]}
+            for group in plan.groups
+        ],
+    }
+
+
+def _text(entry, field, max_length):
+    value = entry.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise PlanError(f'Missing {field}.')
+    value = value.strip()
+    if len(value) > max_length:
+        raise PlanError(f'{field} is longer than {max_length} characters: {value[:20]}...')
+    return value
+
+
+def _id(value, known, label):
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise PlanError(f'Invalid {label} id {value!r}.')
+    if value not in known:
+        raise PlanError(f'{label.capitalize()} {value} does not belong to this section.')
+    return value
+
+
+def _key(entry, name):
+    # Keys name new entries; stored ones go by their integer id.  Items and
+    # groups have separate keys, reported back separately by apply_plan().
+    key = entry.get('key')
+    if key is not None and (not isinstance(key, str) or not key.strip()):
+        raise PlanError(f'The key of {name} must be a non-empty string.')
+    return key
+
+
+def _parse_items(raw_items, existing, clo_ids):
+    if not isinstance(raw_items, list) or len(raw_items) > MAX_PLAN_ITEMS:
+        raise PlanError(f'items must be a list of at most {MAX_PLAN_ITEMS} entries.')
+    types = {value for value, _ in AssessmentItem.ASSESSMENT_TYPES}
+    items, refs = [], {}
+    for index, entry in enumerate(raw_items):
+        if not isinstance(entry, dict):
+            raise PlanError('Each item must be an object.')
+        item = {
+            'id': _id(entry.get('id'), existing, 'item'),
+            'name': _text(entry, 'name', 100),
+            'assessment_type': entry.get('assessment_type'),
+            'clo_id': _id(entry.get('clo_id'), clo_ids, 'CLO'),
+            'group': None,
+        }
+        if item['assessment_type'] not in types:
+            raise PlanError(f"Invalid assessment type for {item['name']}.")
+        if item['clo_id'] is None:
+            raise PlanError(f"Missing CLO for {item['name']}.")
+        try:
+            max_marks = Decimal(str(entry.get('max_marks')))
+            if not max_marks.is_finite():
+                raise ValueError(max_marks)
+            item['max_marks'] = max_marks.quantize(Decimal('0.01'))
+        except (InvalidOperation, ValueError):
+            raise PlanError(f"Invalid max marks for {item['name']}.")
+        if not 0 < item['max_marks'] < 1000:
+            raise PlanError(f"Max marks for {item['name']} must be between 0 and 1000.")
+
+        # Groups refer to stored items by id and to new ones by their key;
+        # unkeyed new items get a ref no group can name.
+        item['key'] = _key(entry, item['name']) if item['id'] is None else None
+        ref = item['id'] if item['id'] is not None else item['key'] or ('new', index)
+        if ref in refs:
+            raise PlanError(f'Item {ref} is listed twice.')
+        refs[ref] = item
+        items.append(item)
+    return items, refs
+
+
+def _parse_groups(raw_groups, existing, clo_ids, refs):
+    if not isinstance(raw_groups, list):
+        raise PlanError('groups must be a list.')
+    groups, seen, keys = [], set(), set()
+    for entry in raw_groups:
+        if not isinstance(entry, dict):
+            raise PlanError('Each group must be an object.')
+        group = {
+            'id': _id(entry.get('id'), existing, 'group'),
+            'name': _text(entry, 'name', 100),
+            'clo_id': _id(entry.get('clo_id'), clo_ids, 'CLO'),
+            'key': None,
+        }
+        group['key'] = _key(entry, group['name']) if group['id'] is None else None
+        if group['id'] is not None and group['id'] in seen:
+            raise PlanError(f"Group {group['id']} is listed twice.")
+        if group['key'] is not None and group['key'] in keys:
+            raise PlanError(f"Group {group['key']} is listed twice.")
+        seen.add(group['id'])
+        keys.add(group['key'])
+        try:
+            group['max_count'] = int(entry.get('max_count'))
+        except (TypeError, ValueError):
+            group['max_count'] = 0
+        if not 1 <= group['max_count'] <= MAX_GROUP_ITEMS:
+            raise PlanError(f"Count best for {group['name']} must be between 1 and {MAX_GROUP_ITEMS}.")
+        if group['clo_id'] is None:
+            raise PlanError(f"Missing CLO for {group['name']}.")
+
+        members = entry.get('items')
+        if not isinstance(members, list) or not 0 < len(members) <= MAX_GROUP_ITEMS:
+            raise PlanError(f"{group['name']} must contain between 1 and {MAX_GROUP_ITEMS} items.")
+        for ref in members:
+            item = refs.get(ref) if isinstance(ref, (int, str)) and not isinstance(ref, bool) else None
+            if item is None:
+                raise PlanError(f"{group['name']} refers to unknown item {ref!r}.")
+            if item['group'] is not None:
+                raise PlanError(f"{item['name']} is in more than one group.")
+            if item['clo_id'] != group['clo_id'] or item['max_marks'] != refs[members[0]]['max_marks']:
+                raise PlanError(f"All items of {group['name']} must have the same marks and CLO as the group.")
+            item['group'] = group
+        groups.append(group)
+    return groups
+
+
+def apply_plan(section, data):
+    """
+    Make the section's stored items and groups match a declared plan (see
+    declaration()), in one transaction.  Entries with an ``id`` update the
+    stored row, entries without one are created, and stored rows missing from
+    the plan are deleted along with their marks.  New items may carry a
+    string ``key`` that groups use to list them.  Returns the counts of created,
+    updated and deleted rows and, under ``ids``, the ids given to keyed
+    entries: ``{'items': {key: id}, 'groups': {key: id}}``.
+    """
+    if not isinstance(data, dict):
+        raise PlanError('The plan must be an object.')
+    now = timezone.now()
+    with transaction.atomic():
+        template, _ = AssessmentTemplate.objects.get_or_create(section=section)
+        clo_ids = set(CLO.objects.filter(course_id=section.course_id).values_list('id', flat=True))
+        stored_items = {item.id: item for item in
+                        AssessmentItem.objects.select_for_update().filter(template=template)}
+        stored_groups = {group.id: group for group in
+                         AssessmentItemGroup.objects.select_for_update().filter(template=template)}
+
+        items, refs = _parse_items(data.get('items', []), stored_items, clo_ids)
+        groups = _parse_groups(data.get('groups', []), stored_groups, clo_ids, refs)
+        counts = {'created': 0, 'updated': 0, 'deleted': 0}
+        ids = {'items': {}, 'groups': {}}
+
+        # Groups first, so new items can point at them.
+        new_groups, changed_groups = [], []
+        for group in groups:
+            values = {'name': group['name'], 'max_count': group['max_count'], 'clo_id': group['clo_id']}
+            if group['id'] is None:
+                group['row'] = AssessmentItemGroup(template=template, **values)
+                new_groups.append(group)
+                continue
+            row = group['row'] = stored_groups[group['id']]
+            if any(getattr(row, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(row, field, value)
+                row.updated_at = now
+                changed_groups.append(row)
+        AssessmentItemGroup.objects.bulk_create([group['row'] for group in new_groups])
+        AssessmentItemGroup.objects.bulk_update(changed_groups, ['name', 'max_count', 'clo', 'updated_at'])
+        for group in new_groups:
+            if group['key'] is not None:
+                ids['groups'][group['key']] = group['row'].pk
+
+        new_items, changed_items = [], []
+        for ref, item in refs.items():
+            values = {
+                'name': item['name'],
+                'assessment_type': item['assessment_type'],
+                'clo_id': item['clo_id'],
+                'max_marks': item['max_marks'],
+                'group_id': item['group']['row'].pk if item['group'] else None,
+                'in_group': item['group'] is not None,
+            }
+            if item['id'] is None:
+                item['row'] = AssessmentItem(template=template, **values)
+                new_items.append((item['key'], item['row']))
+                continue
+            row = stored_items[item['id']]
+            if any(getattr(row, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(row, field, value)
+                row.updated_at = now
+                changed_items.append(row)
+        AssessmentItem.objects.bulk_create([row for _, row in new_items])
+        AssessmentItem.objects.bulk_update(
+            changed_items,
+            ['name', 'assessment_type', 'clo', 'max_marks', 'group', 'in_group', 'updated_at'],
+            batch_size=500)
+        ids['items'].update({key: row.pk for key, row in new_items if key is not None})
+
+        # Items leave removed groups above, so deleting a group no longer
+        # cascades to anything the plan keeps.
+        removed_items = stored_items.keys() - {item['id'] for item in items}
+        removed_groups = stored_groups.keys() - {group['id'] for group in groups}
+        if removed_items:
+            AssessmentItem.objects.filter(pk__in=removed_items).delete()
+        if removed_groups:
+            AssessmentItemGroup.objects.filter(pk__in=removed_groups).delete()
+
+        counts['created'] = len(new_groups) + len(new_items)
+        counts['updated'] = len(changed_groups) + len(changed_items)
+        counts['deleted'] = len(removed_items) + len(removed_groups)
+
+    # bulk writes bypass the post_save receivers
+    invalidate_section(section.id)
+    if new_items or changed_items:
+        changes.record(SectionChange.ITEM, [section.id])
+    if new_groups or changed_groups:
+        changes.record(SectionChange.ITEM_GROUP, [section.id])
+    return dict(counts, ids=ids)
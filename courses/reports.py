@@ -0,0 +1,204 @@
+"""
+The PLO attainment matrix of a program: one row per course, one column per
+PLO, for a term or for all terms.
+
+PLOs are shared by every program, and each CLO maps to at most one PLO, so a
+course attains a PLO through the CLOs mapped to it.  A student's attainment
+of a CLO is their ``Attainment`` row (courses.attainment, under the course's
+policy); their attainment of a PLO in a course is the mean over the
+course's CLOs mapped to it.  A cell holds the mean over the course's
+students and the share of them at or above the course's threshold.
+
+``plo_matrix()`` recomputes the stale sections' attainment, then reads the
+rows with one query; the matrix is cached per (program, year, semester)
+until attainment is recomputed somewhere.  ``matrix_rows()`` flattens a
+matrix for the CSV and XLSX exports.
+"""
+import csv
+from collections import defaultdict
+from dataclasses import dataclass, field
+from io import BytesIO
+
+from django.http import HttpResponse, StreamingHttpResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from obe.cache import cache_fragment, course_key, program_key, rollup_key, section_key
+from programs.models import PLO
+from .attainment import recompute_attainment, thresholds
+from .models import Attainment, AttainmentPolicy, Course, Section
+
+DEFAULT_THRESHOLD = AttainmentPolicy._meta.get_field('threshold').default
+
+
+@dataclass
+class MatrixCell:
+    students: int = 0
+    mean: float = 0.0
+    attained: int = 0        # students at or above the threshold
+    threshold: float = None  # None over courses with different thresholds
+
+    @property
+    def attained_percent(self):
+        return self.attained * 100 / self.students if self.students else 0.0
+
+    @property
+    def target(self):
+        return DEFAULT_THRESHOLD if self.threshold is None else self.threshold
+
+    @classmethod
+    def from_scores(cls, scores, threshold):
+        if not scores:
+            return cls(threshold=threshold)
+        return cls(len(scores), sum(scores) / len(scores), sum(score >= threshold for score in scores), threshold)
+
+    @classmethod
+    def combine(cls, cells):
+        """The cell of the students of all ``cells``, each attaining under its own threshold."""
+        students = sum(cell.students for cell in cells)
+        if not students:
+            return cls()
+        limits = {cell.threshold for cell in cells}
+        return cls(students, sum(cell.mean * cell.students for cell in cells) / students,
+                   sum(cell.attained for cell in cells), limits.pop() if len(limits) == 1 else None)
+
+
+@dataclass
+class MatrixCourse:
+    id: int
+    code: str
+    title: str
+    students: int = 0
+    cells: dict = field(default_factory=dict)  # {PLO numeric serial: MatrixCell}
+
+
+@dataclass
+class PLOMatrix:
+    program_id: int
+    year: int = None
+    semester: str = None
+    students: int = 0                             # distinct students over the program
+    plos: list = field(default_factory=list)      # [(numeric serial, 'PLO1', description)]
+    courses: list = field(default_factory=list)   # [MatrixCourse], by course code
+    totals: dict = field(default_factory=dict)    # {PLO numeric serial: MatrixCell} over the program
+
+    @property
+    def term(self):
+        parts = [str(part) for part in (self.semester, self.year) if part is not None]
+        return ' '.join(parts) if parts else 'All terms'
+
+
+def _sections(program_id, year=None, semester=None):
+    sections = Section.objects.filter(course__program_id=program_id)
+    if year is not None:
+        sections = sections.filter(year=year)
+    if semester is not None:
+        sections = sections.filter(semester=semester)
+    return sections
+
+
+def plo_matrix(program_id, year=None, semester=None):
+    """The PLO × course attainment matrix of a program, optionally for one year/term."""
+    recompute_attainment(_sections(program_id, year, semester))
+    return _plo_matrix(program_id, year, semester)
+
+
+def _matrix_dependencies(program_id, year=None, semester=None):
+    return [program_key(program_id), program_key(), course_key(), section_key(), rollup_key()]
+
+
+@cache_fragment(_matrix_dependencies)
+def _plo_matrix(program_id, year=None, semester=None):
+    rows = (Attainment.objects
+            .filter(section__in=_sections(program_id, year, semester), clo__plo__isnull=False)
+            .values_list('section__course_id', 'student_id', 'clo__plo__numberic_sl', 'attainment_value'))
+
+    # {(course, plo): {student: [CLO percentages]}}
+    scores = defaultdict(lambda: defaultdict(list))
+    course_students = defaultdict(set)
+    for course, student, plo, value in rows:
+        scores[course, plo][student].append(float(value))
+        course_students[course].add(student)
+
+    matrix = PLOMatrix(program_id, year, semester, len(set().union(*course_students.values())))
+    courses = {
+        course.id: MatrixCourse(course.id, course.code, course.title, len(course_students[course.id]))
+        for course in Course.objects.filter(program_id=program_id).order_by('code')
+    }
+    threshold = thresholds(list(courses))
+    plo_cells = defaultdict(list)
+    for (course, plo), students in scores.items():
+        means = [sum(values) / len(values) for values in students.values()]
+        cell = courses[course].cells[plo] = MatrixCell.from_scores(means, threshold[course])
+        plo_cells[plo].append(cell)
+    matrix.courses = list(courses.values())
+    matrix.totals = {plo: MatrixCell.combine(cells) for plo, cells in plo_cells.items()}
+    matrix.plos = [
+        (plo.numberic_sl, f'PLO{plo.numberic_sl}', plo.description or '')
+        for plo in PLO.objects.order_by('numberic_sl')
+    ]
+    return matrix
+
+
+def matrix_rows(matrix):
+    """Header row, then one row per course and a program total row."""
+    header = ['Course Code', 'Course Title', 'Students']
+    for _, code, _ in matrix.plos:
+        header += [f'{code} Mean %', f'{code} Attained %', f'{code} Students']
+    yield header
+
+    def cells(cells_by_plo):
+        values = []
+        for sl, _, _ in matrix.plos:
+            cell = cells_by_plo.get(sl)
+            if cell is None or not cell.students:
+                values += ['', '', 0]
+            else:
+                values += [round(cell.mean, 2), round(cell.attained_percent, 2), cell.students]
+        return values
+
+    for course in matrix.courses:
+        yield [course.code, course.title, course.students] + cells(course.cells)
+    yield ['Program', '', matrix.students] + cells(matrix.totals)
+
+
+def _filename(matrix, program_name, extension):
+    return f'PLO matrix - {program_name} - {matrix.term}.{extension}'
+
+
+class _Echo:
+    """A file-like object whose write() hands the line back to csv.writer's caller."""
+    def write(self, value):
+        return value
+
+
+def csv_response(matrix, program_name):
+    writer = csv.writer(_Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in matrix_rows(matrix)), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{_filename(matrix, program_name, "csv")}"'
+    return response
+
+
+def xlsx_response(matrix, program_name):
+    # A write-only workbook streams rows to its XML parts instead of keeping
+    # a cell object per value; an .xlsx is a zip, so it is sent whole.
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('PLO Matrix')
+    worksheet.append([f'{program_name} - {matrix.term}'])
+    bold = Font(bold=True)
+    for index, row in enumerate(matrix_rows(matrix)):
+        if index == 0:
+            row = [WriteOnlyCell(worksheet, value=value) for value in row]
+            for cell in row:
+                cell.font = bold
+        worksheet.append(row)
+    excel_file = BytesIO()
+    workbook.save(excel_file)
+    response = HttpResponse(
+        excel_file.getvalue(),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{_filename(matrix, program_name, "xlsx")}"'
+    return response
@@ -0,0 +1,157 @@
+"""
+Rebuilding the per-section rollups behind the program dashboard.
+
+``rebuild_rollups()`` recomputes one ``SectionRollup`` row per section from
+grouped aggregate queries (a fixed number per chunk of sections, whatever
+the number of students, marks or attendance records) and writes them with a
+single upsert per chunk.  It is meant to run nightly:
+
+    python manage.py rebuild_rollups
+
+and bumps ``rollup_key()`` so the cached dashboard tiles are rebuilt from
+the new figures on their next request.  In between, ``rebuild_changed()``
+rebuilds just the sections the change feed (courses.changes) reports.
+
+CLO attainment is read from the ``Attainment`` rows of courses.attainment,
+recomputed first for the sections that are stale; PLO attainment is the
+mean of the student's attainment on the section's CLOs mapped to that PLO.
+Students are counted per band of ``ATTAINMENT_BANDS``.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from obe.cache import bump, rollup_key
+from . import changes
+from .attainment import recompute_attainment
+from .models import (
+    CLO, AssessmentItem, AssessmentMark, Attainment, Attendance, Enrollment, Section, SectionRollup, Session,
+)
+
+# Lower edges (percent) of every band but the first: < 40, 40-59, 60-79, >= 80.
+ATTAINMENT_BANDS = (40, 60, 80)
+BAND_LABELS = ('< 40%', '40-59%', '60-79%', '80%+')
+CHUNK_SIZE = 500
+
+UPDATE_FIELDS = [
+    'program', 'department', 'year', 'semester', 'enrollment_count', 'backlog_count',
+    'session_count', 'held_session_count', 'attendance_rate', 'clo_count', 'planned_clo_count',
+    'item_count', 'graded_item_count', 'is_published', 'clo_attainment', 'plo_attainment', 'built_at',
+]
+
+
+def band(percent):
+    return bisect_right(ATTAINMENT_BANDS, percent)
+
+
+def _distribution(values_by_key):
+    """{key: [students per band]} from {key: [percentages]}."""
+    result = {}
+    for key, values in values_by_key.items():
+        counts = [0] * (len(ATTAINMENT_BANDS) + 1)
+        for value in values:
+            counts[band(value)] += 1
+        result[str(key)] = counts
+    return result
+
+
+def _attainment(section_ids):
+    """{section id: (CLO distribution, PLO distribution)}."""
+    rows = (Attainment.objects.filter(section_id__in=section_ids)
+            .values_list('section_id', 'student_id', 'clo__sl', 'clo__plo__numberic_sl', 'attainment_value'))
+    clos = defaultdict(lambda: defaultdict(list))
+    plos = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+    for section, student, clo, plo, value in rows:
+        percent = float(value)
+        clos[section][clo].append(percent)
+        if plo is not None:
+            plos[section][plo][student].append(percent)
+
+    result = {}
+    for section in clos.keys() | plos.keys():
+        per_plo = {
+            plo: [sum(values) / len(values) for values in students.values()]
+            for plo, students in plos[section].items()
+        }
+        result[section] = (_distribution(clos[section]), _distribution(per_plo))
+    return result
+
+
+def _grouped(queryset, key, **aggregates):
+    return {row[key]: row for row in queryset.values(key).annotate(**aggregates).order_by()}
+
+
+def _build_chunk(section_ids, built_at):
+    sections = (Section.objects.filter(pk__in=section_ids)
+                .values('id', 'year', 'semester', 'course_id', 'course__program_id',
+                        'course__program__department_id', 'assessment_template__is_published'))
+    enrollments = _grouped(Enrollment.objects.filter(section_id__in=section_ids), 'section_id',
+                           students=Count('pk'), backlog=Count('pk', filter=Q(enrollment_type='Backlog')))
+    sessions = _grouped(Session.objects.filter(section_id__in=section_ids, is_holiday=False), 'section_id',
+                        sessions=Count('pk', distinct=True), held=Count('attendance__session_id', distinct=True))
+    attendance = _grouped(Attendance.objects.filter(section_id__in=section_ids), 'section_id',
+                          marked=Count('pk'), present=Count('pk', filter=Q(is_present=True)))
+    items = _grouped(AssessmentItem.objects.filter(template__section_id__in=section_ids), 'template__section_id',
+                     items=Count('pk'), clos=Count('clo_id', distinct=True))
+    graded = _grouped(AssessmentMark.objects.filter(section_id__in=section_ids, marks__isnull=False), 'section_id',
+                      items=Count('assessment_item_id', distinct=True))
+    attainment = _attainment(section_ids)
+    sections = list(sections)
+    clo_counts = dict(CLO.objects.filter(course_id__in={row['course_id'] for row in sections})
+                      .values('course_id').annotate(n=Count('pk')).order_by().values_list('course_id', 'n'))
+
+    rollups = []
+    for row in sections:
+        pk = row['id']
+        enrolled = enrollments.get(pk, {})
+        scheduled = sessions.get(pk, {})
+        marked = attendance.get(pk)
+        planned = items.get(pk, {})
+        clo_attainment, plo_attainment = attainment.get(pk, ({}, {}))
+        rollups.append(SectionRollup(
+            section_id=pk,
+            program_id=row['course__program_id'],
+            department_id=row['course__program__department_id'],
+            year=row['year'],
+            semester=row['semester'],
+            enrollment_count=enrolled.get('students', 0),
+            backlog_count=enrolled.get('backlog', 0),
+            session_count=scheduled.get('sessions', 0),
+            held_session_count=scheduled.get('held', 0),
+            attendance_rate=marked['present'] * 100 / marked['marked'] if marked else None,
+            clo_count=clo_counts.get(row['course_id'], 0),
+            planned_clo_count=planned.get('clos', 0),
+            item_count=planned.get('items', 0),
+            graded_item_count=graded.get(pk, {}).get('items', 0),
+            is_published=bool(row['assessment_template__is_published']),
+            clo_attainment=clo_attainment,
+            plo_attainment=plo_attainment,
+            built_at=built_at,
+        ))
+    SectionRollup.objects.bulk_create(
+        rollups, update_conflicts=True, unique_fields=['section'], update_fields=UPDATE_FIELDS)
+    return len(rollups)
+
+
+def rebuild_rollups(sections=None, chunk_size=CHUNK_SIZE):
+    """Recompute the rollups of ``sections`` (default: every section); returns how many were written."""
+    if sections is None:
+        sections = Section.objects.all()
+    recompute_attainment(sections)
+    section_ids = list(sections.order_by('pk').values_list('pk', flat=True))
+    built_at = timezone.now()
+    written = 0
+    for start in range(0, len(section_ids), chunk_size):
+        written += _build_chunk(section_ids[start:start + chunk_size], built_at)
+    bump(rollup_key())
+    return written
+
+
+def rebuild_changed():
+    """Rebuild the rollups of the sections with changes in the feed since the last call."""
+    with changes.consume(changes.ROLLUPS) as section_ids:
+        if not section_ids:
+            return 0
+        return rebuild_rollups(Section.objects.filter(pk__in=section_ids))
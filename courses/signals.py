@@ -0,0 +1,123 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from accounts.models import Faculty
+from programs.models import Program, Department, PLO
+from obe.cache import bump, invalidate_section, course_key, faculty_key, program_key
+from . import changes, live
+from .models import (
+    Course, CLO, Section, Enrollment, AssessmentTemplate, AssessmentItem, AssessmentItemGroup,
+    AssessmentMark, Session, Attendance, ProjectGroup, ProjectGroupEnrollment, AttainmentPolicy, SectionChange
+)
+
+FEED_ENTITIES = {
+    AssessmentMark: SectionChange.MARK,
+    Attendance: SectionChange.ATTENDANCE,
+    Session: SectionChange.SESSION,
+    Enrollment: SectionChange.ENROLLMENT,
+    AssessmentItem: SectionChange.ITEM,
+    AssessmentItemGroup: SectionChange.ITEM_GROUP,
+}
+
+
+@receiver([post_save, post_delete], sender=Section)
+def section_changed(sender, instance, **kwargs):
+    invalidate_section(instance.pk, instance.course_id)
+    faculty_ids = {instance.primary_faculty_id, instance.secondary_faculty_id} - {None}
+    bump(*(faculty_key(pk) for pk in faculty_ids))
+
+
+@receiver(m2m_changed, sender=Section.faculties.through)
+def section_faculties_changed(sender, instance, action, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, Section):
+        invalidate_section(instance.pk, instance.course_id)
+        bump(*(faculty_key(pk) for pk in pk_set or ()))
+    else:
+        bump(faculty_key(instance.pk))
+        for section_id in pk_set or ():
+            invalidate_section(section_id)
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+@receiver([post_save, post_delete], sender=Session)
+@receiver([post_save, post_delete], sender=AssessmentTemplate)
+@receiver([post_save, post_delete], sender=ProjectGroup)
+@receiver([post_save, post_delete], sender=ProjectGroupEnrollment)
+def section_child_changed(sender, instance, **kwargs):
+    invalidate_section(instance.section_id)
+
+
+@receiver([post_save, post_delete], sender=AssessmentMark)
+@receiver([post_save, post_delete], sender=Attendance)
+def section_entry_changed(sender, instance, **kwargs):
+    # Grading and attendance leave the section listings alone.
+    invalidate_section(instance.section_id, collection=False)
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+@receiver([post_save, post_delete], sender=Session)
+@receiver([post_save, post_delete], sender=AssessmentMark)
+@receiver([post_save, post_delete], sender=Attendance)
+def section_child_recorded(sender, instance, **kwargs):
+    changes.record(FEED_ENTITIES[sender], [instance.section_id])
+
+
+@receiver(post_save, sender=AssessmentMark)
+@receiver(post_delete, sender=AssessmentMark)
+def mark_changed_live(sender, instance, signal, **kwargs):
+    live.publish(instance.section_id, live.mark_delta(instance, deleted=signal is post_delete))
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def attendance_changed_live(sender, instance, signal, **kwargs):
+    live.publish(instance.section_id, live.attendance_delta(instance, deleted=signal is post_delete))
+
+
+@receiver([post_save, post_delete], sender=AssessmentItem)
+@receiver([post_save, post_delete], sender=AssessmentItemGroup)
+def template_child_changed(sender, instance, **kwargs):
+    section_id = AssessmentTemplate.objects.filter(pk=instance.template_id).values_list('section_id', flat=True).first()
+    if section_id is not None:
+        invalidate_section(section_id)
+        changes.record(FEED_ENTITIES[sender], [section_id])
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_changed(sender, instance, **kwargs):
+    bump(course_key(instance.pk), course_key(), program_key(instance.program_id))
+
+
+@receiver([post_save, post_delete], sender=CLO)
+def clo_changed(sender, instance, **kwargs):
+    bump(course_key(instance.course_id), course_key())
+    changes.record_course(SectionChange.CLO, [instance.course_id])
+
+
+@receiver([post_save, post_delete], sender=AttainmentPolicy)
+def attainment_policy_changed(sender, instance, **kwargs):
+    bump(course_key(instance.course_id))
+    changes.record_course(SectionChange.POLICY, [instance.course_id])
+
+
+@receiver([post_save, post_delete], sender=Program)
+def program_changed(sender, instance, **kwargs):
+    bump(program_key(instance.pk), program_key())
+
+
+@receiver([post_save, post_delete], sender=PLO)
+def plo_changed(sender, instance, **kwargs):
+    # PLOs are shared by every program; cached assessment plans embed them
+    bump(program_key())
+
+
+@receiver([post_save, post_delete], sender=Department)
+def department_changed(sender, instance, **kwargs):
+    bump(program_key())
+
+
+@receiver([post_save, post_delete], sender=Faculty)
+def faculty_changed(sender, instance, **kwargs):
+    bump(faculty_key(instance.pk), faculty_key())
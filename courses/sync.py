@@ -0,0 +1,200 @@
+"""
+Replaying offline mark and attendance edits.
+
+The section page records every edit in an IndexedDB operation log and posts
+the log in batches to ``sync_operations``.  Each operation carries a client
+generated ``id`` and the time (``ts``, epoch milliseconds) the edit was made:
+
+    {"id": "...", "type": "mark", "ts": 1718000000000, "student": 5, "item": 7, "value": "8.5"}
+    {"id": "...", "type": "attendance", "ts": 1718000000000, "student": 5, "session": 3, "present": true}
+
+Operations are applied at most once (their ids are kept in SyncOperation) and
+last writer wins: an edit only replaces a stored value whose ``updated_at`` is
+not newer than the edit.  Applied edits store their own timestamp as
+``updated_at``, so batches synced out of order still converge.  A batch is
+read and written with a handful of queries regardless of its size.
+"""
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from obe.cache import invalidate_section
+from . import changes, live
+from .models import (
+    AssessmentItem, AssessmentMark, Attendance, Enrollment, SectionChange, Session, SyncOperation,
+)
+
+MAX_BATCH = 5000
+
+APPLIED, STALE, REJECTED = 'applied', 'stale', 'rejected'
+
+
+class Operation:
+    __slots__ = ('op_id', 'kind', 'timestamp', 'student_id', 'target_id', 'value', 'outcome')
+
+    def __init__(self, op_id, kind, timestamp, student_id, target_id, value):
+        self.op_id = op_id
+        self.kind = kind
+        self.timestamp = timestamp
+        self.student_id = student_id
+        self.target_id = target_id
+        self.value = value
+        self.outcome = None
+
+    @property
+    def cell(self):
+        return self.kind, self.student_id, self.target_id
+
+
+def _parse(raw, now):
+    """Return an Operation, or None when the op can't even be identified."""
+    if not isinstance(raw, dict):
+        return None
+    op_id = raw.get('id')
+    if not isinstance(op_id, str) or not 0 < len(op_id) <= 64:
+        return None
+    kind = raw.get('type')
+    try:
+        # Clocks of offline devices drift; never let an edit claim the future.
+        timestamp = min(datetime.fromtimestamp(int(raw['ts']) / 1000, tz=dt_timezone.utc), now)
+        student_id = int(raw['student'])
+        if kind == 'mark':
+            target_id = int(raw['item'])
+            value = raw.get('value')
+            value = None if value in (None, '') else Decimal(str(value))
+            if value is not None and not value.is_finite():
+                raise ValueError(value)    # NaN and Infinity don't compare with max_marks
+        elif kind == 'attendance':
+            target_id = int(raw['session'])
+            value = bool(raw['present'])
+        else:
+            raise ValueError(kind)
+    except (KeyError, TypeError, ValueError, OverflowError, OSError, InvalidOperation):
+        operation = Operation(op_id, kind if kind in ('mark', 'attendance') else 'mark', now, None, None, None)
+        operation.outcome = REJECTED
+        return operation
+    return Operation(op_id, kind, timestamp, student_id, target_id, value)
+
+
+def apply_operations(section, user, raw_operations):
+    """Apply a batch of offline edits to ``section``; returns {op id: outcome}."""
+    now = timezone.now()
+    operations, seen = [], set()
+    for raw in raw_operations:
+        operation = _parse(raw, now)
+        if operation is not None and operation.op_id not in seen:
+            seen.add(operation.op_id)
+            operations.append(operation)
+
+    with transaction.atomic():
+        done = dict(SyncOperation.objects.filter(op_id__in=seen).values_list('op_id', 'outcome'))
+        pending = [op for op in operations if op.op_id not in done and op.outcome is None]
+
+        students = set(Enrollment.objects.filter(section=section).values_list('student_id', flat=True))
+        max_marks = dict(AssessmentItem.objects.filter(template__section=section).values_list('id', 'max_marks'))
+        sessions = set(Session.objects.filter(section=section).values_list('id', flat=True))
+
+        latest = {}
+        for op in sorted(pending, key=lambda op: (op.timestamp, op.op_id)):
+            if op.student_id not in students:
+                op.outcome = REJECTED
+            elif op.kind == 'mark' and (
+                    op.target_id not in max_marks
+                    or (op.value is not None and not 0 <= op.value <= max_marks[op.target_id])):
+                op.outcome = REJECTED
+            elif op.kind == 'attendance' and op.target_id not in sessions:
+                op.outcome = REJECTED
+            else:
+                previous = latest.get(op.cell)
+                if previous is not None:
+                    previous.outcome = STALE    # superseded within the batch
+                latest[op.cell] = op
+
+        applied = _apply_marks(section, [op for op in latest.values() if op.kind == 'mark'])
+        applied += _apply_attendance(section, [op for op in latest.values() if op.kind == 'attendance'])
+
+        SyncOperation.objects.bulk_create([
+            SyncOperation(op_id=op.op_id, section=section, user=user, kind=op.kind,
+                          outcome=op.outcome, client_timestamp=op.timestamp)
+            for op in pending
+        ], ignore_conflicts=True)
+
+        for op in applied:
+            if op.kind == 'mark':
+                delta = {'t': 'm', 's': op.student_id, 'i': op.target_id,
+                         'v': None if op.value is None else str(op.value)}
+            else:
+                delta = {'t': 'a', 's': op.student_id, 'n': op.target_id, 'p': op.value}
+            live.publish(section.id, delta)
+
+    # bulk writes bypass the post_save receivers
+    if applied:
+        invalidate_section(section.id, collection=False)
+        for kind in {op.kind for op in applied}:
+            changes.record(SectionChange.MARK if kind == 'mark' else SectionChange.ATTENDANCE, [section.id])
+
+    results = {op.op_id: op.outcome for op in operations if op.outcome is not None}
+    results.update({op_id: outcome for op_id, outcome in done.items()})
+    return results
+
+
+def _merge(ops, existing, model, build, value_field):
+    """Shared last-writer-wins merge for one model; returns the applied ops."""
+    to_create, to_update, applied = [], [], []
+    for op in ops:
+        row = existing.get((op.student_id, op.target_id))
+        if row is not None and row.updated_at > op.timestamp:
+            op.outcome = STALE
+            continue
+        op.outcome = APPLIED
+        applied.append(op)
+        if row is None:
+            row = build(op)
+            to_create.append(row)
+        else:
+            to_update.append(row)
+        setattr(row, value_field, op.value)
+        row.updated_at = op.timestamp
+
+    if to_create:
+        stamps = [row.updated_at for row in to_create]
+        model.objects.bulk_create(to_create)
+        # auto_now overwrote updated_at on insert; restore the edit times.
+        for row, stamp in zip(to_create, stamps):
+            row.updated_at = stamp
+        to_update += [row for row in to_create if row.pk is not None]
+    if to_update:
+        model.objects.bulk_update(to_update, [value_field, 'updated_at'], batch_size=500)
+    return applied
+
+
+def _apply_marks(section, ops):
+    if not ops:
+        return []
+    existing = {
+        (row.student_id, row.assessment_item_id): row
+        for row in AssessmentMark.objects.select_for_update().filter(
+            section=section,
+            student_id__in={op.student_id for op in ops},
+            assessment_item_id__in={op.target_id for op in ops},
+        )
+    }
+    return _merge(ops, existing, AssessmentMark, lambda op: AssessmentMark(
+        student_id=op.student_id, assessment_item_id=op.target_id, section=section), 'marks')
+
+
+def _apply_attendance(section, ops):
+    if not ops:
+        return []
+    existing = {
+        (row.student_id, row.session_id): row
+        for row in Attendance.objects.select_for_update().order_by().filter(
+            section=section,
+            student_id__in={op.student_id for op in ops},
+            session_id__in={op.target_id for op in ops},
+        )
+    }
+    return _merge(ops, existing, Attendance, lambda op: Attendance(
+        student_id=op.student_id, session_id=op.target_id, section=section), 'is_present')
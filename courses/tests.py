@@ -1,3 +1,331 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import skipIf
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import Faculty, User
+from project_groups import ProjectGroupManager, Student as GroupStudent
+from programs.models import AllowedEmail, Department, PLO, Program
+from .analytics import np
+from .attainment import section_attainment
+from .models import (
+    CLO, AssessmentItem, AssessmentItemGroup, AssessmentMark, AssessmentTemplate, Attendance, AttainmentPolicy,
+    Course, Enrollment, ProjectGroup, ProjectGroupEnrollment, Section, Session, Student, SyncOperation,
+)
+from .grouping import form_groups
+from .plans import PlanError, apply_plan, build_plan, declaration
+from .sync import APPLIED, REJECTED, STALE, apply_operations
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'obe-tests'}}
+
+
+def make_section(students=4):
+    """A section of CSE101 with ``students`` enrolled students, two CLOs and an empty template."""
+    department = Department.objects.create(name='Computer Science', short_name='CSE')
+    program = Program.objects.create(name='BSc CSE', department=department)
+    plo = PLO.objects.create(numberic_sl=1, alphabatic_sl='a')
+    user = User.objects.create_user('faculty', 'faculty@example.com', 'password')
+    allowed = AllowedEmail.objects.create(email='faculty@example.com', level=1, department=department)
+    faculty = Faculty.objects.create(user=user, allowed_email=allowed, name='Faculty One', short_name='F1',
+                                     department=department, designation='Lecturer')
+    course = Course.objects.create(code='CSE101', title='Introduction', program=program, credits=3)
+    CLO.objects.create(course=course, sl=1, plo=plo, description='CLO 1')
+    CLO.objects.create(course=course, sl=2, plo=plo, description='CLO 2')
+    section = Section.objects.create(course=course, name='A', year=2025, semester='Spring', primary_faculty=faculty)
+    AssessmentTemplate.objects.create(section=section)
+    for i in range(students):
+        student = Student.objects.create(student_id=f'S{i:03d}', name=f'Student {i}', program=program)
+        Enrollment.objects.create(student=student, section=section)
+    return section
+
+
+def epoch_ms(moment):
+    return int(moment.timestamp() * 1000)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ApplyOperationsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.section = make_section()
+        cls.user = cls.section.primary_faculty.user
+        cls.student = Student.objects.get(student_id='S000')
+        cls.item = AssessmentItem.objects.create(
+            template=cls.section.assessment_template, name='Quiz 1', assessment_type='Assessment',
+            clo=cls.section.course.clos.get(sl=1), max_marks=10)
+        cls.session = Session.objects.create(section=cls.section, session_number=1, date=date(2025, 1, 5))
+
+    def mark_op(self, op_id, value, when, student=None):
+        return {'id': op_id, 'type': 'mark', 'ts': epoch_ms(when),
+                'student': (student or self.student).id, 'item': self.item.id, 'value': value}
+
+    def stored_mark(self):
+        return AssessmentMark.objects.get(student=self.student, assessment_item=self.item)
+
+    def test_creates_a_missing_mark_with_the_edit_time(self):
+        when = timezone.now() - timedelta(minutes=5)
+        results = apply_operations(self.section, self.user, [self.mark_op('op-1', '7.5', when)])
+
+        self.assertEqual(results, {'op-1': APPLIED})
+        mark = self.stored_mark()
+        self.assertEqual(mark.marks, Decimal('7.5'))
+        self.assertEqual(mark.section_id, self.section.id)
+        self.assertEqual(epoch_ms(mark.updated_at), epoch_ms(when))
+
+    def test_creates_a_missing_attendance_row(self):
+        op = {'id': 'op-1', 'type': 'attendance', 'ts': epoch_ms(timezone.now()),
+              'student': self.student.id, 'session': self.session.id, 'present': True}
+
+        self.assertEqual(apply_operations(self.section, self.user, [op]), {'op-1': APPLIED})
+        self.assertTrue(Attendance.objects.get(student=self.student, session=self.session).is_present)
+
+    def test_replayed_batch_returns_recorded_outcomes_without_reapplying(self):
+        earlier = timezone.now() - timedelta(minutes=10)
+        batch = [self.mark_op('op-1', '4', earlier)]
+        apply_operations(self.section, self.user, batch)
+        apply_operations(self.section, self.user, [self.mark_op('op-2', '9', earlier + timedelta(minutes=1))])
+
+        self.assertEqual(apply_operations(self.section, self.user, batch), {'op-1': APPLIED})
+        self.assertEqual(self.stored_mark().marks, Decimal('9'))
+        self.assertEqual(SyncOperation.objects.filter(op_id='op-1').count(), 1)
+
+    def test_edit_older_than_the_stored_value_is_stale(self):
+        now = timezone.now()
+        apply_operations(self.section, self.user, [self.mark_op('op-1', '8', now - timedelta(minutes=1))])
+
+        results = apply_operations(self.section, self.user, [self.mark_op('op-2', '3', now - timedelta(minutes=2))])
+
+        self.assertEqual(results, {'op-2': STALE})
+        self.assertEqual(self.stored_mark().marks, Decimal('8'))
+
+    def test_older_edit_of_a_cell_within_a_batch_is_stale(self):
+        now = timezone.now()
+        results = apply_operations(self.section, self.user, [
+            self.mark_op('op-new', '6', now - timedelta(minutes=1)),
+            self.mark_op('op-old', '2', now - timedelta(minutes=2)),
+        ])
+
+        self.assertEqual(results, {'op-new': APPLIED, 'op-old': STALE})
+        self.assertEqual(self.stored_mark().marks, Decimal('6'))
+
+    def test_non_finite_marks_are_rejected(self):
+        now = timezone.now()
+        values = ['NaN', 'sNaN', 'Infinity', '-Infinity']
+        results = apply_operations(self.section, self.user, [
+            self.mark_op(f'op-{value}', value, now) for value in values
+        ])
+
+        self.assertEqual(results, {f'op-{value}': REJECTED for value in values})
+        self.assertFalse(AssessmentMark.objects.filter(assessment_item=self.item).exists())
+
+    def test_out_of_range_marks_and_unenrolled_students_are_rejected(self):
+        now = timezone.now()
+        outsider = Student.objects.create(student_id='X001', name='Outsider', program=self.section.course.program)
+        results = apply_operations(self.section, self.user, [
+            self.mark_op('op-high', '11', now),
+            self.mark_op('op-negative', '-1', now),
+            self.mark_op('op-outsider', '5', now, student=outsider),
+        ])
+
+        self.assertEqual(set(results.values()), {REJECTED})
+        self.assertFalse(AssessmentMark.objects.filter(assessment_item=self.item).exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ApplyPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.section = make_section()
+        cls.template = cls.section.assessment_template
+        cls.clo = cls.section.course.clos.get(sl=1)
+        cls.quiz = AssessmentItem.objects.create(
+            template=cls.template, name='Quiz 1', assessment_type='Assessment', clo=cls.clo, max_marks=10)
+        cls.mid = AssessmentItem.objects.create(
+            template=cls.template, name='Mid', assessment_type='Midterm', clo=cls.clo, max_marks=30)
+
+    def item(self, name, key=None, max_marks='10'):
+        entry = {'name': name, 'assessment_type': 'Assessment', 'clo_id': self.clo.id, 'max_marks': max_marks}
+        if key is not None:
+            entry['key'] = key
+        return entry
+
+    def stored(self):
+        return declaration(build_plan(self.section))
+
+    def test_applying_the_stored_plan_changes_nothing(self):
+        result = apply_plan(self.section, self.stored())
+
+        self.assertEqual(result, {'created': 0, 'updated': 0, 'deleted': 0, 'ids': {'items': {}, 'groups': {}}})
+
+    def test_new_items_and_groups_are_created_by_key(self):
+        plan = self.stored()
+        plan['items'] += [self.item('Quiz 2', key='q2'), self.item('Quiz 3', key='q3'), self.item('Lab')]
+        plan['groups'] = [{'name': 'Quizzes', 'key': 'q2', 'max_count': 2, 'clo_id': self.clo.id,
+                           'items': [self.quiz.id, 'q2', 'q3']}]
+
+        result = apply_plan(self.section, plan)
+
+        self.assertEqual(result['created'], 4)
+        self.assertEqual(set(result['ids']['items']), {'q2', 'q3'})
+        group = AssessmentItemGroup.objects.get(pk=result['ids']['groups']['q2'])
+        self.assertEqual(
+            set(group.assessment_items.values_list('pk', flat=True)),
+            {self.quiz.id, result['ids']['items']['q2'], result['ids']['items']['q3']})
+        self.assertTrue(AssessmentItem.objects.filter(template=self.template, name='Lab', group=None).exists())
+
+    def test_items_missing_from_the_plan_are_deleted_with_their_marks(self):
+        student = Student.objects.get(student_id='S000')
+        AssessmentMark.objects.create(assessment_item=self.mid, student=student, marks=20)
+        plan = self.stored()
+        plan['items'] = [entry for entry in plan['items'] if entry['id'] != self.mid.id]
+
+        result = apply_plan(self.section, plan)
+
+        self.assertEqual(result['deleted'], 1)
+        self.assertFalse(AssessmentItem.objects.filter(pk=self.mid.id).exists())
+        self.assertFalse(AssessmentMark.objects.filter(student=student).exists())
+
+    def test_invalid_plans_raise_plan_error_and_write_nothing(self):
+        other = AssessmentItem.objects.create(
+            template=AssessmentTemplate.objects.create(section=Section.objects.create(
+                course=self.section.course, name='B', year=2025, semester='Spring',
+                primary_faculty=self.section.primary_faculty)),
+            name='Other', assessment_type='Assessment', clo=self.clo, max_marks=10)
+        stored = self.stored()
+        group = {'name': 'Quizzes', 'max_count': 1, 'clo_id': self.clo.id, 'items': ['a']}
+        invalid = {
+            'not an object': [],
+            'non-finite max marks': {'items': stored['items'] + [self.item('Quiz 2', max_marks='NaN')]},
+            'list key': {'items': stored['items'] + [self.item('Quiz 2', key=['a'])]},
+            'duplicate item key': {'items': stored['items'] + [self.item('A', key='a'), self.item('B', key='a')]},
+            'item of another section': {'items': stored['items'] + [dict(self.item('Other'), id=other.id)]},
+            'unknown member': {'items': stored['items'], 'groups': [dict(group, items=[999])]},
+            'duplicate group key': {'items': stored['items'] + [self.item('A', key='a'), self.item('B', key='b')],
+                                    'groups': [dict(group, key='g'), dict(group, key='g', items=['b'])]},
+        }
+        for label, plan in invalid.items():
+            with self.subTest(label), self.assertRaises(PlanError):
+                apply_plan(self.section, plan)
+        self.assertEqual(self.stored(), stored)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FormGroupsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.section = make_section(students=11)
+        Enrollment.objects.filter(section=cls.section, student__student_id__in=['S000', 'S004', 'S008']).update(
+            enrollment_type='Backlog')
+
+    def memberships(self):
+        rows = ProjectGroupEnrollment.objects.filter(section=self.section).values_list('project_group_id', 'student_id')
+        groups = {}
+        for group_id, student_id in rows:
+            groups.setdefault(group_id, []).append(student_id)
+        return groups
+
+    def assertBalanced(self, groups):
+        sizes = [len(members) for members in groups.values()]
+        self.assertLessEqual(max(sizes) - min(sizes), 1)
+        students = [student for members in groups.values() for student in members]
+        enrolled = Enrollment.objects.filter(section=self.section).values_list('student_id', flat=True)
+        self.assertCountEqual(students, enrolled)
+
+    def test_every_student_lands_in_exactly_one_group_of_balanced_size(self):
+        groups = form_groups(self.section, group_size=3, keep_together=[('S001', 'S002')])
+
+        self.assertEqual(len(groups), 4)
+        memberships = self.memberships()
+        self.assertBalanced(memberships)
+        pair = Student.objects.filter(student_id__in=['S001', 'S002']).values_list('pk', flat=True)
+        self.assertTrue(any(set(pair) <= set(members) for members in memberships.values()))
+
+    def test_replace_regroups_everyone(self):
+        form_groups(self.section, group_count=2)
+        form_groups(self.section, group_count=5, replace=True)
+
+        self.assertEqual(ProjectGroup.objects.filter(section=self.section).count(), 5)
+        self.assertBalanced(self.memberships())
+
+
+@skipIf(np is None, 'numpy is not installed')
+@override_settings(CACHES=LOCMEM_CACHE)
+class SectionAttainmentTests(TestCase):
+    """Scores checked against hand-computed values on a three-student section."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.section = make_section(students=3)
+        course = cls.section.course
+        template = cls.section.assessment_template
+        clo1, clo2 = course.clos.get(sl=1), course.clos.get(sl=2)
+        AttainmentPolicy.objects.create(course=course, assessment_weight=1, midterm_weight=3, final_weight=1,
+                                        threshold=50)
+        quiz = AssessmentItem.objects.create(
+            template=template, name='Quiz', assessment_type='Assessment', clo=clo1, max_marks=10)
+        mid = AssessmentItem.objects.create(
+            template=template, name='Mid', assessment_type='Midterm', clo=clo1, max_marks=20)
+        group = AssessmentItemGroup.objects.create(template=template, name='Labs', max_count=2, clo=clo2)
+        labs = [
+            AssessmentItem.objects.create(template=template, name=f'Lab {n}', assessment_type='Assessment',
+                                          clo=clo2, max_marks=10, group=group, in_group=True)
+            for n in (1, 2, 3)
+        ]
+        marks = {
+            'S000': {quiz: 8, mid: 10, labs[0]: 5, labs[1]: 7, labs[2]: 10},
+            'S001': {quiz: 4, mid: 8, labs[0]: 10, labs[1]: 10, labs[2]: 0},
+            'S002': {quiz: 3},
+        }
+        for code, row in marks.items():
+            student = Student.objects.get(student_id=code)
+            for item, value in row.items():
+                AssessmentMark.objects.create(assessment_item=item, student=student, marks=value)
+
+    def test_scores_and_pass_rates_match_hand_computed_values(self):
+        result = section_attainment(self.section)
+
+        scores = {row['student_id']: row['scores'] for row in result['students']}
+        # CLO1: (1 * quiz% + 3 * mid%) / 4, over the types the student was graded on.
+        #   S000: (0.8 + 3 * 0.5) / 4 = 57.5   S001: (0.4 + 3 * 0.4) / 4 = 40   S002: quiz only, 30
+        # CLO2: the best-of-two group counts Lab 1 and Lab 2 only.
+        #   S000: 12 / 20 = 60   S001: 20 / 20 = 100
+        self.assertEqual(scores, {
+            'S000': {'CLO1': 57.5, 'CLO2': 60.0},
+            'S001': {'CLO1': 40.0, 'CLO2': 100.0},
+            'S002': {'CLO1': 30.0},
+        })
+        clo1, clo2 = result['clos']
+        self.assertEqual((clo1['students'], clo1['attained']), (3, 1))
+        self.assertAlmostEqual(clo1['mean'], 42.5)
+        self.assertAlmostEqual(clo1['pass_rate'], 100 / 3)
+        self.assertEqual((clo2['students'], clo2['attained']), (2, 2))
+        self.assertAlmostEqual(clo2['mean'], 80.0)
+        self.assertEqual(result['threshold'], 50)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ProjectGroupManagerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.section = make_section(students=2)
+        Student.objects.create(student_id='X001', name='Outsider', program=cls.section.course.program)
+
+    def test_save_refuses_students_not_enrolled_in_the_section(self):
+        manager = ProjectGroupManager()
+        group = manager.create_group('Compiler')
+        for student_id in ('S000', 'S001', 'X001'):
+            group.add_student(GroupStudent(student_id, student_id))
+
+        with self.assertRaisesMessage(ValueError, 'X001'):
+            manager.save(self.section)
+        self.assertFalse(ProjectGroup.objects.filter(section=self.section).exists())
+
+        manager.remove_student('X001')
+        manager.save(self.section)
+        self.assertEqual(ProjectGroupEnrollment.objects.filter(section=self.section).count(), 2)
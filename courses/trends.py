@@ -0,0 +1,160 @@
+"""
+CLO attainment trends across terms.
+
+``CLOTrend`` holds one row per (course, CLO serial number, term) with the
+mean, pass rate and percentile bands of the students' CLO attainment: the
+``Attainment`` rows of courses.attainment, recomputed first where stale,
+with the pass rate taken against the course's threshold.  Rows are only
+ever rebuilt a term at a time:
+
+    refresh_clo_trends()                  # terms that changed since their last build
+    refresh_changed()                     # terms of the sections in the change feed
+    refresh_clo_trends([(2025, 'Fall')])  # just this term
+    refresh_clo_trends(full=True)         # every term
+
+A term is stale when it has marks but no trend rows yet, or when the change
+feed (courses.changes) has a change to the marks, items, enrollments, CLOs
+or attainment policy of one of its sections since its rows were built.  The feed carries the server's
+time; a synced mark's ``updated_at`` is the client's edit time, and queryset
+updates don't set it.  ``refresh_changed()`` consumes the feed instead, for
+the periodic job.  A section deleted outright takes its term with it, so a
+periodic ``full`` refresh is still worth running.
+
+``trend_series(course_id)`` turns a course's rows into chart-ready series.
+"""
+import statistics
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from obe.cache import bump, cache_fragment, course_key, rollup_key
+from . import changes
+from .attainment import recompute_attainment, thresholds
+from .dashboard import SEMESTER_ORDER
+from .models import AssessmentMark, Attainment, CLOTrend, Section, SectionChange
+
+UPDATE_FIELDS = ['sections', 'students', 'mean', 'pass_rate', 'p10', 'p25', 'p50', 'p75', 'p90', 'built_at']
+
+
+def _term_order(term):
+    year, semester = term
+    return year, SEMESTER_ORDER.get(semester, 0)
+
+
+def stale_terms():
+    """Terms whose trend rows are missing or older than their newest change in the feed."""
+    built = {
+        (year, semester): when
+        for year, semester, when in CLOTrend.objects.values_list('year', 'semester')
+        .annotate(built=Min('built_at')).order_by()
+    }
+    stale = set(AssessmentMark.objects.values_list('section__year', 'section__semester')
+                .distinct().order_by()) - built.keys()
+    changed = dict(SectionChange.objects.filter(entity__in=changes.CONSUMERS[changes.CLO_TRENDS])
+                   .values_list('section_id').annotate(Max('changed_at')).order_by())
+    for pk, year, semester in Section.objects.filter(pk__in=list(changed)).values_list('pk', 'year', 'semester'):
+        term = (year, semester)
+        if term in built and changed[pk] > built[term]:
+            stale.add(term)
+    return sorted(stale, key=_term_order)
+
+
+def _percentiles(scores):
+    """p10, p25, p50, p75 and p90 of a list of scores."""
+    if len(scores) == 1:
+        return scores * 5
+    cuts = statistics.quantiles(scores, n=20, method='inclusive')
+    return [cuts[1], cuts[4], cuts[9], cuts[14], cuts[17]]
+
+
+def _term_filter(terms, prefix=''):
+    return reduce(or_, (Q(**{f'{prefix}year': year, f'{prefix}semester': semester}) for year, semester in terms))
+
+
+def _build(terms, built_at):
+    """CLOTrend rows for ``terms`` from their Attainment rows."""
+    rows = (Attainment.objects.filter(_term_filter(terms, 'section__'))
+            .values_list('section__course_id', 'clo__sl', 'section__year', 'section__semester',
+                         'section_id', 'attainment_value'))
+    scores = defaultdict(list)
+    sections = defaultdict(set)
+    for course, sl, year, semester, section, value in rows:
+        scores[course, sl, year, semester].append(float(value))
+        sections[course, sl, year, semester].add(section)
+
+    threshold = thresholds({course for course, _, _, _ in scores})
+    trends = []
+    for (course, sl, year, semester), values in scores.items():
+        p10, p25, p50, p75, p90 = _percentiles(values)
+        trends.append(CLOTrend(
+            course_id=course, clo_sl=sl, year=year, semester=semester,
+            sections=len(sections[course, sl, year, semester]), students=len(values),
+            mean=sum(values) / len(values),
+            pass_rate=sum(value >= threshold[course] for value in values) * 100 / len(values),
+            p10=p10, p25=p25, p50=p50, p75=p75, p90=p90,
+            built_at=built_at,
+        ))
+    return trends
+
+
+def refresh_clo_trends(terms=None, full=False):
+    """Rebuild the trend rows of ``terms`` (default: the stale ones); returns the terms rebuilt."""
+    if full:
+        terms = sorted(set(AssessmentMark.objects.values_list('section__year', 'section__semester')
+                           .distinct().order_by()), key=_term_order)
+    elif terms is None:
+        terms = stale_terms()
+    terms = [tuple(term) for term in terms]
+    if not terms:
+        return []
+
+    recompute_attainment(Section.objects.filter(_term_filter(terms)))
+    built_at = timezone.now()
+    trends = _build(terms, built_at)
+    CLOTrend.objects.bulk_create(
+        trends, update_conflicts=True,
+        unique_fields=['course', 'clo_sl', 'year', 'semester'], update_fields=UPDATE_FIELDS,
+    )
+    # Rows the upsert didn't touch belong to CLOs or sections that no longer
+    # have marks in the rebuilt terms.
+    stale = CLOTrend.objects.filter(built_at__lt=built_at)
+    if not full:
+        stale = stale.filter(_term_filter(terms))
+    stale.delete()
+    bump(rollup_key())
+    return terms
+
+
+def refresh_changed():
+    """Rebuild the terms of the sections with changes in the feed since the last call."""
+    with changes.consume(changes.CLO_TRENDS) as section_ids:
+        terms = set(Section.objects.filter(pk__in=section_ids).values_list('year', 'semester').order_by())
+        return refresh_clo_trends(sorted(terms, key=_term_order))
+
+
+@cache_fragment(lambda course_id: [rollup_key(), course_key(course_id)])
+def trend_series(course_id):
+    """
+    A course's CLO trends as chart series: ``terms`` are the labels, and
+    every CLO has one list per measure, aligned with them (None where the
+    CLO wasn't assessed that term).
+    """
+    rows = list(CLOTrend.objects.filter(course_id=course_id))
+    terms = sorted({(row.year, row.semester) for row in rows}, key=_term_order)
+    index = {term: position for position, term in enumerate(terms)}
+    measures = ('mean', 'pass_rate', 'p10', 'p25', 'p50', 'p75', 'p90', 'students', 'sections')
+    clos = {}
+    for row in rows:
+        series = clos.setdefault(row.clo_sl, {measure: [None] * len(terms) for measure in measures})
+        position = index[row.year, row.semester]
+        for measure in measures:
+            value = getattr(row, measure)
+            series[measure][position] = round(value, 2) if isinstance(value, float) else value
+    return {
+        'terms': [f'{semester} {year}' for year, semester in terms],
+        'target': thresholds([course_id])[course_id],
+        'clos': [dict(sl=sl, code=f'CLO{sl}', **clos[sl]) for sl in sorted(clos)],
+    }
@@ -9,9 +9,12 @@ urlpatterns = [
     path('courses/<int:pk>/edit/', views.course_update, name='course_update'),
     path('courses/<int:pk>/delete/', views.course_delete, name='course_delete'),
     path('courses/<str:course_code>/sections/', views.section_list, name='section_list'),
+    path('courses/<int:course_id>/clo-trends/', views.clo_trends_api, name='clo_trends'),
     path('sections/<int:section_id>/', views.section_detail, name='section_detail'),
     path('courses/<int:course_id>/sections/create/', views.create_section, name='create_section'),
     path('courses/select-course/', views.select_course, name='select_course'),
+    path('dashboard/', views.program_dashboard, name='program_dashboard'),
+    path('programs/<int:program_id>/plo-matrix/', views.plo_matrix_view, name='plo_matrix'),
     
     # Bulk enrollment URLs
     path('sections/<int:section_id>/enroll/', views.bulk_enroll_view, name='bulk_enroll'),
@@ -22,6 +25,8 @@ urlpatterns = [
     path('sections/<int:section_id>/template/', views.assessment_template, name='assessment_template'),
     path('sections/<int:section_id>/marks/', views.enter_marks, name='enter_marks'),
     path('sections/<int:section_id>/analytics/', views.obe_analytics, name='obe_analytics'),
+    path('sections/<int:section_id>/item-analysis/', views.item_analysis_view, name='item_analysis'),
+    path('sections/<int:section_id>/attainment/', views.section_attainment_api, name='section_attainment'),
     
     # Single enrollment URL
     path('sections/<int:section_id>/single-enroll/', views.single_enroll_view, name='single_enroll'),
@@ -73,5 +78,8 @@ urlpatterns = [
     path('sections/<int:section_id>/add-assessment-group/', views.add_assessment_group_view, name='add_assessment_group'),
     path('sections/<int:section_id>/delete-assessment-group/', views.delete_assessment_group_view, name='delete_assessment_group'),
     path('sections/<int:section_id>/edit-assessment-group/', views.edit_assessment_group_view, name='edit_assessment_group'),
+    path('sections/<int:section_id>/assessment-plan/', views.assessment_plan_view, name='assessment_plan'),
+    path('sections/<int:section_id>/clone-setup/', views.clone_section_setup_view, name='clone_section_setup'),
     path('sections/<int:section_id>/autosave-mark/', views.autosave_mark, name='autosave_mark'),
+    path('sections/<int:section_id>/sync/', views.sync_operations, name='sync_operations'),
 ] 
\ No newline at end of file
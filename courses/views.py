@@ -2,18 +2,19 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.http import JsonResponse
-from django.db.models import Sum, Avg, F, Q
-from django.core.exceptions import PermissionDenied
+from django.db.models import Sum, Avg, F, Q, Case, When, Value
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from django.http import Http404
 from .models import (
     Course, CLO, Section, Student, Enrollment,
     AssessmentTemplate, AssessmentItem, AssessmentItemGroup, AssessmentMark, Attainment,
-    ProjectGroup, Session, Attendance
+    ProjectGroup, ProjectGroupEnrollment, Session, Attendance
 )
 from accounts.models import Faculty, Holiday
 from programs.models import Program, PLO, Department
-from .forms import CourseForm, SectionForm, BulkEnrollForm, EnrollmentForm, CLOForm
+from .forms import CourseForm, SectionForm, BulkEnrollForm, EnrollmentForm, CLOForm, CloneSetupForm
 from django.core.exceptions import ValidationError
-from accounts.views import faculty_required, require_access_level
+from accounts.views import faculty_required, require_access_level, async_login_required, async_require_http_methods
 from django.db import transaction
 from django.db import IntegrityError
 from django import forms
@@ -25,33 +26,81 @@ from openpyxl.styles import Font, Alignment
 from django.http import HttpResponse
 from io import BytesIO
 from openpyxl.utils.cell import get_column_letter
-from .models import AssessmentItemGroup
+from .models import AssessmentItemGroup, SectionChange
+from . import changes
+from obe.cache import cache_view, invalidate_section, course_key, section_key
+from obe.routers import use_replica
+from .plans import PlanError, apply_plan, declaration, get_plan
+from .cloning import clone_setup
+from .grouping import form_groups
+from .dashboard import attainment_tile, attendance_tile, plan_tile, term_tile
+from .reports import DEFAULT_THRESHOLD, csv_response, plo_matrix, xlsx_response
+from .trends import trend_series
+from .analytics import item_analysis
+from .attainment import section_attainment
+from .browse import SectionFilter, browse_request, courses_with_sections, available_years
+from .sync import apply_operations, MAX_BATCH as SYNC_MAX_BATCH
 MAX_COUNT_CHOICES = AssessmentItemGroup.MAX_COUNT_CHOICES[:9]  # Only up to Top 9
 
+
+async def aget_object_or_404(queryset, **kwargs):
+    """get_object_or_404 for async views; accepts a model or a queryset."""
+    if not hasattr(queryset, 'aget'):
+        queryset = queryset._default_manager.all()
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+
+
+async def user_teaches(user, section):
+    """Async form of the superuser-or-section-faculty check used by the views."""
+    if user.is_superuser:
+        return True
+    return await section.faculties.filter(id=user.faculty.id).aexists()
+
+
 @login_required
 @faculty_required
+@cache_view(lambda request: [course_key(), section_key()])
 def course_list(request):
+    filters = SectionFilter.from_request(request)
     if request.user.is_superuser:
-        courses = Course.objects.all()
+        sections = Section.objects.all()
+        if filters.as_dict():
+            courses = courses_with_sections(sections, filters)
+        else:
+            courses = Course.objects.select_related('program')
     else:
         faculty = get_object_or_404(Faculty, user=request.user)
-        courses = Course.objects.filter(sections__faculties=faculty).distinct()
+        sections = Section.objects.filter(faculties=faculty)
+        courses = courses_with_sections(sections, filters)
     
-    return render(request, 'courses/course_list.html', {'courses': courses})
+    return render(request, 'courses/course_list.html', {
+        'courses': courses.order_by('code'),
+        'filters': filters,
+        'years': available_years(sections),
+        'programs': Program.objects.all(),
+    })
 
 @login_required
 @faculty_required
 def all_sections(request, f_id):
     faculty = get_object_or_404(Faculty, pk=f_id)
     sections = Section.objects.filter(faculties=faculty)
-    print(len(sections))
+    page = browse_request(request, sections.select_related('course__program__department'))
     return render(request, 'courses/all_sections.html', {
-        'sections': sections,
+        'sections': page,
+        'page': page,
+        'filters': page.filters,
+        'years': available_years(sections),
+        'departments': Department.objects.all().order_by('name'),
         'title': 'All Sections'
     })
 
 @login_required
 @faculty_required
+@cache_view(lambda request, course_code: [course_key(), section_key()])
 def section_list(request, course_code):
     course = get_object_or_404(Course, code=course_code)
     if request.user.is_superuser:
@@ -59,10 +108,14 @@ def section_list(request, course_code):
     else:
         faculty = get_object_or_404(Faculty, user=request.user)
         sections = Section.objects.filter(course=course, faculties=faculty)
+    page = browse_request(request, sections)
     
     return render(request, 'courses/section_list.html', {
         'course': course,
-        'sections': sections,
+        'sections': page,
+        'page': page,
+        'filters': page.filters,
+        'years': available_years(sections),
         'title': f'Sections - {course.code}'
     })
 
@@ -84,11 +137,11 @@ def section_detail(request, section_id):
 
     # Get assessment template if exists
     template = AssessmentTemplate.objects.filter(section=section).first()
-    assessment_items = template.assessment_items.all() if template else []
+    assessment_items = get_plan(section).items if template else []
 
-    # Fetch all marks for this section's assessment items and students
-    marks_qs = AssessmentMark.objects.filter(assessment_item__in=assessment_items, student__in=[e.student for e in enrollments])
-    marks_dict = {(m.student_id, m.assessment_item_id): m.marks for m in marks_qs}
+    # Fetch all marks for this section in one range scan on section_id
+    marks_qs = AssessmentMark.objects.filter(section=section).values_list('student_id', 'assessment_item_id', 'marks')
+    marks_dict = {(student_id, item_id): marks for student_id, item_id, marks in marks_qs}
 
     context = {
         'section': section,
@@ -390,6 +443,7 @@ def enter_marks(request, section_id):
     })
 
 @login_required
+@use_replica
 def obe_analytics(request, section_id):
     section = get_object_or_404(Section, id=section_id)
     if not request.user.is_superuser and section.teacher.user != request.user:
@@ -429,6 +483,7 @@ def obe_analytics(request, section_id):
     })
 
 @login_required
+@use_replica
 def student_attainment_history(request, student_id):
     student = get_object_or_404(Student, student_id=student_id)
     if not request.user.is_superuser:
@@ -717,21 +772,20 @@ def resolve_conflicts_view(request, section_id):
         'title': f'Resolve Enrollment Conflicts - {section.course.code} Section {section.name}'
     })
 
-@login_required
+@async_login_required
 @faculty_required
-def search_students_ajax(request):
+async def search_students_ajax(request):
     """AJAX endpoint to search for students by ID or name."""
     term = request.GET.get('term', '')
-    students = []
+    results = []
     if term:
         # Search by student_id (exact match) or name (case-insensitive contains)
         students = Student.objects.filter(
             Q(student_id__iexact=term) | Q(name__icontains=term)
         ).values('student_id', 'name')[:10] # Limit results
-        
-    # Format results for Select2 or similar autocomplete libraries if needed, 
-    # but simple list of dicts is generally usable.
-    results = list(students) # Convert queryset to list
+        # Format results for Select2 or similar autocomplete libraries if needed,
+        # but simple list of dicts is generally usable.
+        results = [student async for student in students]
 
     return JsonResponse(results, safe=False)
 
@@ -875,6 +929,27 @@ def manage_project_groups_view(request, section_id):
             except Exception as e:
                 messages.error(request, f'Error deleting project group: {str(e)}')
 
+        elif action == 'form_groups':
+            try:
+                group_size = int(request.POST.get('group_size') or 0) or None
+                group_count = int(request.POST.get('group_count') or 0) or None
+                keep_together = [
+                    tuple(part.strip() for part in line.split(','))
+                    for line in request.POST.get('keep_together', '').splitlines() if line.count(',') == 1
+                ]
+                groups = form_groups(
+                    section,
+                    group_size=group_size,
+                    group_count=group_count,
+                    keep_together=keep_together,
+                    balance_attainment=request.POST.get('balance_attainment') == 'on',
+                    spread_backlog=request.POST.get('spread_backlog') == 'on',
+                    replace=request.POST.get('replace') == 'on',
+                )
+                messages.success(request, f'Formed {len(groups)} project groups.')
+            except ValueError as e:
+                messages.error(request, f'Error forming project groups: {str(e)}')
+
         elif action == 'add_student':
             group_id = request.POST.get('group_id')
             student_id = request.POST.get('student_id')
@@ -887,12 +962,13 @@ def manage_project_groups_view(request, section_id):
                 if not section.enrollment_set.filter(student=student).exists():
                     messages.error(request, 'Student is not enrolled in this section.')
                 else:
-                    # Check if student is already in a group
-                    if ProjectGroup.objects.filter(section=section, students=student).exists():
-                        messages.error(request, 'Student is already assigned to a group in this section.')
-                    else:
-                        group.students.add(student)
+                    # One group per student per section is enforced by a unique constraint
+                    try:
+                        with transaction.atomic():
+                            ProjectGroupEnrollment.objects.create(project_group=group, student=student, section=section)
                         messages.success(request, f'Student {student.name} added to group {group.group_sl}.')
+                    except IntegrityError:
+                        messages.error(request, 'Student is already assigned to a group in this section.')
             except ProjectGroup.DoesNotExist:
                 messages.error(request, 'Project group not found.')
             except Student.DoesNotExist:
@@ -907,7 +983,7 @@ def manage_project_groups_view(request, section_id):
             try:
                 group = ProjectGroup.objects.get(id=group_id, section=section)
                 student = Student.objects.get(student_id=student_id)
-                group.students.remove(student)
+                ProjectGroupEnrollment.objects.filter(project_group=group, student=student).delete()
                 messages.success(request, f'Student {student.name} removed from group {group.group_sl}.')
             except ProjectGroup.DoesNotExist:
                 messages.error(request, 'Project group not found.')
@@ -916,29 +992,22 @@ def manage_project_groups_view(request, section_id):
             except Exception as e:
                 messages.error(request, f'Error removing student from group: {str(e)}')
 
-    # Get all project groups for this section
-    project_groups = ProjectGroup.objects.filter(section=section).prefetch_related('students')
-    
-    # Get all students enrolled in this section who are not in any group
-    enrolled_students = Student.objects.filter(
-        enrollment__section=section
-    ).exclude(
-        project_groups__section=section
-    ).distinct()
-
-    # Get all students enrolled in this section
-    all_enrolled_students = Student.objects.filter(
-        enrollment__section=section
-    ).distinct()
+    # Groups with their members (one query over the students through-table),
+    # then the enrollments; the student -> group map is built from those
+    project_groups = list(ProjectGroup.objects.filter(section=section).prefetch_related('students'))
+    group_of = {student.id: group for group in project_groups for student in group.students.all()}
+    all_enrolled_students = [
+        enrollment.student
+        for enrollment in Enrollment.objects.filter(section=section).select_related('student').order_by('student_id')
+    ]
 
     # Create a list of students with their group information
-    students_with_groups = []
-    for student in all_enrolled_students:
-        group = ProjectGroup.objects.filter(section=section, students=student).first()
-        students_with_groups.append({
-            'student': student,
-            'group': group
-        })
+    students_with_groups = [
+        {'student': student, 'group': group_of.get(student.id)}
+        for student in all_enrolled_students
+    ]
+    # Enrolled students who are not in any group
+    enrolled_students = [info['student'] for info in students_with_groups if info['group'] is None]
 
     context = {
         'section': section,
@@ -975,6 +1044,36 @@ def edit_section_view(request, section_id):
     }
     return render(request, 'courses/edit_section.html', context)
 
+@login_required
+@faculty_required
+def clone_section_setup_view(request, section_id):
+    section = get_object_or_404(Section, id=section_id)
+
+    if not request.user.is_superuser and not section.faculties.filter(id=request.user.faculty.id).exists():
+        messages.error(request, 'You do not have permission to copy this section.')
+        return redirect('courses:section_detail', section_id=section.id)
+
+    if request.method == 'POST':
+        form = CloneSetupForm(request.POST, source=section, user=request.user)
+        if form.is_valid():
+            results = clone_setup(section, form.cleaned_data['targets'],
+                                  start_date=form.cleaned_data['start_date'],
+                                  replace=form.cleaned_data['replace'])
+            messages.success(request, f'Copied the setup of Section {section.name} to {len(results)} section(s).')
+            for result in results:
+                if result.skipped:
+                    messages.warning(request, str(result))
+            return redirect('courses:section_detail', section_id=section.id)
+    else:
+        form = CloneSetupForm(source=section, user=request.user)
+
+    context = {
+        'form': form,
+        'section': section,
+        'title': f'Copy Setup - {section.course.code} Section {section.name}'
+    }
+    return render(request, 'courses/clone_section_setup.html', context)
+
 @login_required
 @faculty_required
 def manage_clos_view(request, section_id):
@@ -1155,6 +1254,8 @@ def add_session_dates_view(request, section_id):
 
             # Bulk create all sessions
             Session.objects.bulk_create(sessions)
+            invalidate_section(section.id)
+            changes.record(SectionChange.SESSION, [section.id])
             messages.success(request, f"Successfully created {len(sessions)} sessions.")
 
         except Exception as e:
@@ -1197,25 +1298,25 @@ def delete_all_attendance_view(request, section_id):
         try:
             with transaction.atomic():
                 # Delete all attendance records for this section
-                Attendance.objects.filter(session__section=section).delete()
+                Attendance.objects.filter(section=section).delete()
             messages.success(request, 'All attendance records have been cleared successfully.')
         except Exception as e:
             messages.error(request, f'Error clearing attendance: {str(e)}')
 
     return redirect('courses:section_detail', section_id=section.id)
 
-@login_required
+@async_login_required
 @faculty_required
-def update_session_date_view(request, session_id):
+async def update_session_date_view(request, session_id):
     if request.method != 'POST':
         return JsonResponse({'success': False, 'message': 'Invalid request method'})
     
     try:
-        session = get_object_or_404(Session, id=session_id)
+        session = await aget_object_or_404(Session.objects.select_related('section'), id=session_id)
         section = session.section
         
         # Check if user is a faculty of this section
-        if not request.user.is_superuser and not section.faculties.filter(id=request.user.faculty.id).exists():
+        if not await user_teaches(request.user, section):
             return JsonResponse({'success': False, 'message': 'You do not have permission to update this session.'})
         
         # Parse the JSON data
@@ -1227,7 +1328,7 @@ def update_session_date_view(request, session_id):
         
         # Update the session date
         session.date = datetime.strptime(new_date, '%Y-%m-%d').date()
-        session.save()
+        await session.asave()
         
         return JsonResponse({'success': True})
         
@@ -1260,33 +1361,35 @@ def update_section_total_classes_view(request, section_id):
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)})
 
-@login_required
+@async_login_required
 @faculty_required
-@require_http_methods(["GET"])
-def get_attendance(request, section_id):
+@async_require_http_methods(["GET"])
+async def get_attendance(request, section_id):
     """Get attendance data for a section."""
-    section = get_object_or_404(Section, id=section_id)
+    section = await aget_object_or_404(Section, id=section_id)
     
     # Check if user is a faculty of this section or superuser
-    if not request.user.is_superuser and not section.faculties.filter(id=request.user.faculty.id).exists():
+    if not await user_teaches(request.user, section):
         return JsonResponse({'error': 'Permission denied'}, status=403)
     
     # Get all attendance records for this section
+    # order_by() drops the default session_number ordering, which would
+    # otherwise join the sessions table back in
     attendance_records = Attendance.objects.filter(
-        session__section=section
-    ).values('student_id', 'session_id', 'is_present')
+        section=section
+    ).order_by().values('student_id', 'session_id', 'is_present')
     
-    return JsonResponse(list(attendance_records), safe=False)
+    return JsonResponse([record async for record in attendance_records], safe=False)
 
-@login_required
+@async_login_required
 @faculty_required
-@require_http_methods(["POST"])
-def save_attendance(request, section_id):
+@async_require_http_methods(["POST"])
+async def save_attendance(request, section_id):
     """Save attendance data for a student in a session."""
-    section = get_object_or_404(Section, id=section_id)
+    section = await aget_object_or_404(Section, id=section_id)
     
     # Check if user is a faculty of this section or superuser
-    if not request.user.is_superuser and not section.faculties.filter(id=request.user.faculty.id).exists():
+    if not await user_teaches(request.user, section):
         return JsonResponse({'success': False, 'message': 'Permission denied'}, status=403)
     
     try:
@@ -1297,17 +1400,20 @@ def save_attendance(request, section_id):
         
         if not all([student_id, session_id, is_present is not None]):
             return JsonResponse({'success': False, 'message': 'Missing required fields'}, status=400)
+
+        if not await Session.objects.filter(id=session_id, section=section).aexists():
+            return JsonResponse({'success': False, 'message': 'Session not found in this section'}, status=404)
         
         # Get or create attendance record
-        attendance, created = Attendance.objects.get_or_create(
+        attendance, created = await Attendance.objects.aget_or_create(
             student_id=student_id,
             session_id=session_id,
-            defaults={'is_present': is_present}
+            defaults={'is_present': is_present, 'section': section}
         )
         
         if not created:
             attendance.is_present = is_present
-            attendance.save()
+            await attendance.asave()
         
         return JsonResponse({'success': True})
         
@@ -1318,6 +1424,7 @@ def save_attendance(request, section_id):
 
 @login_required
 @faculty_required
+@use_replica
 def export_attendance_excel_view(request, section_id):
     section = get_object_or_404(Section, id=section_id)
 
@@ -1329,12 +1436,12 @@ def export_attendance_excel_view(request, section_id):
     # Fetch data
     sessions = section.sessions.all().order_by('session_number')
     enrollments = Enrollment.objects.filter(section=section).select_related('student').order_by('student__student_id')
-    attendance_records = Attendance.objects.filter(session__section=section).select_related('student', 'session')
+    attendance_records = Attendance.objects.filter(section=section).order_by().values_list('student_id', 'session_id', 'is_present')
 
     # Create a mapping for easy attendance lookup: (student_id, session_id) -> is_present
     attendance_map = {}
-    for record in attendance_records:
-        attendance_map[(record.student.id, record.session.id)] = record.is_present
+    for student_id, session_id, is_present in attendance_records:
+        attendance_map[(student_id, session_id)] = is_present
 
     # Define headers now so we can use its length for cell merging
     headers = ['Student ID', 'Student Name']
@@ -1462,81 +1569,20 @@ def assessment_setup_view(request, section_id):
         return redirect('courses:section_detail', section_id=section.id)
     
     # Get or create assessment template
-    template, _ = AssessmentTemplate.objects.get_or_create(section=section)
-    assessment_items_qs = template.assessment_items.select_related('clo').all().order_by('id')
-    assessment_items = [
-        {
-            'id': item.id,
-            'name': item.name,
-            'assessment_type': item.assessment_type,
-            'clo_id': item.clo.id,
-            'clo_code': item.clo.get_clo_code(),
-            'max_marks': float(item.max_marks),
-            'in_group': item.in_group,
-            'group': item.group.id if item.group else None,
-        }
-        for item in assessment_items_qs
-    ]
-    ungrouped_items = template.assessment_items.select_related('clo').filter(group__isnull=True).order_by('id')
-    groups = template.assessment_groups.select_related('clo').prefetch_related('assessment_items').all().order_by('id')
-    groups_data = [
-        {
-            'id': group.id,
-            'name': group.name,
-            'max_count': group.max_count,
-            'clo_code': group.clo.get_clo_code(),
-            'items': [
-                {
-                    'id': item.id,
-                    'name': item.name,
-                    'max_marks': float(item.max_marks),
-                }
-                for item in group.assessment_items.all()
-            ]
-        }
-        for group in groups
-    ]
-    # Calculate total marks per CLO
-    clo_marks = {}
-    for clo in section.course.clos.all():
-        # Ungrouped items for this CLO
-        ungrouped = [item for item in assessment_items_qs if item.clo_id == clo.id and not item.in_group]
-        # Group contributions for this CLO
-        group_total = 0
-        group_has_items = False
-        for group in groups:
-            if group.clo_id == clo.id:
-                group_items = list(group.assessment_items.all())
-                if group_items:
-                    group_has_items = True
-                    avg = sum(float(i.max_marks) for i in group_items) / len(group_items)
-                    group_total += avg * group.max_count
-        ungrouped_total = sum(float(item.max_marks) for item in ungrouped)
-        # Only include CLOs that have at least one item (grouped or ungrouped)
-        if ungrouped or group_has_items:
-            clo_marks[clo] = ungrouped_total + group_total
-
-    # Calculate total marks per PLO
-    plo_marks = {}
-    for clo, marks in clo_marks.items():
-        if clo.plo:
-            plo_marks.setdefault(clo.plo, 0)
-            plo_marks[clo.plo] += marks
-
-    clo_total = sum(clo_marks.values()) if clo_marks else 0
-    plo_total = sum(plo_marks.values()) if plo_marks else 0
+    AssessmentTemplate.objects.get_or_create(section=section)
+    # Items, groups and the CLO/PLO distribution come from the cached plan
+    plan = get_plan(section)
     context = {
         'section': section,
-        'assessment_items': assessment_items,
-        'assessment_items_qs': assessment_items_qs,
-        'ungrouped_items': ungrouped_items,
-        'groups': groups,
-        'groups_data': groups_data,
+        'plan': plan,
+        'course_clos': list(section.course.clos.all()),
+        'assessment_items': plan.items_json(),
+        'groups_data': plan.groups_json(),
         'MAX_COUNT_CHOICES': MAX_COUNT_CHOICES,
-        'clo_marks': clo_marks,
-        'plo_marks': plo_marks,
-        'clo_total': clo_total,
-        'plo_total': plo_total,
+        'clo_marks': plan.clo_marks,
+        'plo_marks': plan.plo_marks,
+        'clo_total': plan.clo_total,
+        'plo_total': plan.plo_total,
         'title': f'Assessment Setup - {section.course.code} Section {section.name}'
     }
     return render(request, 'courses/assessment_setup.html', context)
@@ -1613,6 +1659,8 @@ def edit_assessment_item_view(request, section_id):
         if item.group and update_group:
             # Update all items in the group
             AssessmentItem.objects.filter(group=item.group).update(max_marks=max_marks)
+            invalidate_section(section.id)
+            changes.record(SectionChange.ITEM, [section.id])
         else:
             item.max_marks = max_marks
             item.clo = clo # Ensure the CLO is updated
@@ -1649,19 +1697,17 @@ def add_assessment_group_view(request, section_id):
                 return JsonResponse({'success': False, 'message': 'All items must have the same marks and CLO as the group.'}, status=400)
         if len(item_ids) > 10:
             return JsonResponse({'success': False, 'message': 'A group can contain at most 10 items.'}, status=400)
-        # Create group
-        group = AssessmentItemGroup.objects.create(
-            template=template,
-            name=name,
-            max_count=max_count,
-            clo=clo
-        )
-        # Assign items to group (item1...item10)
-        for idx in range(10):
-            setattr(group, f'item{idx+1}', items[idx] if idx < len(items) else None)
-        group.save()
-        # Assign items to group (old M2M logic)
-        items.update(group=group, in_group=True)
+        # Create group; membership lives on AssessmentItem.group
+        with transaction.atomic():
+            group = AssessmentItemGroup.objects.create(
+                template=template,
+                name=name,
+                max_count=max_count,
+                clo=clo
+            )
+            items.update(group=group, in_group=True)
+        invalidate_section(section.id)
+        changes.record(SectionChange.ITEM, [section.id])
         return JsonResponse({'success': True, 'group_id': group.id})
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)}, status=500)
@@ -1681,6 +1727,8 @@ def delete_assessment_group_view(request, section_id):
         # Unassign items
         AssessmentItem.objects.filter(group=group).update(group=None, in_group=False)
         group.delete()
+        invalidate_section(section.id)
+        changes.record(SectionChange.ITEM, [section.id])
         return JsonResponse({'success': True})
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)}, status=500)
@@ -1711,44 +1759,185 @@ def edit_assessment_group_view(request, section_id):
         for item in items:
             if item.max_marks != max_marks or item.clo_id != clo.id:
                 return JsonResponse({'success': False, 'message': 'All items must have the same marks and CLO as the group.'}, status=400)
-        # Update group
-        group.name = name
-        group.max_count = max_count
-        group.clo = clo
-        group.save()
-        # Unassign all items from this group, then assign selected
-        AssessmentItem.objects.filter(group=group).update(group=None, in_group=False)
-        AssessmentItem.objects.filter(id__in=item_ids, template=group.template).update(group=None)
-        items.update(group=group, in_group=True)
-        # Assign items to item1...item10 fields
-        for idx in range(10):
-            setattr(group, f'item{idx+1}', items[idx] if idx < len(items) else None)
-        group.save()
+        if len(item_ids) > 10:
+            return JsonResponse({'success': False, 'message': 'A group can contain at most 10 items.'}, status=400)
+        with transaction.atomic():
+            # Update group
+            group.name = name
+            group.max_count = max_count
+            group.clo = clo
+            group.save()
+            # Selected items join the group and the rest of its old members
+            # leave it, in a single UPDATE
+            selected = Q(id__in=item_ids)
+            AssessmentItem.objects.filter(Q(group=group) | selected, template=group.template).update(
+                group=Case(When(selected, then=Value(group.pk)), default=Value(None)),
+                in_group=Case(When(selected, then=Value(True)), default=Value(False)),
+            )
+        invalidate_section(section.id)
+        changes.record(SectionChange.ITEM, [section.id])
         return JsonResponse({'success': True})
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)}, status=500)
 
+@login_required
+@faculty_required
+@require_http_methods(["GET", "POST"])
+def assessment_plan_view(request, section_id):
+    """GET the section's plan as declared data; POST a full plan to replace it."""
+    section = get_object_or_404(Section, id=section_id)
+    if not request.user.is_superuser and not section.faculties.filter(id=request.user.faculty.id).exists():
+        return JsonResponse({'success': False, 'message': 'Permission denied'}, status=403)
+    if request.method == 'GET':
+        return JsonResponse(dict(declaration(get_plan(section)), success=True))
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'message': 'Invalid JSON'}, status=400)
+    try:
+        result = apply_plan(section, data)
+    except PlanError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    return JsonResponse(dict(result, success=True))
+
 # AJAX endpoint for auto-saving marks
 from django.views.decorators.http import require_POST
 from django.http import JsonResponse
 
-@login_required
+@async_login_required
 @faculty_required
-@require_POST
-def autosave_mark(request, section_id):
-    section = get_object_or_404(Section, id=section_id)
-    if not request.user.is_superuser and not section.faculties.filter(id=request.user.faculty.id).exists():
+@async_require_http_methods(["POST"])
+async def autosave_mark(request, section_id):
+    section = await aget_object_or_404(Section, id=section_id)
+    if not await user_teaches(request.user, section):
         return JsonResponse({'success': False, 'error': 'Permission denied.'}, status=403)
     student_id = request.POST.get('student_id')
     item_id = request.POST.get('item_id')
-    value = request.POST.get('value')
+    value = request.POST.get('value') or None  # an emptied cell clears the mark
     try:
-        student = Student.objects.get(id=student_id)
-        item = AssessmentItem.objects.get(id=item_id, template__section=section)
-        mark_obj, _ = AssessmentMark.objects.update_or_create(
+        student = await Student.objects.aget(id=student_id)
+        item = await AssessmentItem.objects.aget(id=item_id, template__section=section)
+        mark_obj, _ = await AssessmentMark.objects.aupdate_or_create(
             student=student, assessment_item=item,
-            defaults={'marks': value}
+            defaults={'marks': value, 'section': section}
         )
         return JsonResponse({'success': True})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+@login_required
+@faculty_required
+@require_POST
+def sync_operations(request, section_id):
+    """Apply a batch of mark/attendance edits from the page's offline log."""
+    section = get_object_or_404(Section, id=section_id)
+    if not request.user.is_superuser and not section.faculties.filter(id=request.user.faculty.id).exists():
+        return JsonResponse({'success': False, 'message': 'Permission denied'}, status=403)
+    try:
+        operations = json.loads(request.body)['ops']
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'message': 'Invalid JSON'}, status=400)
+    if not isinstance(operations, list) or len(operations) > SYNC_MAX_BATCH:
+        return JsonResponse({'success': False, 'message': f'Send a list of at most {SYNC_MAX_BATCH} operations'},
+                            status=400)
+
+    results = apply_operations(section, request.user, operations)
+    return JsonResponse({'success': True, 'results': results})
+
+
+@login_required
+@faculty_required
+@require_access_level('can_access_dashboard')
+def program_dashboard(request):
+    """Department/program overview, read from the nightly SectionRollup table."""
+    scope = SectionFilter.from_request(request)
+    if 'department' not in request.GET:
+        scope.department = request.user.faculty.department_id
+    department, program = scope.department, scope.program
+
+    terms = term_tile(department, program)
+    term = next((row for row in terms if (row['year'], row['semester']) == (scope.year, scope.semester)),
+                terms[0] if terms else None)
+    context = {
+        'departments': Department.objects.order_by('name'),
+        'programs': Program.objects.filter(**({'department_id': department} if department else {})).order_by('name'),
+        'department': department,
+        'program': program,
+        'terms': terms,
+        'term': term,
+    }
+    if term is not None:
+        args = (department, program, term['year'], term['semester'])
+        context.update(
+            plans=plan_tile(*args),
+            low_attendance=attendance_tile(*args),
+            attainment=attainment_tile(*args),
+        )
+    return render(request, 'courses/program_dashboard.html', context)
+
+
+@login_required
+@faculty_required
+@require_access_level('can_access_dashboard')
+def plo_matrix_view(request, program_id):
+    """PLO x course attainment of a program; ?format=csv or xlsx downloads it."""
+    program = get_object_or_404(Program, id=program_id)
+    scope = SectionFilter.from_request(request)
+    matrix = plo_matrix(program.id, scope.year, scope.semester)
+
+    export = request.GET.get('format')
+    if export == 'csv':
+        return csv_response(matrix, program.name)
+    if export == 'xlsx':
+        return xlsx_response(matrix, program.name)
+
+    rows = [
+        (course, [course.cells.get(sl) for sl, _, _ in matrix.plos])
+        for course in matrix.courses
+    ]
+    return render(request, 'courses/plo_matrix.html', {
+        'program': program,
+        'matrix': matrix,
+        'rows': rows,
+        'totals': [matrix.totals.get(sl) for sl, _, _ in matrix.plos],
+        'filters': scope,
+        'years': available_years(Section.objects.filter(course__program=program)),
+        'semesters': [choice for choice, _ in Section.SEMESTER_CHOICES],
+        'target': DEFAULT_THRESHOLD,
+    })
+
+
+@login_required
+@faculty_required
+def clo_trends_api(request, course_id):
+    """Per-term CLO attainment of a course as chart series (see courses.trends)."""
+    course = get_object_or_404(Course, id=course_id)
+    return JsonResponse({'success': True, 'course': course.code, **trend_series(course.id)})
+
+
+@login_required
+@faculty_required
+def item_analysis_view(request, section_id):
+    """Item statistics of the section's marks, for the Item Analysis tab (see courses.analytics)."""
+    section = get_object_or_404(Section, id=section_id)
+    if not request.user.is_superuser and not section.faculties.filter(id=request.user.faculty.id).exists():
+        return JsonResponse({'success': False, 'message': 'Permission denied'}, status=403)
+    try:
+        analysis = item_analysis(section)
+    except ImproperlyConfigured as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=501)
+    return JsonResponse({'success': True, **analysis})
+
+
+@login_required
+@faculty_required
+def section_attainment_api(request, section_id):
+    """Per-student CLO scores and per-CLO pass rates under the course's attainment policy."""
+    section = get_object_or_404(Section, id=section_id)
+    if not request.user.is_superuser and not section.faculties.filter(id=request.user.faculty.id).exists():
+        return JsonResponse({'success': False, 'message': 'Permission denied'}, status=403)
+    try:
+        attainment = section_attainment(section)
+    except ImproperlyConfigured as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=501)
+    return JsonResponse({'success': True, **attainment})
@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'obe.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from courses.live import websocket_application  # noqa: E402  (needs the app registry)
+
+
+async def application(scope, receive, send):
+    # WebSockets carry the live marks/attendance grid; see courses.live.
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
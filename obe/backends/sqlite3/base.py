@@ -0,0 +1,21 @@
+"""
+SQLite backend that opens transactions with ``BEGIN IMMEDIATE``.
+
+Django 4.2 starts every atomic block with a plain (deferred) ``BEGIN``.  A
+deferred transaction that reads and then writes - ``update_or_create`` in the
+autosave views, for instance - has to upgrade its lock half way through, and
+when another connection is already writing SQLite fails the upgrade at once
+with "database is locked" instead of waiting out the busy timeout.  Taking
+the write lock up front makes such transactions queue behind each other.
+
+``OBE_SQLITE['transaction_mode']`` (see ``obe.db``) selects the mode.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def _start_transaction_under_autocommit(self):
+        tuning = self.settings_dict.get('OBE_SQLITE') or {}
+        mode = tuning.get('transaction_mode', 'IMMEDIATE')
+        self.cursor().execute(f'BEGIN {mode}' if mode != 'DEFERRED' else 'BEGIN')
@@ -0,0 +1,199 @@
+"""
+Versioned caching for hot read paths.
+
+Cached values are keyed on the version counters of the entities they were
+built from (a section, a course, a faculty member, a program).  Writes never
+delete cached entries: the receivers in ``courses.signals`` bump the affected
+versions instead (once the write commits), so stale entries stop being
+addressed and simply age out of the backend.  This works the same on the file-based and LocMem backends
+configured in ``obe.settings`` and needs no external cache server.
+"""
+import hashlib
+import time
+from dataclasses import dataclass
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from obe.transactions import collect
+
+CACHE_ALIAS = 'default'
+DEFAULT_TIMEOUT = 300
+KEY_PREFIX = 'obe'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _new_version():
+    # Seeding counters from the clock (rather than 1) means a counter that was
+    # evicted and re-created can never collide with entries written under the
+    # old one.
+    return time.time_ns()
+
+
+@dataclass(frozen=True)
+class EntityKey:
+    """Version counter for one entity, or for the whole collection if pk is None."""
+    entity: str
+    pk: object = None
+
+    @property
+    def version_key(self):
+        return f"{KEY_PREFIX}:v:{self.entity}:{'all' if self.pk is None else self.pk}"
+
+    def version(self):
+        return versions([self])[0]
+
+    def bump(self):
+        bump(self)
+
+
+def section_key(pk=None):
+    return EntityKey('section', pk)
+
+
+def course_key(pk=None):
+    return EntityKey('course', pk)
+
+
+def faculty_key(pk=None):
+    return EntityKey('faculty', pk)
+
+
+def program_key(pk=None):
+    return EntityKey('program', pk)
+
+
+def rollup_key():
+    """Bumped whenever precomputed analytics (CLO attainment, section rollups, CLO trends) are rebuilt."""
+    return EntityKey('rollup')
+
+
+def versions(keys):
+    """Return the current version of each key, creating missing counters."""
+    cache = get_cache()
+    names = [key.version_key for key in keys]
+    found = cache.get_many(names)
+    result = []
+    for name in names:
+        if name not in found:
+            cache.add(name, _new_version(), None)
+            found[name] = cache.get(name)
+        result.append(found[name])
+    return result
+
+
+def bump(*keys):
+    """
+    Invalidate everything cached against the given keys, once the current
+    transaction commits.  Bumped earlier, a request reading the old rows
+    during the transaction would cache them under the new version.
+    """
+    collect('cache', keys, _bump_now)
+
+
+def _bump_now(keys):
+    cache = get_cache()
+    for key in set(keys):
+        try:
+            cache.incr(key.version_key)
+        except ValueError:
+            cache.set(key.version_key, _new_version(), None)
+
+
+def invalidate_section(section_id, course_id=None, collection=True):
+    """
+    Bump a section together with the section collection (and its course).
+
+    Marks and attendance pass ``collection=False``: they change what is shown
+    about one section, not which sections the listings hold, so only
+    ``section_key(section_id)`` moves.
+    """
+    keys = [section_key(section_id)]
+    if collection:
+        keys.append(section_key())
+    if course_id is not None:
+        keys += [course_key(course_id), course_key()]
+    bump(*keys)
+
+
+def make_key(name, parts, keys):
+    """Build a cache key from a name, arbitrary parts and entity versions."""
+    raw = repr((tuple(parts), tuple(zip((k.version_key for k in keys), versions(keys)))))
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'{KEY_PREFIX}:{name}:{digest}'
+
+
+def _key_part(value):
+    return getattr(value, 'pk', value)
+
+
+def cache_view(dependencies, timeout=DEFAULT_TIMEOUT):
+    """
+    Cache a GET view's rendered response.
+
+    ``dependencies(request, *args, **kwargs)`` returns the EntityKeys the page
+    is built from.  Responses are cached per session (pages embed the user
+    menu and a CSRF token) and never while flash messages are pending, since
+    those are rendered into the page once and then consumed.  The body is
+    cached with the headers the view set (Content-Disposition, Cache-Control,
+    ...); cookies are not, so views that set them shouldn't be cached.
+    """
+    def decorator(view_func):
+        # 'response:' rather than 'view:', whose entries held only the content type
+        name = f'response:{view_func.__module__}.{view_func.__qualname__}'
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if request.method != 'GET' or len(get_messages(request)):
+                return view_func(request, *args, **kwargs)
+
+            parts = (
+                request.get_full_path(),
+                request.session.session_key,
+                request.META.get('CSRF_COOKIE'),
+            )
+            key = make_key(name, parts, list(dependencies(request, *args, **kwargs)))
+            cache = get_cache()
+            cached = cache.get(key)
+            if cached is not None:
+                content, headers = cached
+                return HttpResponse(content, headers=headers)
+
+            response = view_func(request, *args, **kwargs)
+            if (response.status_code == 200 and not response.streaming
+                    and not len(get_messages(request))):
+                cache.set(key, (response.content, dict(response.items())), timeout)
+            return response
+        return _wrapped_view
+    return decorator
+
+
+def cache_fragment(dependencies, timeout=DEFAULT_TIMEOUT):
+    """
+    Memoise the return value of a function that renders or computes part of
+    a page.  ``dependencies(*args, **kwargs)`` returns the EntityKeys the
+    value depends on; model instances in the arguments are keyed by pk.
+    """
+    def decorator(func):
+        name = f'fragment:{func.__module__}.{func.__qualname__}'
+
+        @wraps(func)
+        def _wrapped(*args, **kwargs):
+            parts = (
+                tuple(_key_part(arg) for arg in args),
+                tuple(sorted((k, _key_part(v)) for k, v in kwargs.items())),
+            )
+            key = make_key(name, parts, list(dependencies(*args, **kwargs)))
+            cache = get_cache()
+            value = cache.get(key)
+            if value is None:
+                value = func(*args, **kwargs)
+                cache.set(key, value, timeout)
+            return value
+        return _wrapped
+    return decorator
@@ -0,0 +1,130 @@
+"""
+Environment-driven database profiles.
+
+``OBE_DB_ENGINE`` picks the profile:
+
+``sqlite`` (default)
+    A single file (``OBE_DB_NAME``, default ``db.sqlite3``).  Each new
+    connection gets a busy timeout and memory-mapped reads (see
+    ``configure_connection``), and transactions start with ``BEGIN
+    IMMEDIATE`` (``obe.backends.sqlite3``), so concurrent autosaves queue on
+    the write lock for a few milliseconds instead of failing with "database
+    is locked".  ``OBE_SQLITE_TRANSACTION_MODE=DEFERRED`` restores Django's
+    default transactions.
+
+    ``OBE_SQLITE_WAL=1`` also switches the file to WAL with
+    ``synchronous=NORMAL``, which lets readers run alongside the writer; set
+    it in production.  It is off by default because the journal mode is
+    stored in the database file itself: turning it on rewrites the file,
+    which would show the committed development database as modified after
+    any ``manage.py`` command.
+
+``postgres``
+    ``OBE_DB_NAME``, ``OBE_DB_USER``, ``OBE_DB_PASSWORD``, ``OBE_DB_HOST`` and
+    ``OBE_DB_PORT``.  Connections are kept open for ``OBE_DB_CONN_MAX_AGE``
+    seconds and health-checked before reuse.  Set ``OBE_DB_POOLER=pgbouncer``
+    when connecting through PgBouncer in transaction pooling mode; that also
+    disables server-side cursors, which don't survive across pooled
+    transactions.
+
+A read replica is added as the ``replica`` alias when ``OBE_DB_REPLICA_NAME``
+(a second SQLite file, or the standby's database name) or
+``OBE_DB_REPLICA_HOST`` is set.  It inherits every other setting from the
+primary; ``OBE_DB_REPLICA_PORT`` overrides the port.  Only views wrapped in
+``obe.routers.use_replica`` read from it.
+"""
+import os
+
+SQLITE_PRAGMAS_DEFAULTS = {
+    'busy_timeout': 5000,       # ms
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,       # KiB when negative, i.e. ~20 MB
+}
+SQLITE_TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+def _env(name, default=None):
+    return os.environ.get(name, default)
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def database_config(base_dir):
+    """Return the ``default`` entry of DATABASES for the selected profile."""
+    engine = _env('OBE_DB_ENGINE', 'sqlite')
+
+    if engine == 'postgres':
+        pooled = _env('OBE_DB_POOLER') == 'pgbouncer'
+        return {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': _env('OBE_DB_NAME', 'obe'),
+            'USER': _env('OBE_DB_USER', 'obe'),
+            'PASSWORD': _env('OBE_DB_PASSWORD', ''),
+            'HOST': _env('OBE_DB_HOST', 'localhost'),
+            'PORT': _env('OBE_DB_PORT', '6432' if pooled else '5432'),
+            'CONN_MAX_AGE': _env_int('OBE_DB_CONN_MAX_AGE', 60),
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': pooled,
+        }
+
+    if engine != 'sqlite':
+        raise ValueError(f"Unknown OBE_DB_ENGINE {engine!r}; expected 'sqlite' or 'postgres'.")
+
+    transaction_mode = _env('OBE_SQLITE_TRANSACTION_MODE', 'IMMEDIATE').upper()
+    if transaction_mode not in SQLITE_TRANSACTION_MODES:
+        raise ValueError(f"Unknown OBE_SQLITE_TRANSACTION_MODE {transaction_mode!r}; "
+                         f"expected one of {', '.join(SQLITE_TRANSACTION_MODES)}.")
+    busy_timeout = _env_int('OBE_SQLITE_BUSY_TIMEOUT', SQLITE_PRAGMAS_DEFAULTS['busy_timeout'])
+    return {
+        'ENGINE': 'obe.backends.sqlite3',
+        'NAME': _env('OBE_DB_NAME', str(base_dir / 'db.sqlite3')),
+        'OPTIONS': {
+            # Python's sqlite3 module installs its own busy handler from this
+            # value (in seconds); keep it in step with the busy_timeout pragma.
+            'timeout': busy_timeout / 1000,
+        },
+        'OBE_SQLITE': {
+            'wal': _env('OBE_SQLITE_WAL', '0') == '1',
+            'transaction_mode': transaction_mode,
+            'busy_timeout': busy_timeout,
+            'mmap_size': _env_int('OBE_SQLITE_MMAP_SIZE', SQLITE_PRAGMAS_DEFAULTS['mmap_size']),
+            'cache_size': _env_int('OBE_SQLITE_CACHE_SIZE', SQLITE_PRAGMAS_DEFAULTS['cache_size']),
+        },
+    }
+
+
+def replica_config(base_dir):
+    """Return the ``replica`` entry of DATABASES, or None if no replica is set up."""
+    name, host = _env('OBE_DB_REPLICA_NAME'), _env('OBE_DB_REPLICA_HOST')
+    if not name and not host:
+        return None
+    config = database_config(base_dir)
+    if name:
+        config['NAME'] = name
+    if config['ENGINE'] == 'django.db.backends.postgresql':
+        config['HOST'] = host or config['HOST']
+        config['PORT'] = _env('OBE_DB_REPLICA_PORT', config['PORT'])
+    # Tests run against the primary's test database only.
+    config['TEST'] = {'MIRROR': 'default'}
+    return config
+
+
+def configure_connection(sender, connection, **kwargs):
+    """connection_created receiver applying the SQLite pragmas of the profile."""
+    if connection.vendor != 'sqlite':
+        return
+    tuning = connection.settings_dict.get('OBE_SQLITE')
+    if not tuning:
+        return
+    with connection.cursor() as cursor:
+        if tuning['wal']:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            # NORMAL is durable across application crashes in WAL mode; only
+            # a power loss can roll back the last few commits.
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f"PRAGMA busy_timeout={int(tuning['busy_timeout'])}")
+        cursor.execute(f"PRAGMA mmap_size={int(tuning['mmap_size'])}")
+        cursor.execute(f"PRAGMA cache_size={int(tuning['cache_size'])}")
@@ -0,0 +1,70 @@
+"""
+Read-replica routing for reporting views.
+
+Reports and exports read a lot of rows and tolerate slightly stale data;
+autosaving marks and attendance does neither.  Views decorated with
+``use_replica`` send their reads to the ``replica`` alias (see ``obe.db``),
+while every write - and every read outside such a view - stays on
+``default``.  Without a configured replica the decorator is a no-op.
+
+Views whose results are cached (``obe.cache``) stay on ``default``: an entry
+built from a lagging replica would be served as current until the next bump.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+DEFAULT_ALIAS = 'default'
+REPLICA_ALIAS = 'replica'
+
+_replica_reads = ContextVar('obe_replica_reads', default=False)
+
+
+def replica_available():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def replica_reads():
+    """Route reads made inside the block to the replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def use_replica(view_func):
+    """Serve a read-only view from the replica."""
+    @wraps(view_func)
+    def _wrapped_view(*args, **kwargs):
+        with replica_reads():
+            return view_func(*args, **kwargs)
+    return _wrapped_view
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and replica_available():
+            return REPLICA_ALIAS
+        return DEFAULT_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so that saving an instance loaded from the replica doesn't
+        # fall back to the alias it was read from.
+        return DEFAULT_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_ALIAS, REPLICA_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives schema and data from the primary.
+        if db == REPLICA_ALIAS:
+            return False
+        return None
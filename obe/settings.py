@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 import os
 from pathlib import Path
 
+from obe.db import database_config, replica_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -77,12 +79,59 @@ WSGI_APPLICATION = 'obe.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
+#
+# Selected through OBE_DB_* environment variables; see obe/db.py.
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': str(BASE_DIR / 'db.sqlite3'),
+    'default': database_config(BASE_DIR),
+}
+
+if replica_config(BASE_DIR) is not None:
+    DATABASES['replica'] = replica_config(BASE_DIR)
+
+# Reads inside views decorated with obe.routers.use_replica go to 'replica'
+# when it is configured; everything else uses 'default'.
+DATABASE_ROUTERS = ['obe.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+#
+# The file-based cache is shared by every worker on the host, so a version
+# bump made by one is seen by all.  OBE_CACHE_BACKEND=locmem is for a single
+# process only (tests, a lone runserver): each process keeps its own counters
+# and would serve pages the others have invalidated.
+
+OBE_CACHE_BACKEND = os.environ.get('OBE_CACHE_BACKEND', 'file')
+
+if OBE_CACHE_BACKEND != 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('OBE_CACHE_DIR', str(BASE_DIR / 'var' / 'cache')),
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'obe',
+            'OPTIONS': {
+                'MAX_ENTRIES': 5000,
+            },
+        }
     }
+
+
+# Live grid updates over WebSockets (ASGI only); see courses/live.py.
+# 'memory' serves one worker process, 'redis' fans out across processes.
+
+OBE_LIVE = {
+    'BACKEND': os.environ.get('OBE_LIVE_BACKEND', 'memory'),
+    'REDIS_URL': os.environ.get('OBE_LIVE_REDIS_URL', 'redis://localhost:6379/0'),
 }
 
 
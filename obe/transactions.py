@@ -0,0 +1,52 @@
+"""
+Per-transaction batching of side effects that must wait for a commit.
+
+Cache version bumps, change-feed rows and live grid deltas are only valid
+once the write they describe has committed: bumped earlier, a concurrent
+reader could rebuild a cache entry from the old rows under the new version.
+``collect`` gathers them per transaction and hands each batch to its
+``flush`` function once, on commit:
+
+    collect('cache', keys, _bump_now)
+
+Outside an atomic block there is nothing to wait for and ``flush`` runs
+immediately.  A rolled-back transaction flushes nothing.  Items collected in
+a savepoint that is rolled back while the transaction goes on to commit are
+still flushed with the rest; for bumps and feed rows that only means some
+extra invalidation, and a page shown such a delta corrects itself on reload.
+"""
+from threading import local
+
+from django.db import transaction
+
+_batches = local()    # {(connection alias, name): _Batch}, per thread like the connections
+
+
+class _Batch:
+    """The items collected under one name in one transaction."""
+
+    def __init__(self, flush):
+        self.flush = flush
+        self.items = []
+
+    def __call__(self):
+        self.flush(self.items)
+
+
+def collect(name, items, flush, robust=False):
+    """
+    Add ``items`` to the current transaction's ``name`` batch; ``flush(items)``
+    runs once it commits.  ``robust`` batches don't stop the remaining
+    on-commit callbacks if they raise.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        flush(list(items))
+        return
+    key = (connection.alias, name)
+    batch = _batches.__dict__.get(key)
+    # A committed or rolled-back transaction's batch is no longer queued.
+    if batch is None or not any(callback is batch for _, callback, *_ in connection.run_on_commit):
+        batch = _batches.__dict__[key] = _Batch(flush)
+        transaction.on_commit(batch, robust=robust)
+    batch.items.extend(items)
@@ -2,14 +2,27 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from accounts.models import Faculty
 from courses.models import Section
+from courses.browse import browse_request, available_years
+from programs.models import Program
 from django.contrib import messages
+from obe.cache import cache_view, faculty_key, section_key
+
+
+def _home_dependencies(request):
+    # The cards show each section's grading and attendance progress, which
+    # bump only that section's key, so depend on the sections of this page
+    # (one keyset query) rather than on every section the user can see.
+    sections = Section.objects.all() if request.user.is_superuser else Section.objects.filter(faculties__user=request.user)
+    page = browse_request(request, sections)
+    return [faculty_key(), section_key()] + [section_key(section.pk) for section in page]
 
 
 @login_required
+@cache_view(_home_dependencies)
 def home(request):
     # Initialize variables
     faculty = None
-    sections = []
+    sections = Section.objects.none()
     can_create_section = False
     can_manage_courses = False
     can_manage_allowed_emails = False
@@ -34,10 +47,19 @@ def home(request):
         can_manage_allowed_emails = True
         can_access_dashboard = True
         sections = Section.objects.all()  # Get all sections for superuser
+
+    # Cards are grouped by semester in the template; keyset paging keeps the
+    # superuser's view of every section bounded.
+    page = browse_request(request, sections.with_card_stats())
     
     context = {
         'faculty': faculty,
-        'sections': sections,
+        'is_superuser': request.user.is_superuser,
+        'sections': page,
+        'page': page,
+        'filters': page.filters,
+        'years': available_years(sections),
+        'programs': Program.objects.all() if request.user.is_superuser else None,
         'can_create_section': can_create_section,
         'can_manage_courses': can_manage_courses,
         'can_manage_allowed_emails': can_manage_allowed_emails,
@@ -49,6 +71,9 @@ def home(request):
 
 @login_required
 def dashboard(request):
+    faculty = getattr(request.user, 'faculty', None)
+    if faculty is not None and faculty.can_access_dashboard():
+        return redirect('courses:program_dashboard')
     context = {
         'username': request.user.username,
         'user_level': 'Superuser' if request.user.is_superuser else 'User'
@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from .models import Program, Department, AllowedEmail
 from .forms import ProgramForm, DepartmentForm, AllowedEmailForm
+from obe.cache import cache_view, program_key
 
 def is_superuser(user):
     return user.is_superuser
@@ -11,6 +12,7 @@ def is_superuser(user):
 
 @login_required
 @user_passes_test(is_superuser)
+@cache_view(lambda request: [program_key()])
 def program_list(request):
     programs = Program.objects.all().select_related('department')
     return render(request, 'programs/program_list.html', {'programs': programs})
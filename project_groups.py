@@ -1,31 +1,60 @@
-from typing import List
-from dataclasses import dataclass
+"""
+In-memory workspace for a section's project groups.
+
+Groups and students are kept in dicts keyed by group number and student id,
+and every student's group is indexed, so adding, moving, removing and
+looking up a student are O(1).  A workspace can be filled from and written
+back to the ``courses.ProjectGroup`` tables in bulk:
+
+    manager = ProjectGroupManager.load(section)     # two queries
+    manager.move_student('2021-1-60-001', 3)
+    manager.save(section)                           # one transaction, bulk writes
+
+Loading and saving need Django to be set up; the rest works standalone.
+"""
 from datetime import datetime
+from typing import Dict, List, Optional
+
 
-@dataclass
 class Student:
-    name: str
-    student_id: str
-    email: str
+    __slots__ = ('name', 'student_id', 'email', 'pk')
+
+    def __init__(self, name: str, student_id: str, email: str = '', pk: Optional[int] = None):
+        self.name = name
+        self.student_id = student_id
+        self.email = email
+        self.pk = pk
+
+    def __repr__(self) -> str:
+        return f"Student({self.name!r}, {self.student_id!r})"
+
 
 class ProjectGroup:
-    def __init__(self, group_number: int, project_name: str):
+    __slots__ = ('group_number', 'project_name', 'students', 'created_at', 'pk', '_manager')
+
+    def __init__(self, group_number: int, project_name: str, pk: Optional[int] = None):
         self.group_number = group_number
         self.project_name = project_name
-        self.students: List[Student] = []
+        self.students: Dict[str, Student] = {}
         self.created_at = datetime.now()
+        self.pk = pk
+        self._manager = None
 
     def add_student(self, student: Student) -> None:
-        """Add a student to the group."""
-        self.students.append(student)
+        """Add a student to the group (moving them out of any other group of the manager)."""
+        if self._manager is not None:
+            self._manager.add_student(self.group_number, student)
+        else:
+            self.students[student.student_id] = student
 
     def remove_student(self, student_id: str) -> bool:
         """Remove a student from the group by their ID."""
-        for i, student in enumerate(self.students):
-            if student.student_id == student_id:
-                self.students.pop(i)
-                return True
-        return False
+        if student_id not in self.students:
+            return False
+        if self._manager is not None:
+            return self._manager.remove_student(student_id)
+        del self.students[student_id]
+        return True
 
     def get_student_count(self) -> int:
         """Get the number of students in the group."""
@@ -41,38 +70,157 @@ class ProjectGroup:
 
 class ProjectGroupManager:
     def __init__(self):
-        self.groups: List[ProjectGroup] = []
+        self.groups: Dict[int, ProjectGroup] = {}
         self.next_group_number = 1
+        self._group_of: Dict[str, ProjectGroup] = {}
 
-    def create_group(self, project_name: str) -> ProjectGroup:
+    def create_group(self, project_name: str, group_number: Optional[int] = None, pk: Optional[int] = None) -> ProjectGroup:
         """Create a new project group."""
-        group = ProjectGroup(self.next_group_number, project_name)
-        self.groups.append(group)
-        self.next_group_number += 1
+        if group_number is None:
+            group_number = self.next_group_number
+        if group_number in self.groups:
+            raise ValueError(f"Group {group_number} already exists")
+        group = ProjectGroup(group_number, project_name, pk=pk)
+        group._manager = self
+        self.groups[group_number] = group
+        self.next_group_number = max(self.next_group_number, group_number + 1)
         return group
 
     def get_group(self, group_number: int) -> ProjectGroup:
         """Get a group by its number."""
-        for group in self.groups:
-            if group.group_number == group_number:
-                return group
-        raise ValueError(f"Group {group_number} not found")
+        try:
+            return self.groups[group_number]
+        except KeyError:
+            raise ValueError(f"Group {group_number} not found") from None
 
     def remove_group(self, group_number: int) -> bool:
-        """Remove a group by its number."""
-        for i, group in enumerate(self.groups):
-            if group.group_number == group_number:
-                self.groups.pop(i)
-                return True
-        return False
+        """Remove a group by its number; its students become ungrouped."""
+        group = self.groups.pop(group_number, None)
+        if group is None:
+            return False
+        for student_id in group.students:
+            del self._group_of[student_id]
+        group._manager = None
+        return True
 
     def get_all_groups(self) -> List[ProjectGroup]:
         """Get all project groups."""
-        return self.groups
+        return list(self.groups.values())
 
     def get_invalid_groups(self) -> List[ProjectGroup]:
         """Get all groups that have fewer than 2 students."""
-        return [group for group in self.groups if not group.is_valid()]
+        return [group for group in self.groups.values() if not group.is_valid()]
+
+    def find_student_group(self, student_id: str) -> Optional[ProjectGroup]:
+        """The group a student is in, or None."""
+        return self._group_of.get(student_id)
+
+    def add_student(self, group_number: int, student: Student) -> None:
+        """Put a student in a group, taking them out of their current one."""
+        group = self.get_group(group_number)
+        current = self._group_of.get(student.student_id)
+        if current is not None:
+            del current.students[student.student_id]
+        group.students[student.student_id] = student
+        self._group_of[student.student_id] = group
+
+    def move_student(self, student_id: str, group_number: int) -> None:
+        """Move a grouped student to another group."""
+        current = self._group_of.get(student_id)
+        if current is None:
+            raise ValueError(f"Student {student_id} is not in a group")
+        self.add_student(group_number, current.students[student_id])
+
+    def remove_student(self, student_id: str) -> bool:
+        """Take a student out of their group."""
+        group = self._group_of.pop(student_id, None)
+        if group is None:
+            return False
+        del group.students[student_id]
+        return True
+
+    # -- persistence -----------------------------------------------------------
+
+    @classmethod
+    def load(cls, section) -> 'ProjectGroupManager':
+        """A workspace holding ``section``'s stored groups and members (two queries)."""
+        from courses.models import ProjectGroup as GroupModel
+
+        manager = cls()
+        for row in GroupModel.objects.filter(section=section).prefetch_related('students').order_by('group_sl'):
+            group = manager.create_group(row.project_name or '', group_number=row.group_sl, pk=row.pk)
+            for student in row.students.all():
+                manager.add_student(group.group_number, Student(student.name, student.student_id, pk=student.pk))
+        return manager
+
+    def save(self, section) -> None:
+        """
+        Write the workspace to ``section``'s stored groups in one transaction:
+        groups are matched by number, and only the groups and memberships that
+        changed are created, updated or deleted, with bulk queries.  Raises
+        ValueError, writing nothing, if a student is unknown or not enrolled
+        in the section.
+        """
+        from django.db import transaction
+        from django.db.models import Q
+        from courses.models import (
+            Enrollment, ProjectGroup as GroupModel, ProjectGroupEnrollment as Membership, Student as StudentModel,
+        )
+        from obe.cache import invalidate_section
+
+        with transaction.atomic():
+            stored = {row.group_sl: row for row in GroupModel.objects.select_for_update().filter(section=section)}
+
+            missing = [sid for sid, group in self._group_of.items() if group.students[sid].pk is None]
+            if missing:
+                pks = dict(StudentModel.objects.filter(student_id__in=missing).values_list('student_id', 'pk'))
+                unknown = set(missing) - pks.keys()
+                if unknown:
+                    raise ValueError(f"Unknown students: {', '.join(sorted(unknown))}")
+                for student_id, pk in pks.items():
+                    self._group_of[student_id].students[student_id].pk = pk
+
+            # The views only group enrolled students; neither does the workspace.
+            grouped = {sid: group.students[sid].pk for sid, group in self._group_of.items()}
+            enrolled = set(Enrollment.objects.filter(section=section, student_id__in=grouped.values())
+                           .values_list('student_id', flat=True))
+            outside = [sid for sid, pk in grouped.items() if pk not in enrolled]
+            if outside:
+                raise ValueError(f"Not enrolled in this section: {', '.join(sorted(outside))}")
+
+            new_rows, changed_rows = [], []
+            for number, group in self.groups.items():
+                row = stored.get(number)
+                if row is None:
+                    row = GroupModel(section=section, group_sl=number, project_name=group.project_name)
+                    new_rows.append(row)
+                elif (row.project_name or '') != group.project_name:
+                    row.project_name = group.project_name
+                    changed_rows.append(row)
+                group.pk = row.pk
+            GroupModel.objects.bulk_create(new_rows)
+            GroupModel.objects.bulk_update(changed_rows, ['project_name'])
+            for row in new_rows:
+                self.groups[row.group_sl].pk = row.pk
+
+            removed = [row.pk for number, row in stored.items() if number not in self.groups]
+            if removed:
+                GroupModel.objects.filter(pk__in=removed).delete()
+
+            wanted = {(group.pk, student.pk) for group in self.groups.values() for student in group.students.values()}
+            existing = set(Membership.objects.filter(section=section).values_list('project_group_id', 'student_id'))
+            extra = existing - wanted
+            if extra:
+                condition = Q()
+                for group_id, student_id in extra:
+                    condition |= Q(project_group_id=group_id, student_id=student_id)
+                Membership.objects.filter(condition).delete()
+            Membership.objects.bulk_create([
+                Membership(project_group_id=group_id, student_id=student_id, section=section)
+                for group_id, student_id in wanted - existing
+            ])
+        # bulk writes bypass the post_save receivers
+        invalidate_section(section.pk)
 
 
 # Example usage
@@ -87,7 +235,7 @@ if __name__ == "__main__":
 
     # Create a project group
     group = manager.create_group("Web Development Project")
-    
+
     # Add students to the group
     group.add_student(student1)
     group.add_student(student2)
@@ -103,4 +251,4 @@ if __name__ == "__main__":
     print(f"\nAfter removing a student:")
     print(group)
     print(f"Number of students: {group.get_student_count()}")
-    print(f"Is valid group: {group.is_valid()}") 
\ No newline at end of file
+    print(f"Is valid group: {group.is_valid()}")